@@ -1,24 +1,66 @@
 import networkx as nx
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import matplotlib.pyplot as plt
 from collections import defaultdict
+from centrality import parallel_betweenness, parallel_closeness, sampled_betweenness, top_k_closeness
+from graph_store import load_graph
+from instrumentation import annotate, trace_path, traced, tracing
+from routing_index import LandmarkIndex
+from scipy.sparse.csgraph import connected_components
+from shortest_paths import BatchedShortestPaths
+from vulnerability import score_edge_removals
 
 class NetworkAnalyzer:
     def __init__(self, network_path: str):
-        """初始化网络分析器"""
-        self.G = nx.read_graphml(network_path)
-        print(f"加载网络完成。节点数: {self.G.number_of_nodes()}, 边数: {self.G.number_of_edges()}")
-        
-    def analyze_centrality(self) -> Dict:
-        """分析节点中心性"""
+        """初始化网络分析器 (GraphStore 目录以内存映射方式打开, 也可传入 GraphML 文件)"""
+        self.network_path = network_path
+        self.store = load_graph(network_path)
+        self._G = None
+        self._paths = None
+        self._routing = None
+        print(f"加载网络完成。节点数: {self.store.num_nodes}, 边数: {self.store.num_edges}")
+    
+    @property
+    def G(self) -> nx.DiGraph:
+        """NetworkX 图, 首次访问时由 GraphStore 构建"""
+        if self._G is None:
+            self._G = self.store.to_networkx()
+        return self._G
+        
+    @traced('analyzer.centrality')
+    def analyze_centrality(self, mode: str = 'exact', sample_size: int = 500,
+                           workers: Optional[int] = None, closeness_top_k: Optional[int] = None,
+                           seed: int = 42) -> Dict:
+        """分析节点中心性
+        
+        mode: 'exact' 为 NetworkX 精确计算; 'parallel' 把起点分给多个进程精确计算;
+        'sampled' 用 sample_size 个随机枢轴近似介数中心性并输出误差估计。
+        closeness_top_k 不为 None 时只计算接近中心性最高的 k 个节点。
+        """
         print("\n计算节点中心性...")
+        annotate(items=self.store.num_nodes, mode=mode)
         
         # 计算不同的中心性指标
         degree_centrality = nx.degree_centrality(self.G)
-        betweenness_centrality = nx.betweenness_centrality(self.G)
-        closeness_centrality = nx.closeness_centrality(self.G)
+        if mode == 'exact':
+            betweenness_centrality = nx.betweenness_centrality(self.G)
+        elif mode == 'parallel':
+            betweenness_centrality = parallel_betweenness(self.G, workers)
+        elif mode == 'sampled':
+            betweenness_centrality, error = sampled_betweenness(self.G, sample_size, seed=seed, workers=workers)
+            print(f"介数中心性采样: {error['pivots']} 个枢轴, {error['batches']} 批, "
+                  f"最大标准误 {error['max_stderr']:.4f}, 平均标准误 {error['mean_stderr']:.4f}")
+        else:
+            raise ValueError(f"Unknown centrality mode: {mode}")
+        
+        if closeness_top_k is not None:
+            closeness_centrality = top_k_closeness(self.G, closeness_top_k, seed=seed, workers=workers)
+        elif mode == 'parallel':
+            closeness_centrality = parallel_closeness(self.G, workers=workers)
+        else:
+            closeness_centrality = nx.closeness_centrality(self.G)
         
         # 找出最重要的节点
         top_nodes = {
@@ -39,101 +81,116 @@ class NetworkAnalyzer:
             'closeness': closeness_centrality
         }
     
-    def analyze_shortest_paths(self, sample_size: int = 100) -> None:
-        """分析最短路径"""
+    def largest_scc_nodes(self) -> np.ndarray:
+        """最大强连通分量中的节点 ID (基于 CSR 计算, 不需要 NetworkX 图)"""
+        _, labels = connected_components(self.store.to_scipy(), directed=True, connection='strong')
+        largest = np.bincount(labels).argmax()
+        return np.asarray(self.store.node_ids)[labels == largest]
+    
+    @property
+    def paths(self) -> BatchedShortestPaths:
+        """批量最短路径引擎 (按 distance 加权)"""
+        if self._paths is None:
+            self._paths = BatchedShortestPaths(self.store, weight='distance')
+        return self._paths
+    
+    @property
+    def routing_index(self) -> LandmarkIndex:
+        """点对点路由索引 (按 distance 加权), 保存在网络文件旁, 图变化后自动重建"""
+        if self._routing is None:
+            self._routing = LandmarkIndex.load_or_build(f"{self.network_path}.alt.npz", self.store,
+                                                        weight='distance')
+        return self._routing
+    
+    def route(self, source, target, exact: bool = False) -> Tuple[float, List]:
+        """两点间最短路径 (距离, 节点路径); 不可达时为 (inf, [])"""
+        return self.routing_index.route(source, target, exact)
+    
+    @traced('analyzer.shortest_paths')
+    def analyze_shortest_paths(self, sample_size: int = 100) -> Optional[Dict]:
+        """分析最短路径 (OD 对按起点分组批量计算)"""
         print("\n=== 最短路径分析 ===")
         
         # 获取最大连通分量
-        largest_cc = max(nx.strongly_connected_components(self.G), key=len)
-        print(f"最大连通分量大小: {len(largest_cc)}")
+        nodes = self.largest_scc_nodes()
+        print(f"最大连通分量大小: {len(nodes)}")
         
         # 在最大连通分量中随机选择节点对
-        nodes = list(largest_cc)
         if len(nodes) < 2:
             print("连通分量太小，无法进行路径分析")
-            return
+            return None
         
-        # 随机选择节点对进行分析
-        np.random.seed(42)
-        pairs = []
-        for _ in range(min(sample_size, len(nodes) * (len(nodes) - 1) // 2)):
-            i, j = np.random.choice(len(nodes), 2, replace=False)
-            pairs.append((nodes[i], nodes[j]))
-        
-        # 计算路径统计
-        path_lengths = []
-        congestion_levels = defaultdict(int)
+        # 随机选择节点对进行分析 (起终点不同)
+        rng = np.random.default_rng(42)
+        n_pairs = min(sample_size, len(nodes) * (len(nodes) - 1) // 2)
+        i = rng.integers(0, len(nodes), size=n_pairs)
+        j = rng.integers(0, len(nodes) - 1, size=n_pairs)
+        j += j >= i
         
         print("\n计算最短路径...")
-        for source, target in pairs:
-            try:
-                path = nx.shortest_path(self.G, source, target, weight='distance')
-                length = sum(float(self.G[path[i]][path[i+1]]['distance']) for i in range(len(path)-1))
-                path_lengths.append(length)
-                
-                # 统计路径上的拥堵等级
-                for i in range(len(path)-1):
-                    congestion_level = self.G[path[i]][path[i+1]]['congestion_level']
-                    congestion_levels[congestion_level] += 1
-                
-            except nx.NetworkXNoPath:
-                continue
-        
-        if path_lengths:
+        annotate(items=n_pairs)
+        result = self.paths.query(nodes[i], nodes[j], level_attr='congestion_level')
+        path_lengths = result['length'][np.isfinite(result['length'])]
+        
+        if len(path_lengths):
             print(f"\n路径长度统计:")
             print(f"平均长度: {np.mean(path_lengths):.2f} km")
-            print(f"最短长度: {min(path_lengths):.2f} km")
-            print(f"最长长度: {max(path_lengths):.2f} km")
+            print(f"最短长度: {path_lengths.min():.2f} km")
+            print(f"最长长度: {path_lengths.max():.2f} km")
             
+            # 统计路径上的拥堵等级
             print("\n路径拥堵等级分布:")
-            total = sum(congestion_levels.values())
-            for level, count in sorted(congestion_levels.items()):
-                print(f"{level}: {count/total*100:.1f}%")
+            counts = result['level_counts'].sum(axis=0)
+            total = counts.sum()
+            for level, count in sorted(zip(result['levels'], counts)):
+                if count:
+                    print(f"{level}: {count/total*100:.1f}%")
+        
+        return result
     
-    def analyze_vulnerability(self) -> None:
-        """分析网络脆弱性"""
+    @traced('analyzer.vulnerability')
+    def analyze_vulnerability(self, workers: Optional[int] = 1, top_n: int = 10) -> Dict:
+        """分析网络脆弱性 (评估所有严重拥堵的边, 不修改原图); workers 不为 1 时强桥分给多个进程重算"""
         print("\n=== 网络脆弱性分析 ===")
         
-        # 获取最大连通分量
-        largest_cc = max(nx.strongly_connected_components(self.G), key=len)
-        original_size = len(largest_cc)
-        
         # 分析重要边的移除对网络的影响
         print("\n分析关键边的影响...")
-        edge_importance = {}
         
         # 获取拥堵等级为"严重拥堵"的边
-        congested_edges = [(u, v) for u, v, d in self.G.edges(data=True)
-                          if d['congestion_level'] == '严重拥堵']
-        
-        for edge in congested_edges[:10]:  # 只分析前10条最拥堵的边
-            # 临时移除边
-            self.G.remove_edge(*edge)
-            
-            # 计算新的最大连通分量大小
-            new_largest_cc = len(max(nx.strongly_connected_components(self.G), key=len))
-            
-            # 计算影响程度
-            impact = (original_size - new_largest_cc) / original_size
-            edge_importance[edge] = impact
-            
-            # 恢复边
-            attrs = {'distance': '0', 'congestion_level': '严重拥堵'}  # 添加必要的属性
-            self.G.add_edge(*edge, **attrs)
+        levels = self.store.strings('congestion_level')
+        if '严重拥堵' not in levels:
+            print("没有严重拥堵的边")
+            return {}
+        codes = np.asarray(self.store.edge_columns['congestion_level'])
+        congested = np.flatnonzero(codes == levels.index('严重拥堵'))
+        
+        impacts, stats = score_edge_removals(self.store, congested, workers)
+        annotate(items=len(congested), strong_bridges=stats['strong_bridges'])
+        print(f"候选边: {stats['candidates']}, 位于最大连通分量内: {stats['in_largest_scc']}, "
+              f"强桥: {stats['strong_bridges']}")
+        
+        node_ids = np.asarray(self.store.node_ids)
+        sources = node_ids[self.store.edge_sources()[congested]].tolist()
+        targets = node_ids[np.asarray(self.store.indices)[congested]].tolist()
+        road_names = self.store.edge_values('road_name')[congested]
+        edge_importance = dict(zip(zip(sources, targets), impacts.tolist()))
         
         # 输出结果
-        print("\n移除边对网络连通性的影响:")
-        for edge, impact in sorted(edge_importance.items(), key=lambda x: x[1], reverse=True):
-            road_name = self.G[edge[0]][edge[1]]['road_name']
-            print(f"道路: {road_name}, 边 {edge}: 影响度 {impact:.4f}")
+        print(f"\n移除边对网络连通性的影响 (前 {top_n}):")
+        for k in np.argsort(-impacts, kind='stable')[:top_n]:
+            edge = (sources[k], targets[k])
+            print(f"道路: {road_names[k]}, 边 {edge}: 影响度 {impacts[k]:.4f}")
+        
+        return edge_importance
     
+    @traced('analyzer.save')
     def save_analysis_results(self, output_path: str) -> None:
         """保存分析结果"""
         # 将结果保存为JSON格式
         results = {
             'network_stats': {
-                'nodes': self.G.number_of_nodes(),
-                'edges': self.G.number_of_edges()
+                'nodes': self.store.num_nodes,
+                'edges': self.store.num_edges
             }
         }
         
@@ -143,17 +200,19 @@ class NetworkAnalyzer:
             json.dump(results, f, indent=4)
         print(f"\n分析结果已保存到 {output_path}")
 
-def main():
-    # 创建分析器实例
-    analyzer = NetworkAnalyzer('traffic_network.graphml')
-    
-    # 运行分析
-    analyzer.analyze_centrality()
-    analyzer.analyze_shortest_paths()
-    analyzer.analyze_vulnerability()
-    
-    # 保存结果
-    analyzer.save_analysis_results('network_analysis_results.json')
+def main(network_path='traffic_network.graph', output_path='network_analysis_results.json'):
+    # 设置 MCM_TRACE=1 时, 各步骤的耗时和内存写入结果文件旁的 .trace.json
+    with tracing(trace_path(output_path), 'analyze_network'):
+        # 创建分析器实例
+        analyzer = NetworkAnalyzer(network_path)
+        
+        # 运行分析
+        analyzer.analyze_centrality()
+        analyzer.analyze_shortest_paths()
+        analyzer.analyze_vulnerability()
+        
+        # 保存结果
+        analyzer.save_analysis_results(output_path)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,9 +1,9 @@
 import pandas as pd
 import numpy as np
 
-def analyze_data():
+def analyze_data(data_path='processed_mdot_data.csv', output_path='road_statistics.csv'):
     # 读取处理后的数据
-    df = pd.read_csv('processed_mdot_data.csv')
+    df = pd.read_csv(data_path)
     
     # 基本统计信息
     print("=== 数据基本统计 ===")
@@ -43,8 +43,8 @@ def analyze_data():
     print(road_stats.head(10))
     
     # 输出到CSV文件
-    road_stats.to_csv('road_statistics.csv')
-    print("\n详细统计已保存到 road_statistics.csv")
+    road_stats.to_csv(output_path)
+    print(f"\n详细统计已保存到 {output_path}")
 
 if __name__ == "__main__":
     analyze_data() 
\ No newline at end of file
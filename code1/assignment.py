@@ -0,0 +1,299 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+
+from geometry import haversine
+from instrumentation import count
+from node_lists import parse_node_lists
+from shortest_paths import BatchedShortestPaths
+
+# BPR 路阻函数 t = t0 * (1 + alpha * (v / c) ^ beta) 的常用参数
+BPR_ALPHA = 0.15
+BPR_BETA = 4.0
+
+
+def bpr_time(free_flow, flow, capacity, alpha: float = BPR_ALPHA, beta: float = BPR_BETA) -> np.ndarray:
+    """BPR 路阻函数; 通行能力缺失 (inf) 的边不拥堵"""
+    return free_flow * (1 + alpha * (flow / capacity) ** beta)
+
+
+def station_zones(predictions: pd.DataFrame, history: pd.DataFrame, year: int, nodes=None,
+                  column: str = 'AADT_Prediction') -> pd.DataFrame:
+    """测站预测 -> 交通小区 (节点, 交通量)
+
+    测站位置取 node_start 列表中第一个在图中的节点 (nodes 为 None 时取第一个),
+    同一节点上的多个测站交通量相加。
+    """
+    rows = predictions[predictions['Year'] == year]
+    starts = history.drop_duplicates('Station_ID').set_index('Station_ID')['node_start']
+    node_lists = parse_node_lists(starts.reindex(rows['Station_ID']).tolist())
+    values = node_lists.values
+    valid = np.ones(len(values), dtype=bool)
+    if nodes is not None:
+        valid = np.isin(values, np.fromiter(nodes, dtype=np.int64))
+    row_ids = node_lists.row_ids()[valid]
+    # 每行第一个有效节点
+    first_rows, first = np.unique(row_ids, return_index=True)
+    zones = pd.DataFrame({
+        'node': values[valid][first],
+        'volume': rows[column].to_numpy(dtype=np.float64)[first_rows]
+    })
+    zones = zones[np.isfinite(zones['volume']) & (zones['volume'] > 0)]
+    return zones.groupby('node', as_index=False)['volume'].sum()
+
+
+def od_demand(zones: pd.DataFrame, geometry, peak_factor: float = 0.1, decay: float = 10000.0,
+              max_zones: Optional[int] = None, min_flow: float = 1.0
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """单约束重力模型: 由小区交通量生成高峰小时 OD 需求 (辆/小时)
+
+    发生量 = 交通量 × peak_factor, 吸引权重取小区交通量, 距离衰减为
+    exp(-直线距离 / decay)。max_zones 给出时只保留交通量最大的若干小区,
+    其余小区的交通量并入最近的保留小区。返回 (起点, 终点, 需求)。
+    """
+    nodes = zones['node'].to_numpy(dtype=np.int64)
+    volume = zones['volume'].to_numpy(dtype=np.float64)
+    lat, lon = geometry.coords(nodes)
+    if max_zones is not None and len(nodes) > max_zones:
+        kept = np.argsort(-volume, kind='stable')[:max_zones]
+        nearest = np.empty(len(nodes), dtype=np.int64)
+        for start in range(0, len(nodes), 1024):
+            block = slice(start, start + 1024)
+            dist = haversine(lat[block, None], lon[block, None], lat[kept][None, :], lon[kept][None, :])
+            nearest[block] = dist.argmin(axis=1)
+        volume = np.bincount(nearest, weights=volume, minlength=max_zones)
+        nodes, lat, lon = nodes[kept], lat[kept], lon[kept]
+
+    dist = haversine(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    attraction = volume[None, :] * np.exp(-dist / decay)
+    np.fill_diagonal(attraction, 0)
+    total = attraction.sum(axis=1, keepdims=True)
+    flows = (volume * peak_factor)[:, None] * np.divide(attraction, total, out=np.zeros_like(attraction),
+                                                        where=total > 0)
+    o, d = np.nonzero((flows > 0) & (flows >= min_flow))
+    return nodes[o], nodes[d], flows[o, d]
+
+
+def _tree_flows(pred, rows, targets, weights):
+    """沿一批最短路树同时回溯所有终点, 把需求累加到树的节点上
+
+    返回 (批内行号 × 节点数) 展平后的节点流量: 第 r 行节点 v 的值为
+    从第 r 个起点经 (pred[r, v], v) 这条边的流量。
+    """
+    n = pred.shape[1]
+    keys, values = [], []
+    current = targets
+    while len(current):
+        parent = pred[rows, current]
+        active = parent >= 0
+        rows, current, parent, weights = rows[active], current[active], parent[active], weights[active]
+        keys.append(rows * n + current)
+        values.append(weights)
+        current = parent
+    if not keys:
+        return np.zeros(pred.size)
+    return np.bincount(np.concatenate(keys), weights=np.concatenate(values), minlength=pred.size)
+
+
+def _in_edge_ids(in_edges, u, v):
+    """(起点下标, 终点下标) -> 边下标: 逐个检查终点的入边 (道路网入度很小, 比二分查找快)"""
+    in_ptr, in_src, in_edge = in_edges
+    start = in_ptr[v]
+    count = in_ptr[v + 1] - start
+    result = np.full(len(v), -1, dtype=np.int64)
+    pending = np.arange(len(v))
+    k = 0
+    while len(pending):
+        pending = pending[count[pending] > k]
+        pos = start[pending] + k
+        hit = in_src[pos] == u[pending]
+        result[pending[hit]] = in_edge[pos[hit]]
+        pending = pending[~hit]
+        k += 1
+    return result
+
+
+def _load_batch(args):
+    """一批起点的全有全无分配: 返回 (边流量, 该批 OD 对的最短时间)"""
+    matrix, in_edges, batch, rows, targets, demand = args
+    dist, pred = dijkstra(matrix, directed=True, indices=batch, return_predecessors=True)
+    # 在工作进程中运行时计数留在工作进程里, 只有 workers == 1 时计入 trace
+    count('dijkstra.calls')
+    count('dijkstra.sources', len(batch))
+    node_flow = _tree_flows(pred, rows, targets, demand)
+    # 同一起点树上经过同一节点的路径先合并, 再换算成边下标
+    used = np.flatnonzero(node_flow)
+    edges = _in_edge_ids(in_edges, pred.ravel()[used].astype(np.int64), used % pred.shape[1])
+    flow = np.bincount(edges, weights=node_flow[used], minlength=len(in_edges[1]))
+    return flow, dist[rows, targets]
+
+
+class TrafficAssignment:
+    """静态用户均衡交通分配 (Frank-Wolfe, BPR 路阻)
+
+    每轮按当前路阻做全有全无分配: OD 对按起点分组, 每个起点只做一次
+    Dijkstra, 同一棵最短路树上的所有终点一起回溯, 边流量用 NumPy 累加;
+    步长由 Beckmann 目标函数的一维二分搜索确定。
+    """
+
+    def __init__(self, store, free_flow: str = 'free_flow_time', capacity: str = 'capacity',
+                 alpha: float = BPR_ALPHA, beta: float = BPR_BETA, batch_size: int = 64):
+        self.store = store
+        self.alpha = alpha
+        self.beta = beta
+        self.batch_size = batch_size
+        self.engine = BatchedShortestPaths(store, weight=free_flow)
+        # 自由流时间取一个很小的下限, 避免零时长的边
+        self.free_flow = np.maximum(self.engine.matrix.data.copy(), 1e-6)
+        cap = np.asarray(store.edge_columns[capacity], dtype=np.float64)
+        self.capacity = np.where(np.isfinite(cap) & (cap > 0), cap, np.inf)
+        # 按终点分组的入边表, 用于由最短路树的 (前驱, 节点) 找到边下标
+        sources = store.edge_sources()
+        targets = np.asarray(store.indices, dtype=np.int64)
+        order = np.lexsort((sources, targets))
+        in_ptr = np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=store.num_nodes))])
+        self._in_edges = (in_ptr, sources[order], order)
+
+    def edge_times(self, flow) -> np.ndarray:
+        return bpr_time(self.free_flow, flow, self.capacity, self.alpha, self.beta)
+
+    def _all_or_nothing(self, engine, keep, times, src, dst, demand, pool=None):
+        """按当前路阻把全部需求分配到最短路上, 返回 (边流量, OD 最短时间)
+
+        起点分批计算, 批之间互不依赖; 给出 pool 时各批在进程池中并行。
+        """
+        engine.matrix.data = times[keep]
+        unique_sources, group = np.unique(src, return_inverse=True)
+        tasks, pair_ids = [], []
+        for start in range(0, len(unique_sources), self.batch_size):
+            batch = unique_sources[start:start + self.batch_size]
+            in_batch = np.flatnonzero((group >= start) & (group < start + len(batch)))
+            tasks.append((engine.matrix, self._in_edges, batch, group[in_batch] - start,
+                          dst[in_batch], demand[in_batch]))
+            pair_ids.append(in_batch)
+        results = pool.map(_load_batch, tasks) if pool is not None else map(_load_batch, tasks)
+
+        flow = np.zeros(self.store.num_edges)
+        od_time = np.full(len(src), np.inf)
+        for in_batch, (batch_flow, batch_time) in zip(pair_ids, results):
+            flow += batch_flow
+            od_time[in_batch] = batch_time
+        return flow, od_time
+
+    def _line_search(self, x, direction, iterations: int = 30) -> float:
+        """二分求 sum(direction * t(x + step * direction)) = 0 的步长"""
+        low, high = 0.0, 1.0
+        if np.dot(direction, self.edge_times(x + direction)) <= 0:
+            return 1.0
+        for _ in range(iterations):
+            mid = (low + high) / 2
+            if np.dot(direction, self.edge_times(x + mid * direction)) > 0:
+                high = mid
+            else:
+                low = mid
+        return (low + high) / 2
+
+    def assign(self, sources, targets, demand, removed_edges: Iterable[int] = (),
+               max_iter: int = 50, tol: float = 1e-3, workers: Optional[int] = 1,
+               verbose: bool = False) -> Dict:
+        """计算用户均衡
+
+        sources / targets 为节点 ID, demand 为对应的需求 (辆/小时); removed_edges 为
+        删除的边下标 (例如倒塌的桥梁)。收敛判据为相对间隙
+        (t·x - t·y) / (t·x) < tol, 其中 y 为当前路阻下的全有全无流量。返回的
+        od_time 为按最终路阻计算的 OD 最短时间。
+        workers 不为 1 时全有全无分配的各批起点在进程池中并行 (None 为 CPU 核数)。
+        """
+        src = self.store.node_index(sources)
+        dst = self.store.node_index(targets)
+        if (src < 0).any() or (dst < 0).any():
+            raise KeyError("OD pairs contain nodes that are not in the graph")
+        demand = np.asarray(demand, dtype=np.float64)
+
+        removed = np.asarray(list(removed_edges), dtype=np.int64)
+        keep = np.ones(self.store.num_edges, dtype=bool)
+        keep[removed] = False
+        engine = self.engine.without_edges(removed)
+
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            flow, od_time = self._all_or_nothing(engine, keep, self.free_flow, src, dst, demand, pool)
+            # 不可达的 OD 对没有路径, 需求不会加载到任何边上
+            routable = np.isfinite(od_time)
+
+            gaps = []
+            for iteration in range(1, max_iter + 1):
+                times = self.edge_times(flow)
+                target, od_time = self._all_or_nothing(engine, keep, times, src, dst, demand, pool)
+                total = np.dot(times, flow)
+                gap = (total - np.dot(times, target)) / total if total > 0 else 0.0
+                gaps.append(gap)
+                if verbose:
+                    print(f"迭代 {iteration}: 相对间隙 {gap:.2e}")
+                if gap < tol:
+                    break
+                direction = target - flow
+                flow = flow + self._line_search(flow, direction) * direction
+            else:
+                # 未收敛 (或 max_iter 为 0) 时最后一次更新后的流量还没有对应的 OD 时间,
+                # 按最终路阻重新计算, 使 od_time 与返回的 time 一致
+                _, od_time = self._all_or_nothing(engine, keep, self.edge_times(flow), src, dst,
+                                                  demand, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        times = self.edge_times(flow)
+        return {
+            'flow': flow,
+            'time': times,
+            'vc_ratio': flow / self.capacity,
+            'od_time': np.where(routable, od_time, np.inf),
+            'demand': demand,
+            'unassigned_demand': float(demand[~routable].sum()),
+            'removed': removed,
+            'gaps': gaps,
+            'iterations': len(gaps),
+            'converged': bool(gaps) and bool(gaps[-1] < tol)
+        }
+
+    def summarize(self, result: Dict) -> Dict:
+        """总出行时间 (车·小时)、平均 OD 出行时间 (分钟) 和饱和度统计"""
+        used = np.ones(self.store.num_edges, dtype=bool)
+        used[result['removed']] = False
+        vc = result['vc_ratio'][used]
+        routable = np.isfinite(result['od_time'])
+        demand = result['demand'][routable]
+        return {
+            'total_vehicle_hours': float(np.dot(result['flow'], result['time']) / 3600),
+            'mean_od_minutes': float(np.average(result['od_time'][routable], weights=demand) / 60)
+            if demand.sum() > 0 else float('nan'),
+            'mean_vc': float(vc[result['flow'][used] > 0].mean()) if (result['flow'][used] > 0).any() else 0.0,
+            'max_vc': float(vc.max()) if len(vc) else 0.0,
+            'over_capacity_edges': int((vc > 1).sum()),
+            'unassigned_demand': result['unassigned_demand']
+        }
+
+    def compare(self, before: Dict, after: Dict) -> pd.DataFrame:
+        """倒塌前后的指标对比表"""
+        a, b = self.summarize(before), self.summarize(after)
+        table = pd.DataFrame({'before': a, 'after': b})
+        table['change'] = table['after'] - table['before']
+        return table
+
+    def congested_edges(self, result: Dict, n: int = 10) -> pd.DataFrame:
+        """饱和度最高的 n 条边"""
+        node_ids = np.asarray(self.store.node_ids)
+        order = np.argsort(-np.nan_to_num(result['vc_ratio']), kind='stable')[:n]
+        return pd.DataFrame({
+            'u': node_ids[self.store.edge_sources()[order]],
+            'v': node_ids[np.asarray(self.store.indices)[order]],
+            'flow': result['flow'][order],
+            'capacity': self.capacity[order],
+            'vc_ratio': result['vc_ratio'][order]
+        })
@@ -0,0 +1,354 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import disable, enable, peak_rss_mb
+
+HISTORY_PATH = 'benchmark_history.json'
+DATA_DIR = 'benchmark_data'
+# 耗时 (中位数) 或峰值内存增加超过该比例视为性能退化
+REGRESSION_THRESHOLD = 0.1
+# 耗时增加不到该秒数、峰值内存增加不到该 MB 数时视为噪声
+MIN_TIME_DELTA = 0.05
+MIN_MEMORY_DELTA_MB = 10
+# 每个基准先预热 WARMUP 次 (不计入结果), 再计时 REPEATS 次
+WARMUP = 1
+REPEATS = 5
+
+
+def _read_names(manifest):
+    mdot = pd.read_csv(manifest['paths']['mdot'])
+    edge_names = pd.read_csv(manifest['paths']['edge_names'])
+    return mdot, edge_names
+
+
+def _standardized(manifest):
+    from match_streets import _standardizer
+    mdot, edge_names = _read_names(manifest)
+    mdot['Standardized_Name'] = _standardizer.extract_base_names(mdot['Road Name'], mdot['Station Description'])
+    edge_names['Standardized_Name'] = _standardizer.standardize_series(edge_names['Street_Name'])
+    return mdot, edge_names
+
+
+# 每个基准函数返回 (计时部分的秒数, 处理的条目数, 条目单位); 读数据等准备工作不计时
+
+def bench_standardize(manifest):
+    """standardize_street_name: MDOT 和路网的全部道路名称, 冷缓存"""
+    from street_standardizer import StreetNameStandardizer
+    mdot, edge_names = _read_names(manifest)
+    names = pd.concat([mdot['Road Name'], edge_names['Street_Name']], ignore_index=True)
+    standardizer = StreetNameStandardizer()
+    start = time.perf_counter()
+    for name in names.tolist():
+        standardizer.standardize(name)
+    return time.perf_counter() - start, len(names), 'rows'
+
+
+def bench_find_best_match(manifest):
+    """find_best_match: 建立模糊索引, 匹配所有不能精确匹配的名称"""
+    from match_streets import find_best_match
+    from street_index import FuzzyStreetMatcher
+    mdot, edge_names = _standardized(manifest)
+    valid_names = set(edge_names['Standardized_Name'])
+    queries = sorted(set(mdot['Standardized_Name']) - valid_names)
+    start = time.perf_counter()
+    matcher = FuzzyStreetMatcher(valid_names)
+    for name in queries:
+        find_best_match(name, matcher)
+    return time.perf_counter() - start, len(queries), 'names'
+
+
+def bench_match_rows(manifest):
+    """三层匹配 (精确 / 高速编号 / 模糊), 单进程"""
+    from match_streets import match_rows
+    mdot, edge_names = _standardized(manifest)
+    start = time.perf_counter()
+    match_rows(mdot, edge_names, workers=1)
+    return time.perf_counter() - start, len(mdot), 'rows'
+
+
+def bench_build_network(manifest):
+    """NetworkBuilder.build_network: 读 CSV、解析节点列表、建图、写 GraphStore 和 GraphML"""
+    from build_network import NetworkBuilder
+    # 节点列表缓存写到临时目录: 每次都计入解析, 也不在数据目录留下 .npz 文件
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        NetworkBuilder(sidecar_dir=tmp).build_network(manifest['paths']['mdot'], manifest['paths']['edge_names'],
+                                       output_path=os.path.join(tmp, 'traffic_network.graph'))
+        seconds = time.perf_counter() - start
+    return seconds, manifest['counts']['stations'], 'rows'
+
+
+def _analyzer(manifest):
+    from analyze_network import NetworkAnalyzer
+    return NetworkAnalyzer(manifest['paths']['network'])
+
+
+def bench_analyzer_shortest_paths(manifest, sample_size=1000):
+    analyzer = _analyzer(manifest)
+    start = time.perf_counter()
+    analyzer.analyze_shortest_paths(sample_size)
+    return time.perf_counter() - start, sample_size, 'pairs'
+
+
+def bench_analyzer_centrality(manifest, sample_size=32):
+    """采样介数中心性 + 接近中心性前 10 (含 NetworkX 图的构建)"""
+    analyzer = _analyzer(manifest)
+    start = time.perf_counter()
+    analyzer.analyze_centrality(mode='sampled', sample_size=sample_size, workers=1, closeness_top_k=10)
+    return time.perf_counter() - start, analyzer.store.num_nodes, 'nodes'
+
+
+def bench_analyzer_vulnerability(manifest):
+    analyzer = _analyzer(manifest)
+    start = time.perf_counter()
+    impacts = analyzer.analyze_vulnerability(workers=1)
+    return time.perf_counter() - start, len(impacts), 'edges'
+
+
+def bench_bridge_collapse(manifest, n_pairs=1000):
+    """Key Bridge 倒塌前后的 OD 距离 (河北岸 -> 南岸, 与 Q1 的流程相同)"""
+    from graph_store import load_graph
+    from od_sampling import sample_pairs
+    from scenarios import ScenarioEngine
+    store = load_graph(manifest['paths']['network'])
+    lat = np.asarray(store.node_pos)[:, 0]
+    node_ids = np.asarray(store.node_ids)
+    river = manifest['river_lat']
+    sources, targets = sample_pairs(node_ids[lat > river], node_ids[lat < river], n_pairs, seed=42)
+    bridge = [tuple(e) for e in manifest['key_bridge']]
+    start = time.perf_counter()
+    engine = ScenarioEngine(store, sources, targets, weight='weight')
+    engine.summarize(engine.run(bridge))
+    return time.perf_counter() - start, len(sources), 'pairs'
+
+
+def _routing_index(manifest, n_pairs):
+    from graph_store import load_graph
+    from routing_index import LandmarkIndex
+    store = load_graph(manifest['paths']['network'])
+    rng = np.random.default_rng(42)
+    node_ids = np.asarray(store.node_ids)
+    sources = node_ids[rng.integers(0, len(node_ids), n_pairs)]
+    targets = node_ids[rng.integers(0, len(node_ids), n_pairs)]
+    return LandmarkIndex(store, weight='weight'), sources, targets
+
+
+def bench_routing_alt(manifest, n_pairs=200):
+    """LandmarkIndex 点对点查询 (ALT); 建索引不计时, 约化矩阵的按需构建计时"""
+    index, sources, targets = _routing_index(manifest, n_pairs)
+    index.build()
+    start = time.perf_counter()
+    index.distances(sources, targets)
+    return time.perf_counter() - start, n_pairs, 'pairs'
+
+
+def bench_routing_exact(manifest, n_pairs=200):
+    """与 routing_alt 相同的 OD 对, 用精确 Dijkstra 回退查询"""
+    index, sources, targets = _routing_index(manifest, n_pairs)
+    start = time.perf_counter()
+    index.distances(sources, targets, exact=True)
+    return time.perf_counter() - start, n_pairs, 'pairs'
+
+
+BENCHMARKS = {
+    'standardize': bench_standardize,
+    'find_best_match': bench_find_best_match,
+    'match_rows': bench_match_rows,
+    'build_network': bench_build_network,
+    'analyzer_shortest_paths': bench_analyzer_shortest_paths,
+    'analyzer_centrality': bench_analyzer_centrality,
+    'analyzer_vulnerability': bench_analyzer_vulnerability,
+    'bridge_collapse': bench_bridge_collapse,
+    'routing_alt': bench_routing_alt,
+    'routing_exact': bench_routing_exact,
+}
+
+
+def _run_benchmark(name, manifest, repeats=REPEATS, warmup=WARMUP):
+    """在独立子进程中运行一个基准: 预热后重复计时, 脚本本身的输出被丢弃
+
+    seconds 为各次计时的中位数, samples 保留全部计时供对比时估计噪声;
+    计数器取最后一次运行 (开启 tracer)。
+    """
+    samples = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        for _ in range(warmup):
+            BENCHMARKS[name](manifest)
+        for i in range(repeats):
+            tracer = enable(name) if i == repeats - 1 else None
+            try:
+                seconds, items, unit = BENCHMARKS[name](manifest)
+            finally:
+                if tracer is not None:
+                    disable()
+            samples.append(seconds)
+    seconds = float(np.median(samples))
+    return {
+        'seconds': seconds,
+        'samples': samples,
+        'items': int(items),
+        'unit': unit,
+        'throughput': items / seconds if seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        # 匹配层、Dijkstra 调用次数等计数器, 便于区分算法变化和实现变慢
+        'counters': tracer.counters
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def load_history(path: str = HISTORY_PATH) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_benchmarks(names: Optional[List[str]] = None, scale: float = 1.0, seed: int = 42,
+                   data_dir: str = DATA_DIR, history_path: str = HISTORY_PATH,
+                   repeats: int = REPEATS, warmup: int = WARMUP) -> Dict:
+    """生成 (或复用) 合成数据, 依次运行基准并把本次结果追加到历史文件
+
+    每个基准在新的 spawn 子进程中运行 (预热 warmup 次, 计时 repeats 次),
+    峰值内存互不影响; 失败的基准记录错误信息。
+    """
+    from synthetic_data import load_manifest
+
+    names = list(names or BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {unknown}")
+    manifest = load_manifest(os.path.join(data_dir, f"scale{scale:g}_seed{seed}"), scale, seed)
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                results[name] = pool.submit(_run_benchmark, name, manifest, repeats, warmup).result()
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+        print(f"{name}: {_format(results[name])}")
+
+    history = load_history(history_path)
+    run = {
+        'id': (history[-1]['id'] + 1) if history else 1,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'scale': scale,
+        'seed': seed,
+        'repeats': repeats,
+        'warmup': warmup,
+        'counts': manifest['counts'],
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+    history.append(run)
+    with open(history_path, 'w') as f:
+        json.dump(history, f, indent=4)
+    return run
+
+
+def _format(result: Dict) -> str:
+    if 'error' in result:
+        return f"失败 ({result['error']})"
+    memory = f", 峰值内存 {result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else ''
+    samples = result.get('samples', [result['seconds']])
+    return (f"{result['seconds']:.3f}s (最快 {min(samples):.3f}s, 最慢 {max(samples):.3f}s),"
+            f" {result['throughput']:.1f} {result['unit']}/s"
+            f" ({result['items']} {result['unit']}){memory}")
+
+
+def compare_runs(base: Dict, head: Dict, threshold: float = REGRESSION_THRESHOLD,
+                 min_time_delta: float = MIN_TIME_DELTA,
+                 min_memory_delta: float = MIN_MEMORY_DELTA_MB) -> pd.DataFrame:
+    """两次运行逐个基准对比, 标记性能退化
+
+    耗时退化需同时满足: 中位数增加超过 threshold 且超过 min_time_delta 秒, 并且
+    新运行最快的一次也比旧运行最慢的一次慢 (两组计时不重叠, 排除计时噪声)。
+    峰值内存增加超过 threshold 且超过 min_memory_delta MB 时也标记为退化。
+    没有 samples 的旧记录只有一次计时, 按单个样本处理。
+    """
+    rows = []
+    for name in sorted(set(base['results']) & set(head['results'])):
+        a, b = base['results'][name], head['results'][name]
+        if 'error' in a or 'error' in b:
+            rows.append({'benchmark': name, 'regression': 'error' in b})
+            continue
+        time_ratio = b['seconds'] / a['seconds'] if a['seconds'] > 0 else np.nan
+        memory_ratio = (b['peak_rss_mb'] / a['peak_rss_mb']
+                        if a['peak_rss_mb'] and b['peak_rss_mb'] is not None else np.nan)
+        slower = (time_ratio > 1 + threshold and b['seconds'] - a['seconds'] > min_time_delta
+                  and min(b.get('samples', [b['seconds']])) > max(a.get('samples', [a['seconds']])))
+        larger = (memory_ratio > 1 + threshold
+                  and b['peak_rss_mb'] - a['peak_rss_mb'] > min_memory_delta)
+        rows.append({
+            'benchmark': name,
+            'base_seconds': a['seconds'],
+            'head_seconds': b['seconds'],
+            'time_ratio': time_ratio,
+            'base_rss_mb': a['peak_rss_mb'],
+            'head_rss_mb': b['peak_rss_mb'],
+            'memory_ratio': memory_ratio,
+            'regression': bool(slower or larger)
+        })
+    return pd.DataFrame(rows, columns=['benchmark', 'base_seconds', 'head_seconds', 'time_ratio',
+                                       'base_rss_mb', 'head_rss_mb', 'memory_ratio', 'regression'])
+
+
+def select_runs(history: List[Dict], base_id: Optional[int] = None, head_id: Optional[int] = None):
+    """默认对比最近一次运行和之前最近一次相同规模、种子的运行"""
+    by_id = {run['id']: run for run in history}
+    head = by_id[head_id] if head_id is not None else history[-1]
+    if base_id is not None:
+        return by_id[base_id], head
+    for run in reversed(history):
+        if run['id'] < head['id'] and (run['scale'], run['seed']) == (head['scale'], head['seed']):
+            return run, head
+    raise ValueError(f"No earlier run with scale={head['scale']} seed={head['seed']} to compare against")
+
+
+if __name__ == "__main__":
+    # python benchmark.py run [基准 ...] [--scale=1] [--seed=42] [--repeats=5] [--warmup=1]
+    # python benchmark.py compare [基准运行 ID 旧 新] [--threshold=0.1]
+    # 在 code1 目录下运行; 历史记录写入 benchmark_history.json
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    command = args[0] if args else 'run'
+    if command == 'run':
+        run_benchmarks(args[1:], scale=float(options.get('scale', 1)), seed=int(options.get('seed', 42)),
+                       repeats=int(options.get('repeats', REPEATS)), warmup=int(options.get('warmup', WARMUP)))
+    elif command == 'compare':
+        ids = [int(a) for a in args[1:3]]
+        base_run, head_run = select_runs(load_history(), *ids)
+        table = compare_runs(base_run, head_run, float(options.get('threshold', REGRESSION_THRESHOLD)))
+        print(f"对比运行 {base_run['id']} ({base_run['commit']}) -> {head_run['id']} ({head_run['commit']})")
+        print(table.to_string(index=False))
+        regressions = table.loc[table['regression'], 'benchmark'].tolist()
+        if regressions:
+            print(f"\n性能退化: {', '.join(regressions)}")
+        sys.exit(1 if regressions else 0)
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(2)
@@ -1,34 +1,35 @@
+import os
 import pandas as pd
+import numpy as np
 import networkx as nx
-import ast
 import json
+from graph_store import GraphStore
+from instrumentation import count, span, trace_path, tracing
+from node_lists import load_node_lists, parse_node_lists
 
 class NetworkBuilder:
-    def __init__(self):
+    def __init__(self, sidecar_dir=None):
+        # 节点列表缓存文件的目录, 默认写在 CSV 旁边
+        self.sidecar_dir = sidecar_dir
         self.nodes_dict = {}
         self.G = nx.DiGraph()
+        self.parse_errors = 0
         
     def parse_node_list(self, node_str):
         """解析节点列表字符串，处理可能的集合和列表形式"""
-        try:
-            if isinstance(node_str, (int, str)):
-                return {node_str}
-            # 移除多余的空格和引号
-            node_str = node_str.strip().strip('"')
-            # 解析节点列表
-            node_list = ast.literal_eval(node_str)
-            if isinstance(node_list, (set, list)):
-                return set(node_list)
-            return {node_list}
-        except:
-            return set()
+        node_lists = parse_node_lists([node_str])
+        self.parse_errors += node_lists.errors
+        return node_lists.row_set(0)
+        
+    def load_node_lists(self, file_path, column, df=None):
+        """读取一列节点列表 (CSR 形式), 并累计解析失败的数量"""
+        node_lists = load_node_lists(file_path, column, df, sidecar_dir=self.sidecar_dir)
+        self.parse_errors += node_lists.errors
+        return node_lists
         
     def load_nodes_data(self, file_path):
-        nodes_df = pd.read_csv(file_path)
-        nodes = set()
-        for _, row in nodes_df.iterrows():
-            node_list = self.parse_node_list(row['Nodes'])
-            nodes.update(node_list)
+        node_lists = self.load_node_lists(file_path, 'Nodes')
+        nodes = node_lists.unique_nodes().tolist()
         
         # 为每个节点分配随机坐标
         import random
@@ -42,62 +43,144 @@ class NetworkBuilder:
         
         print(f"Loaded {len(self.nodes_dict)} nodes")
         
-    def build_network(self, traffic_data_path, nodes_file_path):
-        # 加载节点数据
-        self.load_nodes_data(nodes_file_path)
+    def _edge_attributes(self, traffic_df):
+        """每行交通数据对应的边属性表"""
+        attrs = pd.DataFrame({
+            'road_name': traffic_df['Road Name'],
+            'station_id': traffic_df['Station ID'],
+            'aadt': traffic_df['AADT 2022'] if 'AADT 2022' in traffic_df else None,
+            'lanes': traffic_df['Number of Lanes'] if 'Number of Lanes' in traffic_df else None,
+            'description': traffic_df['Station Description'] if 'Station Description' in traffic_df else None
+        }).reset_index(drop=True)
+        # 特别标记 Francis Scott Key Bridge
+        attrs['is_key_bridge'] = traffic_df['Station Description'].astype(str).str.contains(
+            'Francis Scott Key Bridge', regex=False).to_numpy()
+        return attrs
+        
+    def _known_nodes(self, node_lists):
+        """展开为 (行号, 节点) 表, 只保留 nodes_dict 中的节点, 行内去重"""
+        known = np.fromiter(self.nodes_dict.keys(), dtype=np.int64, count=len(self.nodes_dict))
+        mask = np.isin(node_lists.values, known)
+        return pd.DataFrame({
+            'row': node_lists.row_ids()[mask],
+            'node': node_lists.values[mask]
+        }).drop_duplicates()
+        
+    def build_edge_table(self, traffic_df, start_lists, end_lists, max_pairs_per_row=None, seed=42):
+        """向量化生成边表 (u, v, 属性)
+        
+        每行的起点 × 终点笛卡尔积在长路段上会产生大量边, 
+        max_pairs_per_row 可限制每行最多保留的节点对数 (按固定种子随机抽样)。
+        """
+        starts = self._known_nodes(start_lists).rename(columns={'node': 'u'})
+        ends = self._known_nodes(end_lists).rename(columns={'node': 'v'})
+        pairs = starts.merge(ends, on='row')
+        
+        if max_pairs_per_row is not None and len(pairs):
+            rng = np.random.default_rng(seed)
+            pairs['_rank'] = rng.random(len(pairs))
+            pairs['_rank'] = pairs.groupby('row')['_rank'].rank(method='first')
+            pairs = pairs[pairs['_rank'] <= max_pairs_per_row].drop(columns='_rank')
+        
+        edges = pairs.sort_values('row', kind='stable').merge(
+            self._edge_attributes(traffic_df), left_on='row', right_index=True)
+        # 同一条边出现在多行时, 与逐行 add_edge 一致: 后面的行覆盖属性, 桥梁标记保留
+        is_key_bridge = edges.groupby(['u', 'v'])['is_key_bridge'].transform('any')
+        edges = edges.assign(is_key_bridge=is_key_bridge).drop_duplicates(['u', 'v'], keep='last')
+        return edges.drop(columns='row').reset_index(drop=True)
+        
+    def _add_edges_bulk(self, traffic_df, start_lists, end_lists, max_pairs_per_row=None):
+        # 添加所有出现过的已知节点
+        nodes = np.union1d(self._known_nodes(start_lists)['node'], self._known_nodes(end_lists)['node'])
+        self.G.add_nodes_from((node, {'pos': self.nodes_dict[node]}) for node in nodes.tolist())
+        
+        # 一次性添加所有边
+        edges = self.build_edge_table(traffic_df, start_lists, end_lists, max_pairs_per_row)
+        attr_columns = [c for c in edges.columns if c not in ('u', 'v')]
+        records = edges[attr_columns].astype(object).to_dict('records')
+        for record in records:
+            if not record['is_key_bridge']:
+                del record['is_key_bridge']
+        self.G.add_edges_from(zip(edges['u'].tolist(), edges['v'].tolist(), records))
         
-        # 加载交通数据
-        traffic_df = pd.read_csv(traffic_data_path)
+    def _add_edges_rowwise(self, traffic_df, start_lists, end_lists):
+        """逐行创建节点和边 (旧实现, 用于核对批量模式的结果)"""
+        for i, (_, row) in enumerate(traffic_df.iterrows()):
+            start_nodes = start_lists.row_set(i)
+            end_nodes = end_lists.row_set(i)
+            
+            # 添加所有节点
+            for node in start_nodes | end_nodes:
+                if node not in self.G:
+                    if node in self.nodes_dict:
+                        self.G.add_node(node, pos=self.nodes_dict[node])
+            
+            # 创建边
+            for start in start_nodes:
+                for end in end_nodes:
+                    if start in self.nodes_dict and end in self.nodes_dict:
+                        # 添加边属性
+                        edge_data = {
+                            'road_name': row['Road Name'],
+                            'station_id': row['Station ID'],
+                            'aadt': row['AADT 2022'] if 'AADT 2022' in row else None,
+                            'lanes': row['Number of Lanes'] if 'Number of Lanes' in row else None,
+                            'description': row['Station Description'] if 'Station Description' in row else None
+                        }
+                        
+                        # 特别标记 Francis Scott Key Bridge
+                        if 'Francis Scott Key Bridge' in str(row['Station Description']):
+                            edge_data['is_key_bridge'] = True
+                        
+                        self.G.add_edge(start, end, **edge_data)
         
-        # 创建边
-        for _, row in traffic_df.iterrows():
-            try:
-                start_nodes = self.parse_node_list(row['node start']) if pd.notna(row['node start']) else set()
-                end_nodes = self.parse_node_list(row['node(s) end']) if pd.notna(row['node(s) end']) else set()
+    def build_network(self, traffic_data_path, nodes_file_path, bulk=True, max_pairs_per_row=None,
+                      output_path="data/processed/traffic_network.graph"):
+        with tracing(trace_path(output_path), 'build_network'):
+            # 加载节点数据
+            with span('build.load_nodes') as nodes_span:
+                self.load_nodes_data(nodes_file_path)
+                nodes_span.set(items=len(self.nodes_dict))
+            
+            # 加载交通数据
+            with span('build.load_traffic') as load_span:
+                traffic_df = pd.read_csv(traffic_data_path)
                 
-                # 添加所有节点
-                for node in start_nodes | end_nodes:
-                    if node not in self.G:
-                        if node in self.nodes_dict:
-                            self.G.add_node(node, pos=self.nodes_dict[node])
+                start_lists = self.load_node_lists(traffic_data_path, 'node start', traffic_df)
+                end_lists = self.load_node_lists(traffic_data_path, 'node(s) end', traffic_df)
+                load_span.set(items=len(traffic_df))
+            count('build.parse_errors', self.parse_errors)
+            
+            with span('build.add_edges', items=len(traffic_df), bulk=bulk):
+                if bulk:
+                    self._add_edges_bulk(traffic_df, start_lists, end_lists, max_pairs_per_row)
+                else:
+                    self._add_edges_rowwise(traffic_df, start_lists, end_lists)
+            count('build.nodes', self.G.number_of_nodes())
+            count('build.edges', self.G.number_of_edges())
+            
+            if self.parse_errors:
+                print(f"Failed to parse {self.parse_errors} node lists")
+            print(f"Network built with {self.G.number_of_nodes()} nodes and {self.G.number_of_edges()} edges")
+            
+            # 分析网络连通性
+            with span('build.connectivity', items=self.G.number_of_nodes()):
+                components = list(nx.strongly_connected_components(self.G))
+                print(f"Number of strongly connected components: {len(components)}")
+                print(f"Largest component size: {len(max(components, key=len))}")
                 
-                # 创建边
-                for start in start_nodes:
-                    for end in end_nodes:
-                        if start in self.nodes_dict and end in self.nodes_dict:
-                            # 添加边属性
-                            edge_data = {
-                                'road_name': row['Road Name'],
-                                'station_id': row['Station ID'],
-                                'aadt': row['AADT 2022'] if 'AADT 2022' in row else None,
-                                'lanes': row['Number of Lanes'] if 'Number of Lanes' in row else None,
-                                'description': row['Station Description'] if 'Station Description' in row else None
-                            }
-                            
-                            # 特别标记 Francis Scott Key Bridge
-                            if 'Francis Scott Key Bridge' in str(row['Station Description']):
-                                edge_data['is_key_bridge'] = True
-                            
-                            self.G.add_edge(start, end, **edge_data)
-            except (ValueError, SyntaxError) as e:
-                continue
-        
-        print(f"Network built with {self.G.number_of_nodes()} nodes and {self.G.number_of_edges()} edges")
-        
-        # 分析网络连通性
-        components = list(nx.strongly_connected_components(self.G))
-        print(f"Number of strongly connected components: {len(components)}")
-        print(f"Largest component size: {len(max(components, key=len))}")
-        
-        # 分析节点度数
-        degrees = [d for n, d in self.G.degree()]
-        avg_degree = sum(degrees) / len(degrees)
-        print(f"Average degree: {avg_degree:.2f}")
-        print(f"Maximum degree: {max(degrees)}")
-        print(f"Minimum degree: {min(degrees)}")
-        
-        # 保存网络
-        nx.write_graphml(self.G, "data/processed/traffic_network.graphml")
+                # 分析节点度数
+                degrees = [d for n, d in self.G.degree()]
+                avg_degree = sum(degrees) / len(degrees)
+                print(f"Average degree: {avg_degree:.2f}")
+                print(f"Maximum degree: {max(degrees)}")
+                print(f"Minimum degree: {min(degrees)}")
+            
+            # 保存网络: 二进制格式供分析脚本内存映射读取, GraphML 用于与其他工具交换
+            with span('build.save', items=self.G.number_of_edges()):
+                store = GraphStore.from_networkx(self.G)
+                store.save(output_path)
+                store.to_graphml(f"{os.path.splitext(output_path)[0]}.graphml")
 
 if __name__ == "__main__":
     builder = NetworkBuilder()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# 道路类型: (类别名称, highway 中包含的关键字, 单位通行能力, 限速缺失时的默认速度)
+# 按顺序匹配, 与原先逐行判断的优先级一致
+ROAD_CLASSES = [
+    ('freeway', ('motorway', 'trunk'), 2200, 70),      # 高速公路
+    ('arterial', ('primary', 'secondary'), 1800, 35),  # 主干道
+    ('street', ('residential', 'tertiary'), 1500, 25),  # 城市街道
+]
+DEFAULT_CLASS = ('other', (), 1600, 40)  # 默认值
+CLASS_NAMES = [c[0] for c in ROAD_CLASSES] + [DEFAULT_CLASS[0]]
+BASE_CAPACITY = np.array([c[2] for c in ROAD_CLASSES] + [DEFAULT_CLASS[2]], dtype=np.float64)
+DEFAULT_SPEED = np.array([c[3] for c in ROAD_CLASSES] + [DEFAULT_CLASS[3]], dtype=np.float64)
+
+
+def _classify(highway) -> int:
+    if not isinstance(highway, str):
+        return len(ROAD_CLASSES)
+    for code, (_, keywords, _, _) in enumerate(ROAD_CLASSES):
+        if any(k in highway for k in keywords):
+            return code
+    return len(ROAD_CLASSES)
+
+
+def road_class_codes(highway) -> np.ndarray:
+    """highway 列 -> 道路类别编码 (每种 highway 取值只判断一次)"""
+    categories = highway if isinstance(highway, pd.Categorical) else pd.Categorical(highway)
+    lookup = np.array([_classify(c) for c in categories.categories] + [len(ROAD_CLASSES)], dtype=np.int8)
+    # 缺失值的编码为 -1, 对应 lookup 的最后一项 (默认类别)
+    return lookup[categories.codes]
+
+
+def lane_capacity(highway, maxspeed) -> np.ndarray:
+    """每车道单位通行能力: 基准能力 × 速度系数 (基准速度 50, 每增加 10 增加 2%)"""
+    codes = road_class_codes(highway)
+    speed = pd.to_numeric(pd.Series(maxspeed), errors='coerce').to_numpy(dtype=np.float64)
+    # 限速为 0 时按道路类别取默认速度; 与原实现一样只取整数部分
+    speed = np.trunc(np.where(speed == 0, DEFAULT_SPEED[codes], speed))
+    speed_factor = 1 + (speed - 50) / 500
+    return BASE_CAPACITY[codes] * speed_factor
+
+
+def edge_capacity(edges: pd.DataFrame, lanes_col='lanes', highway_col='highway',
+                  maxspeed_col='maxspeed') -> np.ndarray:
+    """总通行能力 = 车道数 × 每车道单位通行能力, 与边表逐行对齐"""
+    lanes = pd.to_numeric(edges[lanes_col], errors='coerce').to_numpy(dtype=np.float64)
+    return lanes * lane_capacity(edges[highway_col].to_numpy(), edges[maxspeed_col].to_numpy())
+
+
+def top_capacity(edges: pd.DataFrame, n=10, capacity_col='capacity') -> pd.DataFrame:
+    """容量最大的 n 条道路 (同一 (u, v) 以最后一行为准), 按容量降序"""
+    edges = edges.drop_duplicates(['u', 'v'], keep='last')
+    values = edges[capacity_col].to_numpy(dtype=np.float64)
+    values = np.where(np.isnan(values), -np.inf, values)
+    n = min(n, len(values))
+    if n == 0:
+        return edges.iloc[:0]
+    part = np.argpartition(-values, n - 1)[:n]
+    order = part[np.argsort(-values[part], kind='stable')]
+    return edges.iloc[order]
+
+
+MPH_TO_MPS = 0.44704
+
+
+def free_flow_time(length, highway, maxspeed) -> np.ndarray:
+    """自由流行驶时间 (秒) = 长度 (米) / 限速 (英里/时); 限速缺失或为 0 时按道路类别取默认速度"""
+    codes = road_class_codes(highway)
+    speed = pd.to_numeric(pd.Series(maxspeed), errors='coerce').to_numpy(dtype=np.float64)
+    speed = np.where(np.isfinite(speed) & (speed > 0), speed, DEFAULT_SPEED[codes])
+    length = pd.to_numeric(pd.Series(length), errors='coerce').to_numpy(dtype=np.float64)
+    return length / (speed * MPH_TO_MPS)
@@ -0,0 +1,202 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, traced
+
+TARGETS = ['AADT', 'AAWDT']
+STATION_COLUMNS = ['Road_Name', 'Route_Number', 'Road_Section', 'Station_Description',
+                   'County_Name', 'Municipality_Name']
+PREDICTION_COLUMNS = ['Station_ID', 'Road_Name', 'Year', 'AADT_Prediction', 'AAWDT_Prediction',
+                      'Route_Number', 'Road_Section', 'Station_Description', 'County_Name',
+                      'Municipality_Name']
+METHODS = ('linear', 'robust', 'damped')
+
+
+def _padded(history: pd.DataFrame, column: str):
+    """长表 -> (测站 × 观测) 的补齐矩阵, 缺失位置为 NaN; 返回 (测站 ID, 年份矩阵, 数值矩阵)"""
+    codes, stations = pd.factorize(history['Station_ID'], sort=False)
+    position = history.groupby(codes).cumcount().to_numpy()
+    width = int(position.max()) + 1 if len(position) else 0
+    years = np.full((len(stations), width), np.nan)
+    values = np.full((len(stations), width), np.nan)
+    years[codes, position] = history['Year'].to_numpy(dtype=np.float64)
+    values[codes, position] = history[column].to_numpy(dtype=np.float64)
+    return stations, years, values
+
+
+def _linear(years, values):
+    """逐测站最小二乘直线 (向量化的闭式解); 只有一个观测时斜率为 0"""
+    n = np.sum(~np.isnan(values), axis=1)
+    x_mean = np.nanmean(years, axis=1)
+    y_mean = np.nanmean(values, axis=1)
+    dx = years - x_mean[:, None]
+    dy = values - y_mean[:, None]
+    sxx = np.nansum(dx * dx, axis=1)
+    sxy = np.nansum(dx * dy, axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=(sxx > 0) & (n > 1))
+    return slope, y_mean - slope * x_mean
+
+
+def _robust(years, values):
+    """逐测站 Theil-Sen 直线: 斜率取所有观测对斜率的中位数, 截距取残差中位数"""
+    dx = years[:, None, :] - years[:, :, None]
+    dy = values[:, None, :] - values[:, :, None]
+    upper = np.triu(np.ones(dx.shape[1:], dtype=bool), k=1)
+    pair_slopes = np.where(upper & (dx != 0), dy / np.where(dx == 0, 1, dx), np.nan)
+    pair_slopes = pair_slopes.reshape(len(years), -1)
+    has_pair = (~np.isnan(pair_slopes)).any(axis=1)
+    slope = np.zeros(len(years))
+    if has_pair.any():
+        slope[has_pair] = np.nanmedian(pair_slopes[has_pair], axis=1)
+    intercept = np.nanmedian(values - slope[:, None] * years, axis=1)
+    return slope, intercept
+
+
+def fit_trends(history: pd.DataFrame, method: str = 'robust', damping: float = 0.8) -> pd.DataFrame:
+    """一次性拟合所有测站的趋势模型, 每个测站一行参数
+
+    linear 为最小二乘直线, robust 为 Theil-Sen 直线, damped 在 robust 斜率的
+    基础上从最后一个观测年份开始按 damping 逐年衰减。
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    params = None
+    for target in TARGETS:
+        stations, years, values = _padded(history, target)
+        slope, intercept = (_linear if method == 'linear' else _robust)(years, values)
+        if params is None:
+            params = pd.DataFrame({'Station_ID': stations,
+                                   'last_year': np.nanmax(years, axis=1),
+                                   'n_years': np.sum(~np.isnan(years), axis=1)})
+        params[f'{target}_slope'] = slope
+        params[f'{target}_intercept'] = intercept
+    params['method'] = method
+    params['damping'] = damping if method == 'damped' else 1.0
+    count('forecast.model_fits', len(params))
+    return params
+
+
+def predict_trends(params: pd.DataFrame, years: Sequence[int]) -> Dict[str, np.ndarray]:
+    """参数表 × 预测年份 -> {目标: (测站数 × 年份数) 预测矩阵}"""
+    years = np.asarray(years, dtype=np.float64)[None, :]
+    last = params['last_year'].to_numpy()[:, None]
+    phi = params['damping'].to_numpy()[:, None]
+    # 阻尼趋势: 最后一年之后第 h 年的增量为 slope * (phi + phi^2 + ... + phi^h)
+    h = np.maximum(years - last, 0)
+    damped_h = np.where(phi < 1, phi * (1 - phi ** h) / np.where(phi < 1, 1 - phi, 1), h)
+    result = {}
+    for target in TARGETS:
+        slope = params[f'{target}_slope'].to_numpy()[:, None]
+        intercept = params[f'{target}_intercept'].to_numpy()[:, None]
+        base = intercept + slope * np.minimum(years, last)
+        # 交通量不会为负
+        result[target] = np.maximum(base + slope * damped_h, 0)
+    return result
+
+
+def _fit_chunk(args):
+    history, method, damping, years = args
+    params = fit_trends(history, method, damping)
+    return params, predict_trends(params, years)
+
+
+def _fit_all(history, method, damping, years, workers):
+    """按测站切块并行拟合 (块之间互不依赖), workers == 1 时直接在本进程计算"""
+    workers = workers or os.cpu_count() or 1
+    stations = history['Station_ID'].unique()
+    if workers == 1 or len(stations) < 2 * workers:
+        return _fit_chunk((history, method, damping, years))
+    groups = np.array_split(np.arange(len(stations)), workers)
+    codes = pd.factorize(history['Station_ID'], sort=False)[0]
+    chunks = [(history[np.isin(codes, g)], method, damping, years) for g in groups if len(g)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_fit_chunk, chunks))
+    params = pd.concat([r[0] for r in results], ignore_index=True)
+    predictions = {t: np.vstack([r[1][t] for r in results]) for t in TARGETS}
+    return params, predictions
+
+
+def fit_global_xgboost(history: pd.DataFrame, params: pd.DataFrame, **xgb_params):
+    """跨测站的全局 XGBoost 残差模型 (可选依赖)
+
+    特征为 年份偏移、测站趋势斜率和水平、县编码; 目标为观测值与测站趋势之比,
+    预测时与逐测站趋势相乘。
+    """
+    from xgboost import XGBRegressor
+
+    counties = sorted(history['County_Name'].astype(str).unique())
+    models = {'counties': counties}
+    for target in TARGETS:
+        X, trend = _global_features(history, params, history['Year'].to_numpy(), target, counties)
+        ratio = history[target].to_numpy() / np.where(trend > 0, trend, np.nan)
+        ok = np.isfinite(ratio)
+        model = XGBRegressor(objective='reg:squarederror', n_estimators=200, max_depth=4,
+                             **xgb_params)
+        model.fit(X[ok], ratio[ok])
+        count('forecast.xgboost_fits')
+        models[target] = model
+    return models
+
+
+def _global_features(rows: pd.DataFrame, params: pd.DataFrame, years, target, counties):
+    p = params.set_index('Station_ID').loc[rows['Station_ID'].to_numpy()]
+    slope = p[f'{target}_slope'].to_numpy()
+    intercept = p[f'{target}_intercept'].to_numpy()
+    years = np.asarray(years, dtype=np.float64)
+    trend = intercept + slope * years
+    level = intercept + slope * p['last_year'].to_numpy()
+    county = pd.Categorical(rows['County_Name'].astype(str), categories=counties).codes
+    X = np.column_stack([years - p['last_year'].to_numpy(), slope / np.where(level > 0, level, 1),
+                         np.log1p(np.maximum(level, 0)), county])
+    return X, trend
+
+
+def station_metadata(history: pd.DataFrame) -> pd.DataFrame:
+    """每个测站最后一条历史记录中的元数据, 以 Station_ID 为索引"""
+    latest = history.drop_duplicates('Station_ID', keep='last').set_index('Station_ID')
+    return latest[STATION_COLUMNS]
+
+
+def prediction_frame(params: pd.DataFrame, metadata: pd.DataFrame, years: Sequence[int],
+                     predictions: Optional[Dict[str, np.ndarray]] = None) -> pd.DataFrame:
+    """参数表 + 测站元数据 -> traffic_predictions_*.csv 格式的预测表"""
+    years = list(years)
+    if predictions is None:
+        predictions = predict_trends(params, years)
+    metadata = metadata.reindex(params['Station_ID'])
+    out = pd.DataFrame({
+        'Station_ID': np.repeat(params['Station_ID'].to_numpy(), len(years)),
+        'Year': np.tile(years, len(params))
+    })
+    for target in TARGETS:
+        out[f'{target}_Prediction'] = predictions[target].ravel()
+    for column in STATION_COLUMNS:
+        out[column] = np.repeat(metadata[column].to_numpy(), len(years))
+    return out[PREDICTION_COLUMNS]
+
+
+@traced('forecast.forecast_stations')
+def forecast_stations(history: pd.DataFrame, years: Sequence[int] = (2023, 2024), method: str = 'robust',
+                      damping: float = 0.8, workers: Optional[int] = 1, model: str = 'trend') -> pd.DataFrame:
+    """批量预测所有测站在 years 各年的 AADT / AAWDT
+
+    输出与 traffic_predictions_*.csv 相同的列, 每个测站每个年份一行,
+    测站元数据取该测站最后一条历史记录。model='xgboost' 时在趋势之上叠加
+    全局 XGBoost 模型。
+    """
+    years = list(years)
+    params, predictions = _fit_all(history, method, damping, years, workers)
+    out = prediction_frame(params, station_metadata(history), years, predictions)
+
+    if model == 'xgboost':
+        models = fit_global_xgboost(history, params)
+        for target in TARGETS:
+            X, _ = _global_features(out, params, out['Year'].to_numpy(), target, models['counties'])
+            out[f'{target}_Prediction'] = out[f'{target}_Prediction'] * models[target].predict(X)
+    elif model != 'trend':
+        raise ValueError(f"Unknown model {model!r}, expected 'trend' or 'xgboost'")
+    return out[PREDICTION_COLUMNS]
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import sqlite3
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from forecast import TARGETS, STATION_COLUMNS, fit_trends, prediction_frame, station_metadata
+from instrumentation import annotate, count, traced
+
+# 拟合方法或参数表结构变化时递增, 旧模型会全部重新训练
+REGISTRY_VERSION = 1
+
+PARAM_COLUMNS = ['last_year', 'n_years'] + [f'{t}_{p}' for t in TARGETS for p in ('slope', 'intercept')]
+
+
+def history_hashes(history: pd.DataFrame, salt: str = '') -> pd.Series:
+    """每个测站历史 (年份、AADT、AAWDT) 的内容哈希, 以 Station_ID 为索引"""
+    rows = history[['Year'] + TARGETS].astype(np.float64)
+    row_hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    hashes = {}
+    for station_id, idx in history.groupby('Station_ID', sort=False).indices.items():
+        digest = hashlib.sha256(salt.encode())
+        digest.update(row_hashes[idx].tobytes())
+        hashes[station_id] = digest.hexdigest()
+    return pd.Series(hashes, name='history_hash')
+
+
+def _json_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ForecastRegistry:
+    """按测站保存趋势模型的本地注册表 (SQLite)
+
+    模型以 (测站 ID, 历史数据哈希) 为键; update() 只重新拟合历史发生变化或
+    新出现的测站, 其余测站直接复用已保存的模型。历史哈希只包含年份和流量,
+    不影响拟合的元数据 (路名、路段描述等) 变化时不重新训练, 只更新保存的元数据;
+    新历史中已没有的测站从注册表中删除。已计算过的年份预测也会保存,
+    forecast() / predict() 只读注册表 (即最近一次 update() 时的历史), 不需要原始 CSV。
+    """
+
+    def __init__(self, db_path: str = 'forecast_registry.sqlite', method: str = 'robust',
+                 damping: float = 0.8):
+        self.db_path = db_path
+        self.method = method
+        self.damping = damping
+        self.salt = f"v{REGISTRY_VERSION}:{method}:{damping}:"
+        self.stats = {'stations': 0, 'reused': 0, 'retrained': 0, 'relabeled': 0, 'removed': 0}
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS models (
+                station_id TEXT PRIMARY KEY,
+                history_hash TEXT NOT NULL,
+                method TEXT NOT NULL,
+                damping REAL NOT NULL,
+                {', '.join(f'{c} REAL' for c in PARAM_COLUMNS)},
+                metadata TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS predictions (
+                station_id TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                history_hash TEXT NOT NULL,
+                aadt REAL,
+                aawdt REAL,
+                PRIMARY KEY (station_id, year)
+            )
+        ''')
+        self.conn.commit()
+
+    def _stored(self) -> pd.DataFrame:
+        stored = pd.read_sql_query('SELECT station_id, history_hash, metadata FROM models', self.conn)
+        return stored.set_index('station_id')
+
+    @traced('registry.update')
+    def update(self, history: pd.DataFrame) -> Dict:
+        """同步注册表: 只重新拟合历史哈希变化的测站, 返回复用 / 重训 / 删除统计"""
+        history = history.assign(Station_ID=history['Station_ID'].astype(str))
+        hashes = history_hashes(history, self.salt)
+        stored = self._stored()
+        removed = stored.index.difference(hashes.index)
+        stored = stored.reindex(hashes.index)
+        changed = hashes.index[stored['history_hash'].to_numpy() != hashes.to_numpy()]
+        metadata = {
+            station_id: json.dumps({c: _json_value(v) for c, v in row.items()})
+            for station_id, row in station_metadata(history).iterrows()
+        }
+
+        if len(changed):
+            subset = history[history['Station_ID'].isin(changed)]
+            params = fit_trends(subset, self.method, self.damping).set_index('Station_ID')
+            rows = [
+                (station_id, hashes[station_id], self.method, float(params.at[station_id, 'damping']))
+                + tuple(float(params.at[station_id, c]) for c in PARAM_COLUMNS)
+                + (metadata[station_id],)
+                for station_id in params.index
+            ]
+            placeholders = ', '.join('?' * (4 + len(PARAM_COLUMNS) + 1))
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO models (station_id, history_hash, method, damping, '
+                f'{", ".join(PARAM_COLUMNS)}, metadata) VALUES ({placeholders})', rows
+            )
+        # 历史不变、只有元数据变化的测站: 模型和预测值保留, 只更新元数据
+        relabeled = [
+            (metadata[station_id], station_id)
+            for station_id, text in stored['metadata'].drop(changed).items()
+            if text != metadata[station_id]
+        ]
+        self.conn.executemany('UPDATE models SET metadata = ? WHERE station_id = ?', relabeled)
+        # 旧模型的预测作废; 已删除测站的模型一并删除
+        self.conn.executemany('DELETE FROM models WHERE station_id = ?',
+                              [(station_id,) for station_id in removed])
+        self.conn.executemany('DELETE FROM predictions WHERE station_id = ?',
+                              [(station_id,) for station_id in changed.append(removed)])
+        self.conn.commit()
+
+        self.stats = {
+            'stations': len(hashes),
+            'reused': len(hashes) - len(changed),
+            'retrained': len(changed),
+            'relabeled': len(relabeled),
+            'removed': len(removed)
+        }
+        annotate(items=len(hashes))
+        count('registry.reused', self.stats['reused'])
+        count('registry.retrained', self.stats['retrained'])
+        return self.stats
+
+    def load_models(self, station_ids: Optional[Sequence[str]] = None):
+        """读取保存的模型, 返回 (参数表, 元数据表)"""
+        models = pd.read_sql_query('SELECT * FROM models ORDER BY station_id', self.conn)
+        if station_ids is not None:
+            wanted = [str(s) for s in station_ids]
+            models = models.set_index('station_id').reindex(wanted).dropna(subset=['history_hash'])
+            models = models.reset_index()
+        params = models.rename(columns={'station_id': 'Station_ID'})
+        params['n_years'] = params['n_years'].astype(int)
+        metadata = pd.DataFrame(
+            [json.loads(m) if m else {} for m in models['metadata']],
+            index=models['station_id'], columns=STATION_COLUMNS
+        )
+        return params[['Station_ID'] + PARAM_COLUMNS + ['method', 'damping', 'history_hash']], metadata
+
+    @traced('registry.forecast')
+    def forecast(self, years: Sequence[int], station_ids: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """用保存的模型预测, 输出 traffic_predictions_*.csv 格式; 新算出的预测会写回注册表"""
+        years = [int(y) for y in years]
+        params, metadata = self.load_models(station_ids)
+        if params.empty:
+            return prediction_frame(params, metadata, years)
+
+        cached = pd.read_sql_query(
+            f'SELECT station_id, year, history_hash, aadt, aawdt FROM predictions '
+            f'WHERE year IN ({", ".join("?" * len(years))})', self.conn, params=years
+        )
+        out = prediction_frame(params, metadata, years)
+        key = out[['Station_ID', 'Year']].merge(
+            cached.rename(columns={'station_id': 'Station_ID', 'year': 'Year'}), how='left'
+        )
+        expected_hash = np.repeat(params['history_hash'].to_numpy(), len(years))
+        hit = (key['history_hash'].to_numpy() == expected_hash)
+        if hit.any():
+            out.loc[hit, 'AADT_Prediction'] = key.loc[hit, 'aadt'].to_numpy(dtype=np.float64)
+            out.loc[hit, 'AAWDT_Prediction'] = key.loc[hit, 'aawdt'].to_numpy(dtype=np.float64)
+
+        new_rows = [
+            (station_id, int(year), h, float(aadt), float(aawdt))
+            for station_id, year, h, aadt, aawdt in zip(
+                out.loc[~hit, 'Station_ID'], out.loc[~hit, 'Year'], expected_hash[~hit],
+                out.loc[~hit, 'AADT_Prediction'], out.loc[~hit, 'AAWDT_Prediction'])
+        ]
+        if new_rows:
+            self.conn.executemany('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)', new_rows)
+            self.conn.commit()
+        annotate(items=len(out))
+        count('registry.cached_predictions', hit.sum())
+        return out
+
+    def predict(self, station_id: str, year: int) -> Dict:
+        """单个测站、单个年份的预测 {'AADT': ..., 'AAWDT': ...}; 未注册的测站报 KeyError"""
+        out = self.forecast([year], [station_id])
+        if out.empty:
+            raise KeyError(f"Station {station_id} is not in the registry")
+        row = out.iloc[0]
+        return {t: float(row[f'{t}_Prediction']) for t in TARGETS}
+
+    def close(self):
+        self.conn.close()
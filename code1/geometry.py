@@ -0,0 +1,102 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS = 6371000  # 地球半径(米)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """向量化的球面距离 (米), 参数可以是标量或可广播的数组"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _to_unit_xyz(lat, lon):
+    """经纬度 -> 单位球面上的三维坐标"""
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    return np.column_stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+
+
+def _chord(meters):
+    """球面距离 -> 单位球上的弦长 (单调对应, 因此 KD 树半径查询是精确的)"""
+    return 2 * np.sin(np.asarray(meters, dtype=np.float64) / (2 * EARTH_RADIUS))
+
+
+class NodeGeometry:
+    """路网节点的坐标索引
+
+    osmid 排序后用二分查找定位坐标, 半径查询和最近节点查询使用单位球面三维
+    坐标上的 KD 树。坐标约定与 OSM 节点表一致: x 为经度, y 为纬度; 对外的
+    中心点参数为 (纬度, 经度)。
+    """
+
+    def __init__(self, osmids, lat, lon):
+        osmids = np.asarray(osmids, dtype=np.int64)
+        # 同一节点可能在合并后的表中出现多次, 保留第一次出现的坐标
+        osmids, first = np.unique(osmids, return_index=True)
+        self.osmids = osmids
+        self.lat = np.asarray(lat, dtype=np.float64)[first]
+        self.lon = np.asarray(lon, dtype=np.float64)[first]
+        self._tree = None
+
+    @classmethod
+    def from_frame(cls, nodes_df, id_col='osmid', x_col='x', y_col='y'):
+        return cls(nodes_df[id_col].to_numpy(), nodes_df[y_col].to_numpy(), nodes_df[x_col].to_numpy())
+
+    def __len__(self):
+        return len(self.osmids)
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(_to_unit_xyz(self.lat, self.lon))
+        return self._tree
+
+    def index(self, osmids):
+        """osmid -> 行号, 不存在的节点返回 -1"""
+        osmids = np.asarray(osmids, dtype=np.int64)
+        idx = np.minimum(np.searchsorted(self.osmids, osmids), max(len(self) - 1, 0))
+        return np.where((len(self) > 0) & (self.osmids[idx] == osmids), idx, -1)
+
+    def coords(self, osmids):
+        """返回 (纬度数组, 经度数组); 不存在的节点会报错"""
+        idx = self.index(osmids)
+        if (idx < 0).any():
+            missing = np.asarray(osmids)[idx < 0]
+            raise KeyError(f"Unknown osmids: {missing[:5].tolist()}")
+        return self.lat[idx], self.lon[idx]
+
+    def coord(self, osmid):
+        """单个节点的 (纬度, 经度)"""
+        lat, lon = self.coords([osmid])
+        return float(lat[0]), float(lon[0])
+
+    def distances_from(self, center):
+        """所有节点到 center (纬度, 经度) 的距离 (米)"""
+        return haversine(center[0], center[1], self.lat, self.lon)
+
+    def within(self, center, radius):
+        """距离 center 严格小于 radius 米的节点 osmid (按 osmid 排序)"""
+        xyz = _to_unit_xyz([center[0]], [center[1]])[0]
+        candidates = np.array(sorted(self.tree.query_ball_point(xyz, _chord(radius) * (1 + 1e-9))), dtype=np.int64)
+        # 边界附近用 haversine 复核, 与逐点计算的结果保持一致
+        inside = haversine(center[0], center[1], self.lat[candidates], self.lon[candidates]) < radius
+        return self.osmids[candidates[inside]]
+
+    def nearest(self, lat, lon, k=1):
+        """离给定坐标最近的 k 个节点, 返回 (osmid 数组, 距离数组 (米))"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        chord, idx = self.tree.query(_to_unit_xyz(lat, lon), k=k)
+        meters = 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+        return self.osmids[idx], meters
+
+    def subset(self, osmids):
+        """只包含给定节点 (例如图中的节点) 的索引"""
+        idx = self.index(osmids)
+        idx = idx[idx >= 0]
+        return NodeGeometry(self.osmids[idx], self.lat[idx], self.lon[idx])
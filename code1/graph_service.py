@@ -0,0 +1,319 @@
+import asyncio
+import copy
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from capacity import DEFAULT_CLASS
+from graph_store import load_graph, read_meta
+from scenarios import ScenarioEngine
+from shortest_paths import BatchedShortestPaths
+
+_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+# 工作进程中的图和按需构建的引擎; 重新加载时整体替换为新的字典 (不原地清空),
+# 正在执行的查询继续使用它开始时取到的那一份
+_state = {}
+
+
+def _init_worker(network_path):
+    global _state
+    _state = {'store': load_graph(network_path)}
+
+
+def _engine(state, weight):
+    key = ('engine', weight)
+    if key not in state:
+        state[key] = BatchedShortestPaths(state['store'], weight=weight)
+    return state[key]
+
+
+def _graph(state):
+    if 'G' not in state:
+        state['G'] = state['store'].to_networkx()
+    return state['G']
+
+
+def _lengths(values):
+    """inf -> None, 便于 JSON 序列化"""
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def _shortest_paths(state, sources, targets, weight='distance', level_attr=None):
+    result = _engine(state, weight).query(sources, targets, level_attr=level_attr)
+    out = {'length': _lengths(result['length'])}
+    if level_attr is not None:
+        out['levels'] = result['levels']
+        out['level_counts'] = result['level_counts'].tolist()
+    return out
+
+
+def _od_impact(state, sources, targets, removed_edges, weight='distance'):
+    engine = ScenarioEngine(state['store'], sources, targets, weight=weight)
+    result = engine.run([tuple(e) for e in removed_edges])
+    return {
+        'before': _lengths(result['before']),
+        'after': _lengths(result['after']),
+        'ratio': _lengths(result['ratio']),
+        'impact': result['impact'].tolist(),
+        'recomputed': int(result['recomputed']),
+        'summary': engine.summarize(result)
+    }
+
+
+def _capacity(state, edges, column='capacity'):
+    """(u, v) 列表的通行能力; 图中没有 capacity 列时按 车道数 × 默认单位通行能力 估算"""
+    store = state['store']
+    u = store.node_index([e[0] for e in edges])
+    v = store.node_index([e[1] for e in edges])
+    ids = np.array([store.edge_index(a, b) if a >= 0 and b >= 0 else -1
+                    for a, b in zip(u.tolist(), v.tolist())], dtype=np.int64)
+    if column in store.edge_columns:
+        values = np.asarray(store.edge_columns[column], dtype=np.float64)
+    elif 'lanes' in store.edge_columns:
+        values = np.asarray(store.edge_columns['lanes'], dtype=np.float64) * DEFAULT_CLASS[2]
+    else:
+        raise ValueError(f"Graph has no {column!r} or 'lanes' edge attribute")
+    found = ids >= 0
+    capacity = np.full(len(ids), np.nan)
+    capacity[found] = values[ids[found]]
+    return {'capacity': [float(c) if np.isfinite(c) else None for c in capacity],
+            'found': found.tolist()}
+
+
+def _centrality_top_k(state, metric='closeness', k=10, sample_size=500, seed=42):
+    from centrality import sampled_betweenness, top_k_closeness
+    import networkx as nx
+
+    G = _graph(state)
+    if metric == 'closeness':
+        scores = top_k_closeness(G, k, seed=seed, workers=1)
+    elif metric == 'betweenness':
+        scores, _ = sampled_betweenness(G, sample_size, seed=seed, workers=1)
+    elif metric == 'degree':
+        scores = nx.degree_centrality(G)
+    else:
+        raise ValueError(f"Unknown centrality metric: {metric}")
+    top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+    return {'nodes': [n.item() if isinstance(n, np.generic) else n for n, _ in top],
+            'scores': [float(s) for _, s in top]}
+
+
+# 路径 -> (计算函数, 参数名)
+ENDPOINTS = {
+    '/shortest_paths': (_shortest_paths, ('sources', 'targets', 'weight', 'level_attr')),
+    '/od_impact': (_od_impact, ('sources', 'targets', 'removed_edges', 'weight')),
+    '/capacity': (_capacity, ('edges', 'column')),
+    '/centrality_top_k': (_centrality_top_k, ('metric', 'k', 'sample_size', 'seed')),
+}
+
+
+def _query_value(text):
+    """GET 参数按 JSON 解析, 不是合法 JSON 时按字符串处理 (如 weight=distance)"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _run(name, params):
+    func, _ = ENDPOINTS[name]
+    return func(_state, **params)
+
+
+def graph_signature(network_path: str) -> Optional[str]:
+    """图文件的大小和修改时间; GraphStore 目录用 meta.json 中每次保存唯一的 generation
+
+    GraphStore.save() 整体替换目录时, 两次改名之间目录短暂不存在, 此时返回 None
+    (调用方沿用当前的图, 下次查询再检查)。
+    """
+    if os.path.isdir(network_path) or not os.path.exists(network_path):
+        try:
+            meta = read_meta(network_path)
+        except FileNotFoundError:
+            return None
+        if 'generation' in meta:
+            return f"generation:{meta['generation']}"
+    paths = [network_path]
+    if os.path.isdir(network_path):
+        paths = sorted(os.path.join(network_path, f) for f in os.listdir(network_path))
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return '|'.join(parts)
+
+
+class LRUCache:
+    """按最近使用顺序淘汰的结果缓存"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class GraphService:
+    """常驻的图查询服务 (asyncio, 本地 HTTP 或 Unix 套接字)
+
+    图只加载一次; 计算量大的查询交给工作进程池 (workers == 1 时在本进程的
+    单个线程中计算)。相同的查询直接从 LRU 缓存返回, 图文件变化后缓存清空,
+    工作进程重新加载图。
+    """
+
+    def __init__(self, network_path: str, workers: Optional[int] = 1, cache_size: int = 256):
+        self.network_path = network_path
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = LRUCache(cache_size)
+        self.signature = None
+        self.pool = None
+        self.reloads = 0
+        self._reload()
+
+    def _reload(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+        self.signature = graph_signature(self.network_path)
+        self.cache.clear()
+        if self.workers == 1:
+            _init_worker(self.network_path)
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.network_path,))
+        self.reloads += 1
+
+    def _check_graph(self):
+        """图文件变化时重新加载"""
+        signature = graph_signature(self.network_path)
+        if signature is not None and signature != self.signature:
+            self._reload()
+
+    async def query(self, name: str, params: Dict) -> Dict:
+        """执行一次查询 (先查缓存)"""
+        if name not in ENDPOINTS:
+            raise KeyError(name)
+        allowed = ENDPOINTS[name][1]
+        unknown = set(params) - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {name}: {sorted(unknown)}")
+        self._check_graph()
+        key = (name, json.dumps(params, sort_keys=True))
+        cached = self.cache.get(key)
+        if cached is not None:
+            # 每次返回副本, 调用方修改结果不会影响缓存
+            return copy.deepcopy(cached)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.pool, _run, name, params)
+        self.cache.put(key, copy.deepcopy(result))
+        return result
+
+    def status(self) -> Dict:
+        store = _state.get('store') if self.workers == 1 else None
+        return {
+            'network_path': self.network_path,
+            'workers': self.workers,
+            'reloads': self.reloads,
+            'cache': {'size': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses},
+            'nodes': store.num_nodes if store is not None else None,
+            'edges': store.num_edges if store is not None else None
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个 HTTP/1.1 请求: GET 参数在查询字符串中 (JSON 值), POST 参数为 JSON 请求体"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+            status, payload = await self._dispatch(request_line, body)
+        except Exception as e:
+            status, payload = 400, {'error': str(e)}
+
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request_line, body):
+        if len(request_line) < 2:
+            return 400, {'error': 'Malformed request line'}
+        method, target = request_line[0], urlsplit(request_line[1])
+        if target.path == '/status':
+            return 200, self.status()
+        if target.path not in ENDPOINTS:
+            return 404, {'error': f"Unknown endpoint {target.path}"}
+        if method == 'GET':
+            params = {k: _query_value(v[-1]) for k, v in parse_qs(target.query).items()}
+        elif method == 'POST':
+            params = json.loads(body or b'{}')
+        else:
+            return 405, {'error': f"Unsupported method {method}"}
+        try:
+            return 200, await self.query(target.path, params)
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, unix_path: Optional[str] = None):
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            print(f"图查询服务已启动: unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"图查询服务已启动: http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    # python graph_service.py traffic_network.graph [端口 | unix:/path/to.sock] [进程数]
+    network_path = sys.argv[1]
+    address = sys.argv[2] if len(sys.argv) > 2 else '8765'
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    service = GraphService(network_path, workers=workers)
+    if address.startswith('unix:'):
+        asyncio.run(service.serve(unix_path=address[len('unix:'):]))
+    else:
+        asyncio.run(service.serve(port=int(address)))
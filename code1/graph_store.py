@@ -0,0 +1,366 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import networkx as nx
+import numpy as np
+
+FORMAT_VERSION = 1
+# 读取时遇到正在替换的存储目录的重试次数与间隔 (秒)
+LOAD_RETRIES = 20
+LOAD_RETRY_DELAY = 0.05
+
+
+def _infer_kind(values):
+    """推断一列属性的存储类型: bool / int / float / str"""
+    present = [v for v in values if v is not None and not (isinstance(v, float) and np.isnan(v))]
+    if not present:
+        return 'float'
+    if all(isinstance(v, (bool, np.bool_)) for v in present):
+        return 'bool'
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_)) for v in present):
+        return 'int' if len(present) == len(values) else 'float'
+    if all(isinstance(v, (int, float, np.integer, np.floating)) for v in present):
+        return 'float'
+    return 'str'
+
+
+def _intern(values):
+    """字符串驻留: 返回 (codes, 字符串表), 缺失值编码为 -1"""
+    table = {}
+    codes = np.full(len(values), -1, dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            continue
+        codes[i] = table.setdefault(str(v), len(table))
+    return codes, list(table)
+
+
+def _pack_strings(strings):
+    """把字符串表打包为 UTF-8 字节块 + 偏移量, 便于内存映射"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = bytes(blob)
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class GraphStore:
+    """紧凑的二进制有向图存储
+
+    邻接关系为 CSR (indptr/indices, 按节点下标排序), 边属性按列存储为定长
+    类型数组, 字符串属性 (道路名称、描述等) 存储为驻留后的编码加字符串表。
+    save() 写出一个目录, 每个数组一个 .npy 文件, load() 默认以内存映射方式
+    打开, 多个分析进程可以共享同一份图数据。
+
+    save() 先写到同级的临时目录 (meta.json 最后写), 再整体改名替换旧目录,
+    已经映射旧文件的读者不受影响; load() 遇到替换过程中的目录会重试。
+    """
+
+    def __init__(self, node_ids, indptr, indices, edge_columns=None, column_kinds=None,
+                 string_tables=None, node_pos=None):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_columns = edge_columns or {}
+        self.column_kinds = column_kinds or {}
+        self.string_tables = string_tables or {}
+        self.node_pos = node_pos
+        self._decoded = {}
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def edge_sources(self):
+        """每条边的起点下标 (CSR 顺序)"""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+
+    def node_index(self, nodes):
+        """节点 ID -> 节点下标 (node_ids 已排序), 不存在的节点返回 -1"""
+        nodes = np.asarray(nodes, dtype=self.node_ids.dtype)
+        idx = np.searchsorted(self.node_ids, nodes)
+        idx = np.minimum(idx, max(self.num_nodes - 1, 0))
+        found = self.num_nodes > 0
+        return np.where(found & (self.node_ids[idx] == nodes), idx, -1)
+
+    def edge_index(self, u_idx, v_idx):
+        """(起点下标, 终点下标) -> CSR 中的边下标, 不存在时返回 -1"""
+        start, end = self.indptr[u_idx], self.indptr[u_idx + 1]
+        pos = start + np.searchsorted(self.indices[start:end], v_idx)
+        if pos < end and self.indices[pos] == v_idx:
+            return int(pos)
+        return -1
+
+    def strings(self, name):
+        """解码后的字符串表"""
+        if name not in self._decoded:
+            blob, offsets = self.string_tables[name]
+            self._decoded[name] = _unpack_strings(blob, offsets)
+        return self._decoded[name]
+
+    def edge_values(self, name):
+        """按 CSR 顺序返回一列边属性; 字符串和布尔列解码为 object 数组 (缺失为 None)"""
+        column = self.edge_columns[name]
+        kind = self.column_kinds[name]
+        if kind == 'str':
+            table = np.array(self.strings(name) + [None], dtype=object)
+            return table[column]
+        if kind == 'bool':
+            return np.array([False, True, None], dtype=object)[column]
+        return column
+
+    def to_scipy(self, weight=None):
+        """转换为 scipy.sparse.csr_matrix (共享 indptr/indices)"""
+        from scipy.sparse import csr_matrix
+        data = np.ones(self.num_edges) if weight is None else np.asarray(self.edge_columns[weight], dtype=np.float64)
+        return csr_matrix((data, self.indices, self.indptr), shape=(self.num_nodes, self.num_nodes))
+
+    @classmethod
+    def from_networkx(cls, G):
+        nodes = list(G.nodes())
+        if all(isinstance(n, (int, np.integer)) for n in nodes):
+            node_ids = np.array(nodes, dtype=np.int64)
+        else:
+            node_ids = np.array([str(n) for n in nodes])
+        order = np.argsort(node_ids, kind='stable')
+        node_ids = node_ids[order]
+        position = {node: i for i, node in enumerate(node_ids.tolist())}
+        key = (lambda n: int(n)) if node_ids.dtype == np.int64 else str
+
+        node_pos = None
+        if any('pos' in d for _, d in G.nodes(data=True)):
+            node_pos = np.full((len(node_ids), 2), np.nan)
+            for n, d in G.nodes(data=True):
+                if 'pos' in d:
+                    node_pos[position[key(n)]] = d['pos']
+
+        edges = list(G.edges(data=True))
+        u = np.array([position[key(e[0])] for e in edges], dtype=np.int64)
+        v = np.array([position[key(e[1])] for e in edges], dtype=np.int64)
+        edge_order = np.lexsort((v, u))
+        edges = [edges[i] for i in edge_order]
+        indices = v[edge_order]
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.add.at(indptr, u + 1, 1)
+        indptr = np.cumsum(indptr)
+
+        attr_names = sorted({k for _, _, d in edges for k in d})
+        edge_columns, column_kinds, string_tables = {}, {}, {}
+        for name in attr_names:
+            values = [d.get(name) for _, _, d in edges]
+            kind = column_kinds[name] = _infer_kind(values)
+            if kind == 'bool':
+                # 0 / 1, 缺失为 -1
+                edge_columns[name] = np.array([-1 if x is None else int(x) for x in values], dtype=np.int8)
+            elif kind == 'int':
+                edge_columns[name] = np.array(values, dtype=np.int64)
+            elif kind == 'float':
+                edge_columns[name] = np.array([np.nan if x is None else float(x) for x in values])
+            else:
+                codes, table = _intern(values)
+                edge_columns[name] = codes
+                string_tables[name] = _pack_strings(table)
+
+        return cls(node_ids, indptr, indices.astype(np.int64), edge_columns, column_kinds, string_tables, node_pos)
+
+    def to_networkx(self):
+        G = nx.DiGraph()
+        nodes = self.node_ids.tolist()
+        if self.node_pos is not None:
+            G.add_nodes_from(
+                (n, {'pos': tuple(p)}) if not np.isnan(p).any() else (n, {})
+                for n, p in zip(nodes, self.node_pos.tolist())
+            )
+        else:
+            G.add_nodes_from(nodes)
+
+        columns = {}
+        for name in self.edge_columns:
+            values = self.edge_values(name)
+            columns[name] = values.tolist() if isinstance(values, np.ndarray) else list(values)
+        sources = self.edge_sources().tolist()
+        targets = self.indices.tolist()
+        for i, (s, t) in enumerate(zip(sources, targets)):
+            attrs = {}
+            for name, values in columns.items():
+                value = values[i]
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                attrs[name] = value
+            G.add_edge(nodes[s], nodes[t], **attrs)
+        return G
+
+    def save(self, path):
+        """原子地写出存储目录
+
+        原地覆盖 .npy 会截断其他进程正在内存映射的文件, 所以先在同级临时目录
+        写完全部数组和 meta.json, 再把旧目录改名移开、新目录改名到位。
+        """
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path) or '.'
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.tmp-", dir=parent)
+        try:
+            # mkdtemp 只给属主权限, 改为与 os.makedirs 默认一致的可读权限
+            os.chmod(tmp, 0o755)
+            self._write(tmp)
+            _swap_directory(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def _write(self, path):
+        meta = {
+            'version': FORMAT_VERSION,
+            # 每次保存唯一, load() 用它确认读到的数组来自同一次保存
+            'generation': uuid.uuid4().hex,
+            'num_nodes': self.num_nodes,
+            'num_edges': self.num_edges,
+            'edge_columns': {name: self.column_kinds[name] for name in sorted(self.edge_columns)},
+            'has_pos': self.node_pos is not None
+        }
+        np.save(os.path.join(path, 'node_ids.npy'), self.node_ids)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'indices.npy'), self.indices)
+        if self.node_pos is not None:
+            np.save(os.path.join(path, 'node_pos.npy'), self.node_pos)
+        for name, column in self.edge_columns.items():
+            np.save(os.path.join(path, f'edge.{name}.npy'), column)
+        for name, (blob, offsets) in self.string_tables.items():
+            np.save(os.path.join(path, f'strings.{name}.blob.npy'), blob)
+            np.save(os.path.join(path, f'strings.{name}.offsets.npy'), offsets)
+        # 清单最后写
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=4)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """读取存储目录; 与 save() 的目录替换并发时重试, 保证各数组来自同一次保存"""
+        for attempt in range(LOAD_RETRIES):
+            last = attempt == LOAD_RETRIES - 1
+            try:
+                meta = read_meta(path)
+            except FileNotFoundError:
+                if last:
+                    raise
+                time.sleep(LOAD_RETRY_DELAY)
+                continue
+            try:
+                store = cls._load_arrays(path, meta, mmap)
+            except (OSError, ValueError):
+                # 读到一半目录被替换时, 头信息和映射的文件可能来自不同版本
+                if last or not _replaced(path, meta):
+                    raise
+                time.sleep(LOAD_RETRY_DELAY)
+                continue
+            if not _replaced(path, meta):
+                return store
+        raise RuntimeError(f"Graph store {path} kept changing while loading")
+
+    @classmethod
+    def _load_arrays(cls, path, meta, mmap):
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph store version {meta['version']} in {path}")
+        mode = 'r' if mmap else None
+
+        def load_array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mode)
+
+        edge_columns = {name: load_array(f'edge.{name}.npy') for name in meta['edge_columns']}
+        string_tables = {
+            name: (load_array(f'strings.{name}.blob.npy'), load_array(f'strings.{name}.offsets.npy'))
+            for name, kind in meta['edge_columns'].items() if kind == 'str'
+        }
+        node_pos = load_array('node_pos.npy') if meta['has_pos'] else None
+        return cls(load_array('node_ids.npy'), load_array('indptr.npy'), load_array('indices.npy'),
+                   edge_columns, dict(meta['edge_columns']), string_tables, node_pos)
+
+    @classmethod
+    def from_graphml(cls, path):
+        G = nx.read_graphml(path)
+        # GraphML 节点 ID 都是字符串; 全为数字时还原为整数 OSM ID
+        if all(str(n).isdigit() for n in G.nodes()):
+            G = nx.relabel_nodes(G, {n: int(n) for n in G.nodes()})
+        for _, d in G.nodes(data=True):
+            if 'lat' in d and 'lon' in d:
+                d['pos'] = (d.pop('lat'), d.pop('lon'))
+        return cls.from_networkx(G)
+
+    def to_graphml(self, path):
+        G = self.to_networkx()
+        # GraphML 不支持元组属性, 坐标拆成 lat / lon 两个字段
+        for _, d in G.nodes(data=True):
+            if 'pos' in d:
+                d['lat'], d['lon'] = d.pop('pos')
+        nx.write_graphml(G, path)
+
+
+def read_meta(path):
+    """存储目录的 meta.json"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)
+
+
+def _replaced(path, meta):
+    """读取期间存储目录是否已被另一次保存替换"""
+    try:
+        return read_meta(path).get('generation') != meta.get('generation')
+    except FileNotFoundError:
+        return True
+
+
+def _swap_directory(new, path):
+    """用 new 目录替换 path; 旧目录先改名移开, 替换完成后删除
+
+    已打开的内存映射仍指向旧文件, 不会被截断。两次改名之间 path 短暂不存在,
+    由 load() 重试处理; 多个写入者并发时以最后完成替换的为准。
+    """
+    for _ in range(LOAD_RETRIES):
+        old = f"{new}.old"
+        try:
+            os.rename(path, old)
+        except FileNotFoundError:
+            old = None
+        try:
+            os.rename(new, path)
+        except OSError:
+            # 另一个写入者刚把它的目录换到了 path, 把那份也换下来
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+            continue
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        return
+    raise RuntimeError(f"Could not replace graph store {path}")
+
+
+def load_graph(path, mmap=True):
+    """读取图: GraphML 文件或 GraphStore 目录"""
+    if path.endswith('.graphml'):
+        return GraphStore.from_graphml(path)
+    return GraphStore.load(path, mmap=mmap)
+
+
+if __name__ == "__main__":
+    # 格式转换: python graph_store.py input.graphml output.graph (或反向)
+    src, dst = sys.argv[1], sys.argv[2]
+    store = load_graph(src)
+    if dst.endswith('.graphml'):
+        store.to_graphml(dst)
+    else:
+        store.save(dst)
+    print(f"Converted {src} -> {dst} ({store.num_nodes} nodes, {store.num_edges} edges)")
@@ -0,0 +1,225 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+TRACE_VERSION = 1
+# 设置该环境变量 (非空, 非 0) 时各脚本的 main() 自动记录并写出 trace
+TRACE_ENV = 'MCM_TRACE'
+
+
+def peak_rss_mb() -> Optional[float]:
+    """本进程的峰值常驻内存 (MB); 无法获取时返回 None
+
+    Linux 上优先读 /proc/self/status 的 VmHWM: ru_maxrss 会保留 spawn 时
+    exec 之前 (父进程副本) 的峰值。
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位, macOS 以字节为单位
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Span:
+    """一段计时区间: 墙钟时间、CPU 时间、峰值内存及其增量、处理的条目数"""
+
+    def __init__(self, tracer: 'Tracer', name: str, items: Optional[int] = None, **attrs):
+        self.tracer = tracer
+        self.name = name
+        self.items = items
+        self.attrs = attrs
+        self.record = None
+        self.index = None
+
+    def set(self, items: Optional[int] = None, **attrs) -> None:
+        if items is not None:
+            self.items = int(items)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        tracer = self.tracer
+        self.record = {
+            'name': self.name,
+            'parent': tracer._stack[-1].index if tracer._stack else None,
+            'depth': len(tracer._stack),
+            'start': time.perf_counter() - tracer.origin,
+        }
+        self.index = len(tracer.spans)
+        tracer.spans.append(self.record)
+        tracer._stack.append(self)
+        self._cpu = time.process_time()
+        self._peak = peak_rss_mb()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        tracer = self.tracer
+        record = self.record
+        record['wall'] = time.perf_counter() - tracer.origin - record['start']
+        record['cpu'] = time.process_time() - self._cpu
+        peak = peak_rss_mb()
+        record['peak_rss_mb'] = peak
+        # 区间内进程峰值内存的增长 (0 表示未超过之前的峰值)
+        record['peak_growth_mb'] = peak - self._peak if peak is not None and self._peak is not None else None
+        record['items'] = self.items
+        if self.items and record['wall'] > 0:
+            record['throughput'] = self.items / record['wall']
+        if self.attrs:
+            record['attrs'] = self.attrs
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        tracer._stack.pop()
+        return False
+
+
+class _NullSpan:
+    """未启用时使用的空区间, 所有操作都不做任何事"""
+
+    def set(self, items=None, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """收集区间和计数器, 输出为 JSON trace"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.spans = []
+        self.counters = {}
+        self._stack = []
+
+    def span(self, name: str, items: Optional[int] = None, **attrs) -> Span:
+        return Span(self, name, items, **attrs)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': TRACE_VERSION,
+            'name': self.name,
+            'started': self.started,
+            'pid': os.getpid(),
+            'wall': time.perf_counter() - self.origin,
+            'cpu': time.process_time(),
+            'peak_rss_mb': peak_rss_mb(),
+            'spans': self.spans,
+            'counters': dict(sorted(self.counters.items()))
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4, ensure_ascii=False)
+
+
+# 当前进程的 tracer; 为 None 时 span / count / annotate 都立即返回
+_tracer: Optional[Tracer] = None
+
+
+def enable(name: str = '') -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(name)
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active() -> Optional[Tracer]:
+    return _tracer
+
+
+def env_enabled() -> bool:
+    return os.environ.get(TRACE_ENV, '') not in ('', '0')
+
+
+def span(name: str, items: Optional[int] = None, **attrs):
+    """计时区间 (上下文管理器); 未启用时返回共享的空区间"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, items, **attrs)
+
+
+def count(name: str, n: int = 1) -> None:
+    """累加计数器 (如各匹配层的行数、Dijkstra 调用次数)"""
+    if _tracer is not None:
+        _tracer.count(name, n)
+
+
+def annotate(items: Optional[int] = None, **attrs) -> None:
+    """给当前 (最内层) 区间补充条目数或属性, 用于装饰器包住的函数内部"""
+    if _tracer is not None and _tracer._stack:
+        _tracer._stack[-1].set(items, **attrs)
+
+
+def traced(name: Optional[str] = None):
+    """把函数 (或方法) 的每次调用记录为一个区间; 未启用时直接调用原函数"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_path(output_path: str) -> str:
+    """结果文件旁的 trace 文件: results.json -> results.trace.json"""
+    return f"{os.path.splitext(output_path)[0]}.trace.json"
+
+
+@contextlib.contextmanager
+def tracing(path: str, name: str = '', enabled: Optional[bool] = None):
+    """脚本入口用: 启用 tracer, 结束时 (包括出错时) 把 trace 写到 path
+
+    外层已经启用了 tracer 时直接沿用, 由外层负责写出, 这里只记录一个区间;
+    否则 enabled 为 None 时由环境变量 MCM_TRACE 决定是否启用。
+    """
+    if _tracer is not None:
+        with _tracer.span(name or path):
+            yield _tracer
+        return
+    if enabled is None:
+        enabled = env_enabled()
+    if not enabled:
+        yield None
+        return
+    tracer = enable(name)
+    try:
+        with tracer.span(name or 'main'):
+            yield tracer
+    finally:
+        disable()
+        tracer.save(path)
+        print(f"Trace saved to {path}")
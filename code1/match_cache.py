@@ -0,0 +1,92 @@
+import hashlib
+import sqlite3
+
+import pandas as pd
+
+# Bump when standardization or matching rules change so old entries are ignored
+CACHE_VERSION = 1
+
+KEY_COLUMNS = ['Road Name', 'Station Description']
+RESULT_COLUMNS = ['Standardized_Name', 'Matched_Name', 'Edge_Nodes', 'Match_Type']
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Content hash of a file, salted with CACHE_VERSION"""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:".encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MatchCache:
+    """SQLite-backed cache of per-row match results across runs.
+
+    Entries are keyed by (road name, station description, edge-names
+    fingerprint); opening the cache with a new fingerprint drops entries
+    built against an older Edge_Names_With_Nodes.csv.
+    """
+
+    def __init__(self, db_path, fingerprint):
+        self.db_path = db_path
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS matches (
+                road_name TEXT NOT NULL,
+                station_description TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                standardized_name TEXT,
+                matched_name TEXT,
+                edge_nodes TEXT,
+                match_type TEXT,
+                UNIQUE (road_name, station_description, fingerprint)
+            )
+        ''')
+        self.conn.execute('DELETE FROM matches WHERE fingerprint != ?', (fingerprint,))
+        self.conn.commit()
+
+    @staticmethod
+    def _keys(mdot_df):
+        # read_csv never yields empty strings, so '' can stand in for NaN
+        return mdot_df[KEY_COLUMNS].fillna('').astype(str).reset_index(drop=True)
+
+    def lookup(self, mdot_df):
+        """Return (results aligned to mdot_df, boolean hit mask)"""
+        cached = pd.read_sql_query(
+            'SELECT road_name, station_description, standardized_name, matched_name, '
+            'edge_nodes, match_type FROM matches WHERE fingerprint = ?',
+            self.conn, params=(self.fingerprint,)
+        )
+        cached.columns = KEY_COLUMNS + RESULT_COLUMNS
+
+        keys = self._keys(mdot_df)
+        results = keys.merge(cached, on=KEY_COLUMNS, how='left')
+        results.index = mdot_df.index
+        results = results[RESULT_COLUMNS]
+
+        hit = results['Standardized_Name'].notna()
+        self.hits = int(hit.sum())
+        self.misses = int((~hit).sum())
+        return results, hit
+
+    def store(self, mdot_df, results):
+        """Persist results for the given rows (same index as mdot_df)"""
+        frame = pd.concat([self._keys(mdot_df), results[RESULT_COLUMNS].reset_index(drop=True)], axis=1)
+        frame = frame.drop_duplicates(KEY_COLUMNS)
+        rows = [
+            (road_name, description, self.fingerprint)
+            + tuple(None if pd.isna(value) else str(value) for value in values)
+            for road_name, description, *values in frame.itertuples(index=False)
+        ]
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO matches (road_name, station_description, fingerprint, '
+            'standardized_name, matched_name, edge_nodes, match_type) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
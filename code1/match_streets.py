@@ -1,256 +1,252 @@
 import pandas as pd
+import numpy as np
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from difflib import get_close_matches
+from instrumentation import count, span, trace_path, tracing
+from match_cache import MatchCache, RESULT_COLUMNS, file_fingerprint
+from street_index import FuzzyStreetMatcher
+from street_standardizer import StreetNameStandardizer
+
+_standardizer = StreetNameStandardizer()
 
 def standardize_street_name(name):
-    if pd.isna(name):
-        return ""
-    
-    # Convert to uppercase
-    name = str(name).upper()
-    
-    # Common abbreviations mapping
-    abbreviations = {
-        'STREET': 'ST',
-        'AVENUE': 'AVE',
-        'ROAD': 'RD',
-        'BOULEVARD': 'BLVD',
-        'DRIVE': 'DR',
-        'LANE': 'LA',
-        'COURT': 'CT',
-        'CIRCLE': 'CIR',
-        'PLACE': 'PL',
-        'HIGHWAY': 'HWY',
-        'PARKWAY': 'PKWY',
-        'NORTH': 'N',
-        'SOUTH': 'S',
-        'EAST': 'E',
-        'WEST': 'W',
-        'TERRACE': 'TER',
-        'EXPRESSWAY': 'EXPY',
-        'FREEWAY': 'FWY',
-        'TURNPIKE': 'TPKE',
-        'ROUTE': 'RT',
-        'SQUARE': 'SQ',
-        'TRAIL': 'TRL',
-        'WAY': 'WY',
-        'ALLEY': 'ALY',
-        'NORTHEAST': 'NE',
-        'NORTHWEST': 'NW',
-        'SOUTHEAST': 'SE',
-        'SOUTHWEST': 'SW',
-        'BALTIMORE': 'BALTO',
-        'HEIGHTS': 'HTS',
-        'EXTENSION': 'EXT',
-        'CENTER': 'CTR',
-        'MOUNT': 'MT',
-        'SAINT': 'ST',
-        'NORTHBOUND': 'NB',
-        'SOUTHBOUND': 'SB',
-        'EASTBOUND': 'EB',
-        'WESTBOUND': 'WB'
-    }
-    
-    # Special handling for ramps
-    if name.startswith('RAMP'):
-        # Extract the main road names from ramp description
-        parts = name.split(' TO ')
-        if len(parts) > 1:
-            # Get the destination road name
-            dest = parts[-1].split()[-1]  # Take the last word as the main road
-            return f"RAMP TO {dest}"
-    
-    # Handle couplets
-    if '(NB COUPLET)' in name or '(SB COUPLET)' in name:
-        # Remove the couplet designation but keep the base street name
-        name = name.replace('(NB COUPLET)', '').replace('(SB COUPLET)', '').strip()
-    
-    # Common prefixes to remove or standardize
-    highway_prefixes = {
-        'IS': 'I',  # Interstate
-        'US': 'US',  # US Route
-        'MD': 'MD',  # Maryland Route
-        'CO': 'CO',  # County Route
-        'SR': 'SR'   # State Route
-    }
-    
-    # Standardize highway references
-    for prefix, std_prefix in highway_prefixes.items():
-        if name.startswith(prefix + ' '):
-            # Keep standardized highway references
-            parts = name.split()
-            if len(parts) > 1 and parts[1].isdigit():
-                return f"{std_prefix}-{parts[1]}"
-    
-    # Remove special characters and extra spaces
-    name = re.sub(r'[^\w\s-]', ' ', name)
-    name = ' '.join(name.split())
-    
-    # Remove directional indicators in parentheses
-    name = re.sub(r'\s*\([NS][BW]\s*(?:COUPLET)?\)\s*', ' ', name)
-    name = re.sub(r'\s*\([^)]*\)\s*', ' ', name)  # Remove any parenthetical content
-    
-    # Apply abbreviations
-    for full, abbr in abbreviations.items():
-        # Replace full word with abbreviation
-        name = re.sub(r'\b' + full + r'\b', abbr, name)
-        # Also try to match the abbreviated form to standardize existing abbreviations
-        if full != abbr:  # Avoid replacing abbreviation with itself
-            name = re.sub(r'\b' + abbr + r'\b', abbr, name)
-    
-    # Clean up any remaining multiple spaces
-    name = ' '.join(name.split())
-    
-    return name.strip()
+    """Standardize a street name (compiled and memoized, see StreetNameStandardizer)"""
+    return _standardizer.standardize(name)
 
 def extract_base_name(name, description):
     """Extract base name from road name and description"""
-    if pd.isna(name) or pd.isna(description):
-        return standardize_street_name(name)
-    
-    # If description contains " - ", try to get the base name from before it
-    if ' - ' in description:
-        base_name = description.split(' - ')[0]
-        # Check if the base name contains route information
-        if any(prefix in base_name for prefix in ['MD', 'US', 'IS']):
-            return standardize_street_name(name)
-        return standardize_street_name(base_name)
-    
-    return standardize_street_name(name)
+    return _standardizer.extract_base_name(name, description)
+
+# (collection, its length, matcher) for the last plain collection passed to find_best_match
+_last_matcher = (None, 0, None)
 
 def find_best_match(name, valid_names, cutoff=0.85):
-    """Find the best matching street name using fuzzy matching"""
-    # Try exact match first
-    if name in valid_names:
-        return name
-        
-    # For ramps, try matching with more flexible criteria
-    if name.startswith('RAMP'):
-        ramp_matches = [vn for vn in valid_names if vn.startswith('RAMP')]
-        if ramp_matches:
-            matches = get_close_matches(name, ramp_matches, n=1, cutoff=0.7)  # Lower cutoff for ramps
-            if matches:
-                return matches[0]
-    
-    # For regular streets, use stricter matching
-    matches = get_close_matches(name, valid_names, n=1, cutoff=cutoff)
-    return matches[0] if matches else None
+    """Find the best matching street name using fuzzy matching
 
-def main():
-    print("Loading data files...")
-    
-    # Load MDOT data
-    mdot_df = pd.read_csv('MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv')
-    edge_names_df = pd.read_csv('Edge_Names_With_Nodes.csv')
-    
-    print(f"\nTotal MDOT streets: {len(mdot_df)}")
-    print(f"Total Edge streets: {len(edge_names_df)}")
-    
-    print("\nStandardizing MDOT street names...")
-    mdot_df['Standardized_Name'] = mdot_df.progress_apply(
-        lambda x: extract_base_name(x['Road Name'], x['Station Description']), 
-        axis=1
-    )
-    
-    print("\nStandardizing Edge street names...")
-    edge_names_df['Standardized_Name'] = edge_names_df['Street_Name'].progress_apply(standardize_street_name)
-    
-    # Create matching dictionary from edge_names
-    edge_names_dict = dict(zip(edge_names_df['Standardized_Name'], edge_names_df['Nodes']))
-    valid_names = set(edge_names_dict.keys())
-    
-    # Create a mapping for highway numbers
+    valid_names should be a FuzzyStreetMatcher built once by the caller.
+    A plain collection is still accepted; its index is built on first use
+    and reused while the same (unmodified) collection object is passed.
+    """
+    global _last_matcher
+    if not isinstance(valid_names, FuzzyStreetMatcher):
+        names, size, matcher = _last_matcher
+        if names is not valid_names or size != len(valid_names):
+            matcher = FuzzyStreetMatcher(valid_names)
+            _last_matcher = (valid_names, len(valid_names), matcher)
+        valid_names = matcher
+    return valid_names.match(name, cutoff)
+
+def build_highway_mapping(valid_names):
+    """Create a mapping for highway numbers ("I 95" -> "I-95")"""
     highway_mapping = {}
     for name in valid_names:
         if re.match(r'^(I|US|MD|SR|CO)-\d+', name):
             prefix, number = name.split('-')
             alt_name = f"{prefix} {number}"
             highway_mapping[alt_name] = name
+    return highway_mapping
+
+_worker_matcher = None
+
+def _init_fuzzy_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+def _match_chunk(names):
+    """Fuzzy-match a chunk of names in a worker, returning the matches and the chunk's candidate totals"""
+    _worker_matcher.reset_stats()
+    matches = [_worker_matcher.match(name) for name in names]
+    return matches, (_worker_matcher.queries, _worker_matcher.candidates_total,
+                     _worker_matcher.candidates_max)
+
+def fuzzy_match_names(matcher, names, workers=1, chunk_size=256):
+    """Fuzzy-match distinct names, optionally fanning chunks out over a process pool
+
+    Runs serially by default; workers > 1 (or None for one per CPU) uses a
+    pool. Chunks are mapped in order, so the result does not depend on
+    scheduling.
+    """
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [[matcher.match(name) for name in chunk] for chunk in tqdm(chunks)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_fuzzy_worker,
+                                 initargs=(matcher,)) as pool:
+            results = []
+            for matches, stats in tqdm(pool.map(_match_chunk, chunks), total=len(chunks)):
+                matcher.merge_stats(stats)
+                results.append(matches)
+    
+    best_matches = {}
+    for chunk, matches in zip(chunks, results):
+        best_matches.update(zip(chunk, matches))
+    return best_matches
+
+def match_rows(mdot_df, edge_names_df, workers=1):
+    """Match standardized MDOT names against edge names in three tiers
+
+    The exact and highway-mapped tiers are resolved as lookups over whole
+    columns; only the residual distinct names go through fuzzy matching.
+    Returns (per-row results aligned to mdot_df, matcher); unmatched rows
+    have an empty Match_Type.
+    """
+    # Create matching table from edge_names (last row wins for duplicate names)
+    edge_nodes = (edge_names_df.drop_duplicates('Standardized_Name', keep='last')
+                  .set_index('Standardized_Name')['Nodes'])
+    valid_names = set(edge_nodes.index)
+    matcher = FuzzyStreetMatcher(valid_names)
+    highway_mapping = build_highway_mapping(valid_names)
+    
+    std_names = mdot_df['Standardized_Name']
     
-    # Perform matching
-    print("\nMatching streets...")
-    matches = []
-    unmatched = []
-    
-    for idx, row in tqdm(mdot_df.iterrows(), total=len(mdot_df)):
-        std_name = row['Standardized_Name']
-        matched = False
+    # Try exact match first
+    is_exact = std_names.isin(edge_nodes.index)
+    
+    # Try highway number mapping
+    mapped_names = std_names.where(~is_exact).map(highway_mapping)
+    is_mapped = mapped_names.notna()
+    
+    # Try fuzzy matching on what is left
+    residual = ~is_exact & ~is_mapped
+    print(f"Fuzzy matching {residual.sum()} rows ({std_names[residual].nunique()} distinct names)...")
+    distinct = std_names[residual].unique().tolist()
+    with span('match.fuzzy', items=len(distinct)):
+        best_matches = fuzzy_match_names(matcher, distinct, workers)
+    fuzzy_names = std_names.where(residual).map(best_matches)
+    is_fuzzy = fuzzy_names.notna()
+    
+    count('match.exact', is_exact.sum())
+    count('match.highway_mapped', is_mapped.sum())
+    count('match.fuzzy', is_fuzzy.sum())
+    count('match.unmatched', (residual & ~is_fuzzy).sum())
+    
+    matched_names = std_names.where(is_exact, mapped_names.where(is_mapped, fuzzy_names))
+    results = pd.DataFrame({
+        'Standardized_Name': std_names,
+        'Matched_Name': matched_names,
+        'Edge_Nodes': matched_names.map(edge_nodes),
+        'Match_Type': np.select([is_exact, is_mapped, is_fuzzy], ['exact', 'highway_mapped', 'fuzzy'], default='')
+    }, index=mdot_df.index)
+    return results, matcher
+
+def split_match_results(mdot_df, results):
+    """Build the matched and unmatched output tables from per-row results"""
+    is_matched = results['Match_Type'] != ''
+    
+    matches_df = pd.DataFrame({
+        'Original_MDOT_Name': mdot_df['Road Name'],
+        'Standardized_Name': results['Matched_Name'],
+        'Edge_Nodes': results['Edge_Nodes'],
+        'AADT_Current': mdot_df['AADT (Current)'],
+        'Station_Description': mdot_df['Station Description'],
+        'Match_Type': results['Match_Type']
+    })[is_matched].reset_index(drop=True)
+    
+    unmatched_df = pd.DataFrame({
+        'Original_MDOT_Name': mdot_df['Road Name'],
+        'Standardized_Name': results['Standardized_Name'],
+        'Station_Description': mdot_df['Station Description']
+    })[~is_matched].reset_index(drop=True)
+    
+    return matches_df, unmatched_df
+
+def match_streets(mdot_df, edge_names_df, workers=1):
+    """Match MDOT rows and return (matches_df, unmatched_df, matcher) in row order"""
+    results, matcher = match_rows(mdot_df, edge_names_df, workers)
+    matches_df, unmatched_df = split_match_results(mdot_df, results)
+    return matches_df, unmatched_df, matcher
+
+def main(workers=1, cache_path='match_cache.sqlite'):
+    with tracing(trace_path('matched_streets.csv'), 'match_streets'):
+        print("Loading data files...")
         
-        # Try exact match first
-        if std_name in edge_names_dict:
-            matches.append({
-                'Original_MDOT_Name': row['Road Name'],
-                'Standardized_Name': std_name,
-                'Edge_Nodes': edge_names_dict[std_name],
-                'AADT_Current': row['AADT (Current)'],
-                'Station_Description': row['Station Description'],
-                'Match_Type': 'exact'
-            })
-            matched = True
-        # Try highway number mapping
-        elif std_name in highway_mapping:
-            mapped_name = highway_mapping[std_name]
-            matches.append({
-                'Original_MDOT_Name': row['Road Name'],
-                'Standardized_Name': mapped_name,
-                'Edge_Nodes': edge_names_dict[mapped_name],
-                'AADT_Current': row['AADT (Current)'],
-                'Station_Description': row['Station Description'],
-                'Match_Type': 'highway_mapped'
-            })
-            matched = True
-        else:
-            # Try fuzzy matching
-            best_match = find_best_match(std_name, valid_names)
-            if best_match:
-                matches.append({
-                    'Original_MDOT_Name': row['Road Name'],
-                    'Standardized_Name': best_match,
-                    'Edge_Nodes': edge_names_dict[best_match],
-                    'AADT_Current': row['AADT (Current)'],
-                    'Station_Description': row['Station Description'],
-                    'Match_Type': 'fuzzy'
-                })
-                matched = True
+        # Load MDOT data
+        edge_names_path = 'Edge_Names_With_Nodes.csv'
+        with span('match_streets.load') as load_span:
+            mdot_df = pd.read_csv('MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv')
+            edge_names_df = pd.read_csv(edge_names_path)
+            load_span.set(items=len(mdot_df) + len(edge_names_df))
         
-        if not matched:
-            unmatched.append({
-                'Original_MDOT_Name': row['Road Name'],
-                'Standardized_Name': std_name,
-                'Station_Description': row['Station Description']
-            })
-    
-    # Convert results to DataFrames
-    matches_df = pd.DataFrame(matches)
-    unmatched_df = pd.DataFrame(unmatched)
-    
-    # Print statistics
-    print("\nMatching Results:")
-    print(f"Total matched streets: {len(matches)}")
-    print(f"Total unmatched streets: {len(unmatched)}")
-    print(f"Match rate: {len(matches)/len(mdot_df)*100:.2f}%")
-    
-    if len(matches) > 0:
-        print("\nMatch types:")
-        print(matches_df['Match_Type'].value_counts())
-    
-    # Save results
-    print("\nSaving results...")
-    matches_df.to_csv('matched_streets.csv', index=False)
-    unmatched_df.to_csv('unmatched_streets.csv', index=False)
-    
-    print("\nResults have been saved to 'matched_streets.csv' and 'unmatched_streets.csv'")
-    
-    # Display some examples
-    print("\nExample of matched streets (first 5):")
-    print(matches_df[['Original_MDOT_Name', 'Standardized_Name', 'AADT_Current', 'Match_Type']].head().to_string())
-    
-    if len(unmatched) > 0:
-        print("\nExample of unmatched streets (first 5):")
-        print(unmatched_df[['Original_MDOT_Name', 'Standardized_Name', 'Station_Description']].head().to_string())
+        print(f"\nTotal MDOT streets: {len(mdot_df)}")
+        print(f"Total Edge streets: {len(edge_names_df)}")
+        
+        # Reuse results from previous runs against the same edge-names file
+        cache = None
+        results = pd.DataFrame(columns=RESULT_COLUMNS, index=mdot_df.index)
+        todo = pd.Series(True, index=mdot_df.index)
+        if cache_path:
+            cache = MatchCache(cache_path, file_fingerprint(edge_names_path))
+            with span('match_streets.cache_lookup', items=len(mdot_df)):
+                results, hit = cache.lookup(mdot_df)
+            count('match.cache_hits', hit.sum())
+            todo = ~hit
+        
+        matcher = None
+        if todo.any():
+            new_df = mdot_df[todo].copy()
+            
+            print("\nStandardizing MDOT street names...")
+            with span('match_streets.standardize', items=len(new_df) + len(edge_names_df)):
+                new_df['Standardized_Name'] = _standardizer.extract_base_names(
+                    new_df['Road Name'], new_df['Station Description']
+                )
+                
+                print("\nStandardizing Edge street names...")
+                edge_names_df['Standardized_Name'] = _standardizer.standardize_series(edge_names_df['Street_Name'])
+            print(f"Standardizer cache: {_standardizer.cache_info()}")
+            
+            # Perform matching
+            print("\nMatching streets...")
+            with span('match_streets.match', items=len(new_df)):
+                new_results, matcher = match_rows(new_df, edge_names_df, workers)
+            results = results.astype(object)
+            results.loc[todo] = new_results.astype(object)
+            if cache is not None:
+                cache.store(new_df, new_results)
+        
+        if cache is not None:
+            cache.close()
+        
+        matches_df, unmatched_df = split_match_results(mdot_df, results)
+        
+        # Print statistics
+        print("\nMatching Results:")
+        print(f"Total matched streets: {len(matches_df)}")
+        print(f"Total unmatched streets: {len(unmatched_df)}")
+        print(f"Match rate: {len(matches_df)/len(mdot_df)*100:.2f}%")
+        
+        if len(matches_df) > 0:
+            print("\nMatch types:")
+            print(matches_df['Match_Type'].value_counts())
+        
+        if cache is not None:
+            print(f"\nMatch cache: {cache.hits} hits, {cache.misses} misses")
+        
+        if matcher is not None:
+            stats = matcher.candidate_stats()
+            print(f"\nFuzzy candidates per query: mean {stats['mean']:.1f}, max {stats['max']} "
+                  f"(of {stats['index_size']} names, {stats['queries']} queries)")
+        
+        # Save results
+        print("\nSaving results...")
+        with span('match_streets.save', items=len(mdot_df)):
+            matches_df.to_csv('matched_streets.csv', index=False)
+            unmatched_df.to_csv('unmatched_streets.csv', index=False)
+        
+        print("\nResults have been saved to 'matched_streets.csv' and 'unmatched_streets.csv'")
+        
+        # Display some examples
+        print("\nExample of matched streets (first 5):")
+        print(matches_df[['Original_MDOT_Name', 'Standardized_Name', 'AADT_Current', 'Match_Type']].head().to_string())
+        
+        if len(unmatched_df) > 0:
+            print("\nExample of unmatched streets (first 5):")
+            print(unmatched_df[['Original_MDOT_Name', 'Standardized_Name', 'Station_Description']].head().to_string())
 
 if __name__ == "__main__":
-    # Enable tqdm for pandas
-    tqdm.pandas()
-    main() 
\ No newline at end of file
+    # python match_streets.py [--workers=N]; N > 1 fuzzy-matches in a process pool (0 = one per CPU)
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    n_workers = int(options.get('workers', 1))
+    main(workers=n_workers or None)
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# 节点列表字符串, 如 "[{49548197, 37627911}]", "[1, 2]" 或 "49548197"
+_NODE_LIST_PATTERN = re.compile(r'^[\s"\'\[\]{}(),\d]*$')
+_SEPARATORS = str.maketrans({c: ' ' for c in '"\'[]{}(),'})
+
+SIDECAR_VERSION = 2
+_INT64_MAX = np.iinfo(np.int64).max
+_CHUNK = 1 << 20
+
+
+class NodeLists:
+    """CSR 形式存储的节点列表: 一个扁平的 int64 数组加上每行的偏移量"""
+
+    def __init__(self, values, offsets, errors=0):
+        self.values = np.asarray(values, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.errors = int(errors)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def row_set(self, i):
+        """第 i 行的节点集合"""
+        return set(self[i].tolist())
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def row_ids(self):
+        """values 中每个元素所属的行号"""
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def unique_nodes(self):
+        return np.unique(self.values)
+
+    def save(self, path, signature=''):
+        np.savez(path, values=self.values, offsets=self.offsets,
+                 errors=np.int64(self.errors), signature=np.array(signature))
+
+    @classmethod
+    def load(cls, path, signature=''):
+        """读取缓存文件; 签名不一致时返回 None"""
+        with np.load(path) as data:
+            if str(data['signature']) != signature:
+                return None
+            return cls(data['values'], data['offsets'], int(data['errors']))
+
+
+def parse_node_lists(cells):
+    """批量解析节点列表单元格, 无法解析的单元格计为错误并视为空列表
+
+    只接受非负整数节点 ID: 含负号、小数点或其他字符的字符串单元格, 非整数
+    的浮点数, 以及超出 int64 范围的整数都计为错误 (整行丢弃)。
+    """
+    tokens = []
+    lengths = np.zeros(len(cells), dtype=np.int64)
+    errors = 0
+    for i, cell in enumerate(cells):
+        if cell is None:
+            continue
+        if isinstance(cell, str):
+            if not _NODE_LIST_PATTERN.match(cell):
+                errors += 1
+                continue
+            row = [int(token) for token in cell.translate(_SEPARATORS).split()]
+        elif isinstance(cell, (int, np.integer)):
+            row = [int(cell)]
+        elif isinstance(cell, (float, np.floating)):
+            if np.isnan(cell):
+                continue
+            if not float(cell).is_integer():
+                errors += 1
+                continue
+            row = [int(cell)]
+        else:
+            errors += 1
+            continue
+        if row and (max(row) > _INT64_MAX or min(row) < 0):
+            errors += 1
+            continue
+        tokens.extend(row)
+        lengths[i] = len(row)
+
+    values = np.array(tokens, dtype=np.int64) if tokens else np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return NodeLists(values, offsets, errors)
+
+
+def _source_signature(csv_path, column):
+    """缓存键: CSV 内容的哈希 (大小和 mtime 相同而内容不同时也能失效)"""
+    digest = hashlib.sha256(f"v{SIDECAR_VERSION}:{column}:".encode())
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sidecar_path(csv_path, column, directory=None):
+    """缓存文件路径: 默认在 CSV 旁边, 给出 directory 时放在该目录下"""
+    slug = re.sub(r'\W+', '_', column).strip('_')
+    base = csv_path if directory is None else os.path.join(directory, os.path.basename(csv_path))
+    return f"{base}.{slug}.nodes.npz"
+
+
+def load_node_lists(csv_path, column, df=None, use_sidecar=True, sidecar_dir=None):
+    """从 CSV 的某一列读取节点列表, 优先使用二进制缓存文件 (默认在 CSV 旁)"""
+    path = sidecar_path(csv_path, column, sidecar_dir)
+    signature = _source_signature(csv_path, column)
+    if use_sidecar and os.path.exists(path):
+        node_lists = NodeLists.load(path, signature)
+        if node_lists is not None:
+            return node_lists
+
+    if df is None:
+        df = pd.read_csv(csv_path, usecols=[column])
+    node_lists = parse_node_lists(df[column].tolist())
+    if use_sidecar:
+        try:
+            node_lists.save(path, signature)
+        except OSError:
+            pass
+    return node_lists
@@ -0,0 +1,125 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from geometry import haversine
+
+
+def _candidates(values, nodes=None, weights=None):
+    """去重后的候选节点 (可只保留图中节点) 及其归一化抽样概率"""
+    values = np.asarray(values, dtype=np.int64)
+    values, first = np.unique(values, return_index=True)
+    probs = None
+    if weights is not None:
+        probs = np.asarray(weights, dtype=np.float64)[first]
+    if nodes is not None:
+        keep = np.isin(values, np.fromiter(nodes, dtype=np.int64))
+        values = values[keep]
+        probs = probs[keep] if probs is not None else None
+    if probs is not None:
+        probs = np.where(np.isfinite(probs) & (probs > 0), probs, 0.0)
+        if probs.sum() == 0:
+            raise ValueError("All sampling weights are zero")
+        probs = probs / probs.sum()
+    return values, probs
+
+
+def _draw_unique(rng, n_origins, n_destinations, n, origin_probs=None, destination_probs=None,
+                 accept=None, max_rounds=50):
+    """批量抽取不重复的 (起点下标, 终点下标), 顺序与抽取顺序一致
+
+    每轮按缺口多抽一些, 用 起点下标 * 终点数 + 终点下标 作为整数键去重;
+    accept 可以再对候选对做筛选 (例如距离区间)。
+    """
+    n = min(n, n_origins * n_destinations)
+    keys = np.zeros(0, dtype=np.int64)
+    drawn_total, accepted_total = 0, 0
+    for _ in range(max_rounds):
+        missing = n - len(keys)
+        if missing <= 0:
+            break
+        # 按已观察到的接受率放大抽样量
+        rate = max(accepted_total, 1) / max(drawn_total, 1)
+        size = int(min(max(2 * missing / rate, 64), 10 ** 7))
+        o = rng.choice(n_origins, size=size, p=origin_probs)
+        d = rng.choice(n_destinations, size=size, p=destination_probs)
+        if accept is not None:
+            ok = accept(o, d)
+            o, d = o[ok], d[ok]
+        drawn_total += size
+        accepted_total += len(o)
+        drawn = np.concatenate([keys, o.astype(np.int64) * n_destinations + d])
+        # 保留每个键第一次出现的位置, 结果只取决于随机数流
+        _, first = np.unique(drawn, return_index=True)
+        keys = drawn[np.sort(first)]
+    keys = keys[:n]
+    return keys // n_destinations, keys % n_destinations
+
+
+def sample_pairs(origins, destinations, n: int, seed: int = 42, nodes=None,
+                 origin_weights=None, destination_weights=None) -> Tuple[np.ndarray, np.ndarray]:
+    """从起点集合和终点集合中抽取 n 个不重复的 OD 对
+
+    nodes 给出时只使用其中的节点 (例如 G); 权重给出时按权重抽样,
+    否则均匀抽样。OD 对总数不足 n 时返回全部可能的组合中能抽到的部分。
+    """
+    o_values, o_probs = _candidates(origins, nodes, origin_weights)
+    d_values, d_probs = _candidates(destinations, nodes, destination_weights)
+    if len(o_values) == 0 or len(d_values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    oi, di = _draw_unique(rng, len(o_values), len(d_values), n, o_probs, d_probs)
+    return o_values[oi], d_values[di]
+
+
+def sample_stratified(strata: Dict[str, Tuple[Sequence, Sequence, int]], seed: int = 42,
+                      nodes=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """分层抽样: strata 为 {层名称: (起点集合, 终点集合, 抽样数)}
+
+    每层使用由 seed 派生的独立随机数流, 增删一层不影响其他层的结果。
+    返回 (起点, 终点, 层名称) 三个数组。
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(strata))
+    src, dst, labels = [], [], []
+    for (name, (origins, destinations, n)), stream in zip(strata.items(), seeds):
+        s, d = sample_pairs(origins, destinations, n, seed=stream, nodes=nodes)
+        src.append(s)
+        dst.append(d)
+        labels.append(np.full(len(s), name, dtype=object))
+    if not src:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=object)
+    return np.concatenate(src), np.concatenate(dst), np.concatenate(labels)
+
+
+def sample_by_distance(origins, destinations, geometry, bands: Sequence[Tuple[float, float]],
+                       n_per_band: int, seed: int = 42, nodes=None, max_rounds: int = 50
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按起终点直线距离 (米) 分段抽样, 每个区间 [low, high) 抽 n_per_band 对
+
+    返回 (起点, 终点, 区间编号)。候选节点必须在 geometry 中有坐标。
+    """
+    o_values, _ = _candidates(origins, nodes)
+    d_values, _ = _candidates(destinations, nodes)
+    o_lat, o_lon = geometry.coords(o_values)
+    d_lat, d_lon = geometry.coords(d_values)
+    seeds = np.random.SeedSequence(seed).spawn(len(bands))
+    src, dst, band_ids = [], [], []
+    for b, ((low, high), stream) in enumerate(zip(bands, seeds)):
+        def in_band(o, d, low=low, high=high):
+            dist = haversine(o_lat[o], o_lon[o], d_lat[d], d_lon[d])
+            return (dist >= low) & (dist < high)
+
+        oi, di = _draw_unique(np.random.default_rng(stream), len(o_values), len(d_values),
+                              n_per_band, accept=in_band, max_rounds=max_rounds)
+        src.append(o_values[oi])
+        dst.append(d_values[di])
+        band_ids.append(np.full(len(oi), b, dtype=np.int64))
+    return np.concatenate(src), np.concatenate(dst), np.concatenate(band_ids)
+
+
+def capacity_weights(nodes, edges: pd.DataFrame, column: str = 'capacity') -> np.ndarray:
+    """节点重要度: 以该节点为起点的边的最大通行能力 (与 north_top5 的口径一致), 无出边为 0"""
+    best = edges.groupby('u')[column].max()
+    return best.reindex(np.asarray(nodes, dtype=np.int64)).fillna(0).to_numpy(dtype=np.float64)
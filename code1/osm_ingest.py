@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# 读取 / 清洗规则变化时递增, 旧的 Parquet 缓存会全部重建
+INGEST_VERSION = 1
+
+# 研究中用到的边属性; geometry 等大字段不读入
+EDGE_COLUMNS = ['u', 'v', 'key', 'highway', 'lanes', 'maxspeed', 'length', 'name', 'oneway']
+NODE_COLUMNS = ['osmid', 'x', 'y']
+
+EDGE_DTYPES = {'u': 'int64', 'v': 'int64', 'key': 'int64', 'length': 'float32', 'name': 'object'}
+NODE_DTYPES = {'osmid': 'int64', 'x': 'float64', 'y': 'float64'}
+
+# 列表字面量单元格, 如 "['primary', 'secondary']", 取第一个元素
+_FIRST_ITEM = r"^\[\s*['\"]?([^'\",\]]*)['\"]?"
+
+
+def first_list_item(values: pd.Series) -> pd.Series:
+    """批量解析列表字面量: "[...]" 取第一个元素, 其他值原样保留 (不使用 eval)"""
+    text = values.astype('string')
+    is_list = text.str.startswith('[').fillna(False)
+    if not is_list.any():
+        return values
+    values = values.astype(object).copy()
+    values[is_list] = text[is_list].str.extract(_FIRST_ITEM, expand=False).str.strip().astype(object)
+    return values
+
+
+def parse_maxspeed(values: pd.Series) -> pd.Series:
+    """'35 mph' -> 35.0, 列表取第一个值; 无法解析的值为 NaN"""
+    text = first_list_item(values).astype('string').str.replace('mph', '', regex=False).str.strip()
+    return pd.to_numeric(text, errors='coerce').astype('float32')
+
+
+def _clean_edge_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk['lanes'] = pd.to_numeric(chunk['lanes'], errors='coerce').astype('float32')
+    chunk['maxspeed'] = parse_maxspeed(chunk['maxspeed'])
+    chunk['highway'] = first_list_item(chunk['highway']).astype('category')
+    return chunk
+
+
+def _read_chunks(path, columns, dtypes, chunksize, clean=None):
+    reader = pd.read_csv(path, usecols=lambda c: c in columns,
+                         dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        yield clean(chunk) if clean is not None else chunk
+
+
+def _concat(chunks):
+    """合并各块; 类别列先合并类别表, 避免退化为 object"""
+    chunks = [c for c in chunks if len(c)]
+    if not chunks:
+        return pd.DataFrame()
+    categorical = [c for c in chunks[0].columns if isinstance(chunks[0][c].dtype, pd.CategoricalDtype)]
+    merged = {c: union_categoricals([chunk[c] for chunk in chunks]) for c in categorical}
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for c in categorical:
+        df[c] = merged[c]
+    return df[chunks[0].columns]
+
+
+def read_edges(paths, chunksize=200000) -> pd.DataFrame:
+    """按块读取一个或多个边表, 按 (u, v, key) 去重 (保留先出现的)"""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    chunks = [chunk for path in paths
+              for chunk in _read_chunks(path, EDGE_COLUMNS, EDGE_DTYPES, chunksize, _clean_edge_chunk)]
+    edges = _concat(chunks)
+    return edges.drop_duplicates(['u', 'v', 'key'], keep='first').reset_index(drop=True)
+
+
+def read_nodes(paths, chunksize=500000) -> pd.DataFrame:
+    """按块读取一个或多个节点表, 按 osmid 去重 (保留先出现的)"""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    nodes = _concat([chunk for path in paths
+                     for chunk in _read_chunks(path, NODE_COLUMNS, NODE_DTYPES, chunksize)])
+    return nodes.drop_duplicates('osmid', keep='first').reset_index(drop=True)
+
+
+def fill_missing(edges: pd.DataFrame, default_speed=55) -> pd.DataFrame:
+    """车道数缺失时取同类道路的中位数, 限速缺失时取默认值"""
+    lanes_median = edges.groupby('highway', observed=True)['lanes'].transform('median')
+    edges['lanes'] = edges['lanes'].fillna(lanes_median).astype('float32')
+    edges['maxspeed'] = edges['maxspeed'].fillna(default_speed).astype('float32')
+    return edges
+
+
+def _manifest_path(output):
+    return f"{output}.sources.json"
+
+
+def _source_manifest(sources):
+    """缓存的来源: 各源文件 (按给出的顺序) 的路径、大小和修改时间"""
+    files = []
+    for path in sources:
+        stat = os.stat(path)
+        files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return {'version': INGEST_VERSION, 'sources': files}
+
+
+def _is_fresh(output, sources):
+    """Parquet 缓存是否由同一组 (未改动的) 源文件生成"""
+    if not os.path.exists(output):
+        return False
+    try:
+        with open(_manifest_path(output)) as f:
+            return json.load(f) == _source_manifest(sources)
+    except (OSError, ValueError):
+        return False
+
+
+def load_drive_network(edge_paths, node_paths, edges_out='data/edges_drive_merge.parquet',
+                       nodes_out='data/nodes_drive_merge.parquet', chunksize=200000):
+    """读取并清洗 (合并后的) 路网, 结果写为 Parquet
+
+    Parquet 旁的 .sources.json 记录生成它的源文件列表 (路径、大小、修改时间);
+    源文件列表和各文件都未变化时直接读取 Parquet。
+    """
+    edge_paths = [edge_paths] if isinstance(edge_paths, str) else list(edge_paths)
+    node_paths = [node_paths] if isinstance(node_paths, str) else list(node_paths)
+    if _is_fresh(edges_out, edge_paths) and _is_fresh(nodes_out, node_paths):
+        return pd.read_parquet(edges_out), pd.read_parquet(nodes_out)
+
+    edges = fill_missing(read_edges(edge_paths, chunksize))
+    nodes = read_nodes(node_paths, chunksize)
+    for df, out, sources in ((edges, edges_out, edge_paths), (nodes, nodes_out, node_paths)):
+        if os.path.dirname(out):
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+        # 来源清单先删除、最后写入: Parquet 写到一半失败时缓存不会被当作有效
+        if os.path.exists(_manifest_path(out)):
+            os.remove(_manifest_path(out))
+        df.to_parquet(out, index=False)
+        with open(_manifest_path(out), 'w') as f:
+            json.dump(_source_manifest(sources), f, indent=1)
+    return edges, nodes
+
+
+if __name__ == "__main__":
+    # python osm_ingest.py edges1.csv[,edges2.csv] nodes1.csv[,nodes2.csv]
+    edges, nodes = load_drive_network(sys.argv[1].split(','), sys.argv[2].split(','))
+    memory = (edges.memory_usage(deep=True).sum() + nodes.memory_usage(deep=True).sum()) / 2 ** 20
+    print(f"Loaded {len(edges)} edges and {len(nodes)} nodes ({memory:.1f} MiB)")
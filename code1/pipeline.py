@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+STATE_VERSION = 1
+_CHUNK = 1 << 20
+
+
+class Stage:
+    """流水线中的一个阶段: 读取 inputs, 调用 func(**params), 写出 outputs
+
+    code 为阶段依赖的源文件, 代码变化时阶段也会重新运行。options 是不影响
+    输出的运行参数 (如进程数), 与 params 一起传给 func, 但不计入指纹。
+    """
+
+    def __init__(self, name: str, func, inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+                 params: Optional[Dict] = None, code: Iterable[str] = (), options: Optional[Dict] = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.code = list(code)
+        self.options = dict(options or {})
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+def _file_list(path: str) -> List[str]:
+    """文件本身, 或目录 (如 GraphStore) 下的所有文件"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+    return [path]
+
+
+def _stat(path: str) -> List:
+    """输出文件 (或目录) 的大小和修改时间, 用于判断输出是否被改动过"""
+    return [[os.path.relpath(f, path) if f != path else '', os.path.getsize(f), os.stat(f).st_mtime_ns]
+            for f in _file_list(path)]
+
+
+class Pipeline:
+    """按内容哈希判断是否过期的 DAG 流水线
+
+    阶段之间的依赖由文件推断: 一个阶段的输入是另一个阶段的输出时, 前者依赖后者。
+    阶段的指纹由 输入文件内容、参数和代码 计算; 指纹与上次成功运行时相同且
+    输出文件未被改动的阶段直接跳过。互不依赖的阶段在进程池中并行运行。
+    文件哈希按 (大小, 修改时间) 缓存, 未改动的大文件不会重复读取。
+    """
+
+    def __init__(self, stages: List[Stage], state_path: str = '.pipeline_state.json'):
+        names = [s.name for s in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Stage names must be unique")
+        self.stages = {s.name: s for s in stages}
+        self.state_path = state_path
+        producers = {}
+        for stage in stages:
+            for path in stage.outputs:
+                if path in producers:
+                    raise ValueError(f"{path} is produced by both {producers[path]} and {stage.name}")
+                producers[path] = stage.name
+        self.deps = {s.name: sorted({producers[p] for p in s.inputs if p in producers}) for s in stages}
+        self.order = self._toposort()
+        self.state = self._load_state()
+
+    def _toposort(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage {name}")
+            visiting.add(name)
+            for dep in self.deps[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        return {'version': STATE_VERSION, 'files': {}, 'stages': {}}
+
+    def _save_state(self):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def file_hash(self, path: str) -> str:
+        """文件 (或目录) 的内容哈希"""
+        digest = hashlib.sha256()
+        for f in _file_list(path):
+            stat = os.stat(f)
+            key = [stat.st_size, stat.st_mtime_ns]
+            cached = self.state['files'].get(f)
+            if cached is None or cached[:2] != key:
+                h = hashlib.sha256()
+                with open(f, 'rb') as fh:
+                    for block in iter(lambda: fh.read(_CHUNK), b''):
+                        h.update(block)
+                cached = key + [h.hexdigest()]
+                self.state['files'][f] = cached
+            digest.update(os.path.relpath(f, path).encode())
+            digest.update(cached[2].encode())
+        return digest.hexdigest()
+
+    def fingerprint(self, name: str) -> str:
+        stage = self.stages[name]
+        digest = hashlib.sha256(f"v{STATE_VERSION}:{name}:".encode())
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for path in stage.inputs + stage.code:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Stage {name}: input {path} does not exist")
+            digest.update(path.encode())
+            digest.update(self.file_hash(path).encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, name: str, fingerprint: str) -> bool:
+        record = self.state['stages'].get(name)
+        if record is None or record['fingerprint'] != fingerprint:
+            return False
+        return all(os.path.exists(p) and _stat(p) == record['outputs'].get(p)
+                   for p in self.stages[name].outputs)
+
+    def _selected(self, targets: Optional[Iterable[str]]) -> List[str]:
+        """目标阶段及其所有上游阶段 (拓扑顺序)"""
+        if not targets:
+            return list(self.order)
+        wanted = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage {name}")
+            if name not in wanted:
+                wanted.add(name)
+                stack.extend(self.deps[name])
+        return [n for n in self.order if n in wanted]
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: Iterable[str] = (),
+            workers: Optional[int] = 1) -> Dict[str, Dict]:
+        """运行流水线, 返回 {阶段: {'status': ran/skipped/failed/blocked, 'seconds': ...}}
+
+        force 中的阶段无论是否过期都重新运行; workers 不为 1 时就绪的阶段在进程池中
+        并行运行 (None 为 CPU 核数), 默认在本进程中依次运行。
+        """
+        selected = self._selected(targets)
+        force = set(force)
+        workers = workers or os.cpu_count() or 1
+        report = {}
+        pending = list(selected)
+        running = {}
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while pending or running:
+                for name in list(pending):
+                    active = {n for n, _ in running.values()}
+                    if any(dep in pending or dep in active for dep in self.deps[name]):
+                        continue
+                    pending.remove(name)
+                    failed_deps = [d for d in self.deps[name]
+                                   if report.get(d, {}).get('status') in ('failed', 'blocked')]
+                    if failed_deps:
+                        report[name] = {'status': 'blocked', 'seconds': 0.0, 'error': f"upstream {failed_deps}"}
+                        continue
+                    try:
+                        fingerprint = self.fingerprint(name)
+                    except FileNotFoundError as e:
+                        report[name] = {'status': 'failed', 'seconds': 0.0, 'error': str(e)}
+                        print(f"[pipeline] {name}: {e}")
+                        continue
+                    if name not in force and self.is_fresh(name, fingerprint):
+                        report[name] = {'status': 'skipped', 'seconds': 0.0}
+                        print(f"[pipeline] {name}: 已是最新, 跳过")
+                        continue
+                    print(f"[pipeline] {name}: 开始运行")
+                    stage = self.stages[name]
+                    kwargs = {**stage.params, **stage.options}
+                    if pool is None:
+                        outcome = _run_stage(stage.func, kwargs)
+                        self._finish(name, fingerprint, outcome, report)
+                    else:
+                        running[pool.submit(_run_stage, stage.func, kwargs)] = (name, fingerprint)
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, fingerprint = running.pop(future)
+                        self._finish(name, fingerprint, future.result(), report)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self._save_state()
+        return report
+
+    def _finish(self, name, fingerprint, outcome, report):
+        seconds, error = outcome
+        stage = self.stages[name]
+        missing = [p for p in stage.outputs if not os.path.exists(p)]
+        if error is None and missing:
+            error = f"outputs not written: {missing}"
+        if error is not None:
+            self.state['stages'].pop(name, None)
+            report[name] = {'status': 'failed', 'seconds': seconds, 'error': error}
+            print(f"[pipeline] {name}: 失败 ({seconds:.1f}s)\n{error}")
+        else:
+            self.state['stages'][name] = {
+                'fingerprint': fingerprint,
+                'outputs': {p: _stat(p) for p in stage.outputs}
+            }
+            report[name] = {'status': 'ran', 'seconds': seconds}
+            print(f"[pipeline] {name}: 完成 ({seconds:.1f}s)")
+        self._save_state()
+
+
+def _run_stage(func, params):
+    """在 (子) 进程中运行一个阶段, 返回 (耗时, 错误信息或 None)"""
+    start = time.perf_counter()
+    try:
+        func(**params)
+        return time.perf_counter() - start, None
+    except Exception:
+        return time.perf_counter() - start, traceback.format_exc()
+
+
+def _match_streets(workers=1):
+    from match_streets import main
+    main(workers=workers)
+
+
+def _analyze_unmatched():
+    from analyze_unmatched import analyze_unmatched
+    analyze_unmatched()
+
+
+def _analyze_processed(data_path, output_path):
+    from analyze_processed_data import analyze_data
+    analyze_data(data_path, output_path)
+
+
+def _build_network(traffic_data_path, nodes_file_path, output_path):
+    from build_network import NetworkBuilder
+    NetworkBuilder().build_network(traffic_data_path, nodes_file_path, output_path=output_path)
+
+
+def _analyze_network(network_path, output_path):
+    from analyze_network import main
+    main(network_path, output_path)
+
+
+def _predict(traffic_csv, output_path, years, method='robust'):
+    from forecast_registry import ForecastRegistry
+    from instrumentation import span, trace_path, tracing
+    from station_history import load_station_history
+
+    with tracing(trace_path(output_path), 'predict'):
+        registry = ForecastRegistry('forecast_registry.sqlite', method=method)
+        try:
+            with span('predict.load_history') as load_span:
+                history = load_station_history(traffic_csv)
+                load_span.set(items=len(history))
+            stats = registry.update(history)
+            print(f"模型复用: {stats['reused']} 个测站, 重新训练: {stats['retrained']} 个测站, "
+                  f"删除: {stats['removed']} 个测站")
+            registry.forecast(years).to_csv(output_path, index=False)
+        finally:
+            registry.close()
+
+
+# 源数据 (没有阶段产生它们, 需事先放在 code1 目录下)
+MDOT_CSV = 'MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv'
+EDGE_NAMES_CSV = 'Edge_Names_With_Nodes.csv'
+# 带 node start / node(s) end 节点列表和 V/C 指标的 MDOT 数据, 由仓库外的预处理得到
+PROCESSED_CSV = 'processed_mdot_data.csv'
+NETWORK_PATH = 'data/processed/traffic_network.graph'
+
+
+def default_stages(workers: Optional[int] = 1) -> List[Stage]:
+    """code1 目录下各脚本组成的流水线
+
+    match -> analyze_unmatched; PROCESSED_CSV -> analyze_processed;
+    PROCESSED_CSV + EDGE_NAMES_CSV -> build -> analyze_network; MDOT_CSV -> predict。
+    同一个文件在各阶段中使用同一路径, 依赖关系由这些路径推断。
+    workers 为 match 阶段模糊匹配的进程数 (默认串行, None 为 CPU 核数)。
+    """
+    return [
+        Stage('match', _match_streets, [MDOT_CSV, EDGE_NAMES_CSV],
+              ['matched_streets.csv', 'unmatched_streets.csv'],
+              code=['match_streets.py', 'match_cache.py', 'street_standardizer.py', 'street_index.py',
+                    'instrumentation.py'],
+              options={'workers': workers}),
+        Stage('analyze_unmatched', _analyze_unmatched, ['unmatched_streets.csv'],
+              ['unmatched_analysis.txt'], code=['analyze_unmatched.py']),
+        Stage('analyze_processed', _analyze_processed, [PROCESSED_CSV], ['road_statistics.csv'],
+              {'data_path': PROCESSED_CSV, 'output_path': 'road_statistics.csv'},
+              ['analyze_processed_data.py']),
+        Stage('build', _build_network, [PROCESSED_CSV, EDGE_NAMES_CSV],
+              [NETWORK_PATH, 'data/processed/traffic_network.graphml'],
+              {'traffic_data_path': PROCESSED_CSV, 'nodes_file_path': EDGE_NAMES_CSV,
+               'output_path': NETWORK_PATH},
+              ['build_network.py', 'graph_store.py', 'node_lists.py', 'instrumentation.py']),
+        Stage('analyze_network', _analyze_network, [NETWORK_PATH], ['network_analysis_results.json'],
+              {'network_path': NETWORK_PATH, 'output_path': 'network_analysis_results.json'},
+              ['analyze_network.py', 'centrality.py', 'shortest_paths.py', 'vulnerability.py',
+               'routing_index.py', 'graph_store.py', 'instrumentation.py']),
+        Stage('predict', _predict, [MDOT_CSV], ['traffic_predictions.csv'],
+              {'traffic_csv': MDOT_CSV, 'output_path': 'traffic_predictions.csv', 'years': [2023, 2024]},
+              ['forecast.py', 'forecast_registry.py', 'station_history.py', 'instrumentation.py']),
+    ]
+
+
+if __name__ == "__main__":
+    # python pipeline.py [阶段 ...] [--force=阶段1,阶段2] [--workers=N] [--trace=1]; 在 code1 目录下运行
+    # --workers 同时是并行运行的阶段数和 match 阶段模糊匹配的进程数; 默认 1 (串行), 0 为 CPU 核数
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    n_workers = int(options.get('workers', 1)) or None
+    if 'trace' in options:
+        # 通过环境变量开启 trace (并行时各阶段在子进程中运行), 写在各阶段输出文件旁
+        from instrumentation import TRACE_ENV
+        os.environ[TRACE_ENV] = options['trace']
+    pipeline = Pipeline(default_stages(n_workers))
+    report = pipeline.run(args, force=[s for s in options.get('force', '').split(',') if s],
+                          workers=n_workers)
+    print("\n=== 流水线结果 ===")
+    for stage_name, info in report.items():
+        print(f"{stage_name}: {info['status']} ({info['seconds']:.1f}s)")
+    sys.exit(1 if any(info['status'] in ('failed', 'blocked') for info in report.values()) else 0)
@@ -0,0 +1,251 @@
+import hashlib
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from instrumentation import count, traced
+from shortest_paths import BatchedShortestPaths
+
+INDEX_VERSION = 1
+# 搜索半径 (约化距离) 的初值占起点下界的比例, 以及找不到终点时的放大倍数
+INITIAL_SLACK = 0.02
+SLACK_GROWTH = 2.0
+
+
+class LandmarkIndex:
+    """ALT (A* + 地标 + 三角不等式) 点对点路由索引
+
+    预先计算若干地标到所有节点、所有节点到地标的最短距离, 查询时由三角不等式
+    得到到终点距离的下界, 作为 A* 的启发函数; 下界为无穷时可以直接判定不可达,
+    不需要额外的连通性检查。索引可以保存到磁盘, 图或权重变化后会被判为失效。
+
+    A* 等价于在约化权重 w(u, v) - h(u) + h(v) 上做 Dijkstra。单个地标方向的
+    下界 (如 d(l, t) - d(l, v)) 对应的约化权重 w + d(l, u) - d(l, v) 与终点无关,
+    所以每个地标方向的约化矩阵只在第一次用到时计算一次; 查询时选起点处下界
+    最大的方向, 用 scipy 的 Dijkstra 并以 limit 限定搜索半径 (逐步放大),
+    只展开 A* 会展开的节点, 不需要 Python 层的优先队列循环。
+    """
+
+    def __init__(self, store, weight: Optional[str] = 'weight', landmarks=None, dist_from=None, dist_to=None):
+        self.store = store
+        self.weight = weight
+        self.engine = BatchedShortestPaths(store, weight=weight)
+        self._degrees = np.diff(self.engine.matrix.indptr)
+        self._reduced = {}
+        # 搜索半径的最小初值: 典型的单条边长度
+        self._step = float(np.median(self.engine.matrix.data)) if store.num_edges else 1.0
+        self.fingerprint = self._fingerprint()
+        self.landmarks = landmarks
+        self.dist_from = dist_from
+        self.dist_to = dist_to
+
+    def _fingerprint(self) -> str:
+        matrix = self.engine.matrix
+        digest = hashlib.sha256(f"v{INDEX_VERSION}:{self.weight}:".encode())
+        for array in (matrix.indptr, matrix.indices, matrix.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    @property
+    def built(self) -> bool:
+        return self.landmarks is not None
+
+    @traced('routing.build_index')
+    def build(self, n_landmarks: int = 16, seed: int = 42) -> 'LandmarkIndex':
+        """最远点策略选取地标: 每次选离已有地标最远 (且可达) 的节点"""
+        n = self.store.num_nodes
+        n_landmarks = min(n_landmarks, n)
+        matrix = self.engine.matrix
+        transposed = matrix.T.tocsr()
+        rng = np.random.default_rng(seed)
+
+        landmarks = []
+        dist_from = np.zeros((n_landmarks, n))
+        dist_to = np.zeros((n_landmarks, n))
+        nearest = np.full(n, np.inf)
+        candidate = int(rng.integers(n))
+        for k in range(n_landmarks):
+            landmarks.append(candidate)
+            dist_from[k] = dijkstra(matrix, directed=True, indices=candidate)
+            dist_to[k] = dijkstra(transposed, directed=True, indices=candidate)
+            count('dijkstra.calls', 2)
+            count('dijkstra.sources', 2)
+            # 到已选地标的 (双向) 最小距离; 不可达的节点不作为候选
+            spread = np.minimum(dist_from[k], dist_to[k])
+            nearest = np.minimum(nearest, np.where(np.isfinite(spread), spread, np.inf))
+            score = np.where(np.isfinite(nearest), nearest, -1.0)
+            score[landmarks] = -1.0
+            if score.max() <= 0:
+                # 当前连通部分已覆盖, 从未覆盖的节点中随机选取
+                uncovered = np.flatnonzero(~np.isfinite(nearest))
+                if len(uncovered) == 0:
+                    n_landmarks = k + 1
+                    break
+                candidate = int(rng.choice(uncovered))
+            else:
+                candidate = int(score.argmax())
+
+        self.landmarks = np.array(landmarks, dtype=np.int64)
+        self.dist_from = dist_from[:n_landmarks]
+        self.dist_to = dist_to[:n_landmarks]
+        self._reduced = {}
+        return self
+
+    def save(self, path: str) -> None:
+        np.savez(path, landmarks=self.landmarks, dist_from=self.dist_from, dist_to=self.dist_to,
+                 fingerprint=np.array(self.fingerprint), weight=np.array(self.weight))
+
+    @classmethod
+    def load(cls, path: str, store, weight: Optional[str] = 'weight') -> Optional['LandmarkIndex']:
+        """读取索引; 与当前图不一致时返回 None"""
+        index = cls(store, weight)
+        with np.load(path) as data:
+            if str(data['fingerprint']) != index.fingerprint:
+                return None
+            index.landmarks = data['landmarks']
+            index.dist_from = data['dist_from']
+            index.dist_to = data['dist_to']
+        index._reduced = {}
+        return index
+
+    @classmethod
+    def load_or_build(cls, path: str, store, weight: Optional[str] = 'weight', n_landmarks: int = 16,
+                      seed: int = 42) -> 'LandmarkIndex':
+        if os.path.exists(path):
+            index = cls.load(path, store, weight)
+            if index is not None:
+                return index
+        index = cls(store, weight).build(n_landmarks, seed)
+        index.save(path)
+        return index
+
+    def _direction(self, s: int, t: int) -> Tuple[int, float]:
+        """起点处下界最大的地标方向及该下界 (inf 表示一定不可达, -inf 表示没有可用的地标)
+
+        方向 k < L 为地标 k 的正向下界 d(l, t) - d(l, v), 只在 d(l, s) 有限时可用;
+        k >= L 为反向下界 d(v, l) - d(t, l), 只在 d(t, l) 有限时可用。
+        """
+        with np.errstate(invalid='ignore'):
+            forward = np.where(np.isfinite(self.dist_from[:, s]),
+                               self.dist_from[:, t] - self.dist_from[:, s], -np.inf)
+            backward = np.where(np.isfinite(self.dist_to[:, t]),
+                                self.dist_to[:, s] - self.dist_to[:, t], -np.inf)
+        bounds = np.concatenate([forward, backward])
+        k = int(bounds.argmax())
+        return k, float(bounds[k])
+
+    def _reduced_matrix(self, k: int):
+        """地标方向 k 的约化权重矩阵 (与终点无关, 按需计算并缓存)"""
+        if k not in self._reduced:
+            n_landmarks = len(self.landmarks)
+            potential = -self.dist_from[k] if k < n_landmarks else self.dist_to[k - n_landmarks]
+            matrix = self.engine.matrix
+            with np.errstate(invalid='ignore'):
+                reduced = matrix.data - np.repeat(potential, self._degrees) + potential[matrix.indices]
+            # 非有限的约化权重只出现在到不了终点的节点上, 这些边不会被使用
+            reduced = np.where(np.isfinite(reduced), np.maximum(reduced, 0.0), np.inf)
+            self._reduced[k] = csr_matrix((reduced, matrix.indices, matrix.indptr), shape=matrix.shape)
+        return self._reduced[k]
+
+    def _astar(self, s: int, t: int, paths: bool = True) -> Tuple[float, Optional[np.ndarray]]:
+        """ALT 查询: 返回 (距离, 前驱数组); 不可达或 paths=False 时前驱数组为 None"""
+        if s == t:
+            return 0.0, None
+        k, bound = self._direction(s, t)
+        if bound == np.inf:
+            return np.inf, None
+        if bound == -np.inf:
+            return self._exact(s, t, paths)
+        count('astar.queries')
+        reduced = self._reduced_matrix(k)
+
+        # 约化距离 = 真实距离 - bound; 经过地标的路径长度是真实距离的上界
+        upper = float(np.min(self.dist_to[:, s] + self.dist_from[:, t])) - bound
+        limit = max(bound * INITIAL_SLACK, self._step)
+        while True:
+            limit = min(limit, upper * (1 + 1e-9) + 1e-9)
+            result = dijkstra(reduced, directed=True, indices=s, return_predecessors=paths, limit=limit)
+            dist, pred = result if paths else (result, None)
+            count('dijkstra.calls')
+            if np.isfinite(dist[t]):
+                return float(dist[t] + bound), pred
+            if limit >= upper:
+                return np.inf, None
+            # 没有经过地标的上界时, 已展开部分没有通往未展开节点的边即说明不可达
+            settled = np.isfinite(dist)
+            frontier = (np.repeat(settled, self._degrees) & ~settled[reduced.indices]
+                        & np.isfinite(reduced.data))
+            if not frontier.any():
+                return np.inf, None
+            limit *= SLACK_GROWTH
+
+    def _exact(self, s: int, t: int, paths: bool = True) -> Tuple[float, Optional[np.ndarray]]:
+        """回退: 单源精确 Dijkstra (scipy)"""
+        result = dijkstra(self.engine.matrix, directed=True, indices=s, return_predecessors=paths)
+        dist, pred = result if paths else (result, None)
+        count('dijkstra.calls')
+        count('dijkstra.sources')
+        return float(dist[t]), pred
+
+    def _resolve(self, node) -> int:
+        idx = int(self.store.node_index([node])[0])
+        if idx < 0:
+            raise KeyError(f"Node {node} is not in the graph")
+        return idx
+
+    def route(self, source, target, exact: bool = False) -> Tuple[float, List]:
+        """(距离, 节点 ID 路径); 不可达时为 (inf, [])。索引未建立或 exact=True 时用精确 Dijkstra"""
+        s, t = self._resolve(source), self._resolve(target)
+        if exact or not self.built:
+            length, pred = self._exact(s, t)
+        else:
+            length, pred = self._astar(s, t)
+        if not np.isfinite(length):
+            return np.inf, []
+        path = [t]
+        while path[-1] != s:
+            path.append(int(pred[path[-1]]))
+        node_ids = np.asarray(self.store.node_ids)
+        return length, node_ids[path[::-1]].tolist()
+
+    def distance(self, source, target, exact: bool = False) -> float:
+        return self.route(source, target, exact)[0]
+
+    def distances(self, sources, targets, exact: bool = False) -> np.ndarray:
+        """逐对查询距离 (exact=True 时按起点分批做精确 Dijkstra)"""
+        src = self.store.node_index(sources)
+        dst = self.store.node_index(targets)
+        if (src < 0).any() or (dst < 0).any():
+            raise KeyError("OD pairs contain nodes that are not in the graph")
+        if exact or not self.built:
+            return self.engine.query_indices(src, dst)['length']
+        return np.array([self._astar(s, t, paths=False)[0] for s, t in zip(src.tolist(), dst.tolist())])
+
+    def validate(self, n_pairs: int = 200, seed: int = 42, rtol: float = 1e-9) -> Dict:
+        """与精确 Dijkstra 对比随机 OD 对的距离, 返回误差和耗时统计"""
+        rng = np.random.default_rng(seed)
+        node_ids = np.asarray(self.store.node_ids)
+        sources = node_ids[rng.integers(0, len(node_ids), n_pairs)]
+        targets = node_ids[rng.integers(0, len(node_ids), n_pairs)]
+
+        start = time.perf_counter()
+        indexed = self.distances(sources, targets)
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        exact = self.distances(sources, targets, exact=True)
+        exact_time = time.perf_counter() - start
+
+        both = np.isfinite(indexed) & np.isfinite(exact)
+        mismatch = (np.isfinite(indexed) != np.isfinite(exact))
+        mismatch[both] = ~np.isclose(indexed[both], exact[both], rtol=rtol)
+        return {
+            'pairs': n_pairs,
+            'mismatches': int(mismatch.sum()),
+            'max_abs_error': float(np.abs(indexed[both] - exact[both]).max()) if both.any() else 0.0,
+            'index_time': index_time,
+            'exact_time': exact_time
+        }
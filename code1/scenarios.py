@@ -0,0 +1,124 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shortest_paths import BatchedShortestPaths
+
+# 影响等级 (与桥梁倒塌研究中的阈值一致)
+IMPACT_LEVELS = ['severe', 'moderate', 'slight', 'minimal', 'unreachable']
+
+
+def classify_ratios(ratios) -> np.ndarray:
+    """按距离变化比例分级: >2 严重, >=1.5 有影响, >=1.1 有一定影响, 其余几乎无影响; inf 为不可达"""
+    ratios = np.asarray(ratios, dtype=np.float64)
+    codes = np.select(
+        [np.isinf(ratios), ratios > 2, ratios >= 1.5, ratios >= 1.1],
+        [4, 0, 1, 2],
+        default=3
+    )
+    return np.array(IMPACT_LEVELS, dtype=object)[codes]
+
+
+class ScenarioEngine:
+    """删边情景批量分析
+
+    对一组 OD 对只计算一次基准最短路径, 并以 CSR 形式记录每条路径经过的边。
+    每个情景 (一组被删除的边) 表示为边掩码, 只重算基准路径经过了被删边的
+    OD 对, 其余 OD 对的距离保持不变; 原图数据不会被复制或修改。
+    """
+
+    def __init__(self, store, sources, targets, weight: Optional[str] = 'weight', batch_size: int = 16):
+        self.store = store
+        self.batch_size = batch_size
+        self.paths = BatchedShortestPaths(store, weight=weight)
+        self.src = store.node_index(sources)
+        self.dst = store.node_index(targets)
+        if (self.src < 0).any() or (self.dst < 0).any():
+            raise KeyError("OD pairs contain nodes that are not in the graph")
+        self.sources = np.asarray(sources)
+        self.targets = np.asarray(targets)
+
+        baseline = self.paths.query_indices(self.src, self.dst, batch_size=batch_size, return_paths=True)
+        self.baseline = baseline['length']
+        self._path_edges = baseline['path_edges']
+        self._path_offsets = baseline['path_offsets']
+        # 基准状态下不可达的 OD 对不参与影响分析
+        self.reachable = np.isfinite(self.baseline)
+
+    def edge_ids(self, edges: Iterable[Tuple]) -> np.ndarray:
+        """(u, v) 节点 ID 列表 -> 边下标, 图中不存在的边会报错"""
+        edges = list(edges)
+        if not edges:
+            return np.zeros(0, dtype=np.int64)
+        u = self.store.node_index([e[0] for e in edges])
+        v = self.store.node_index([e[1] for e in edges])
+        ids = np.array([self.store.edge_index(a, b) if a >= 0 and b >= 0 else -1
+                        for a, b in zip(u.tolist(), v.tolist())], dtype=np.int64)
+        if (ids < 0).any():
+            missing = [edges[i] for i in np.flatnonzero(ids < 0)]
+            raise KeyError(f"Edges not in the graph: {missing[:5]}")
+        return ids
+
+    def affected_pairs(self, edge_ids) -> np.ndarray:
+        """基准最短路径经过任一被删边的 OD 对编号"""
+        mask = np.zeros(self.store.num_edges, dtype=bool)
+        mask[edge_ids] = True
+        hits = mask[self._path_edges]
+        # 空路径 (不可达或起终点相同) 的 OD 对没有边, 计数自然为 0
+        n_pairs = len(self.src)
+        pair_of_edge = np.repeat(np.arange(n_pairs), np.diff(self._path_offsets))
+        counts = np.bincount(pair_of_edge, weights=hits, minlength=n_pairs)
+        return np.flatnonzero(counts > 0)
+
+    def run(self, removed_edges: Iterable[Tuple]) -> Dict:
+        """计算一个情景: 删除 removed_edges 后各 OD 对的距离、比例和影响等级"""
+        edge_ids = self.edge_ids(removed_edges)
+        affected = self.affected_pairs(edge_ids)
+        after = self.baseline.copy()
+        if len(affected):
+            engine = self.paths.without_edges(edge_ids)
+            after[affected] = engine.query_indices(self.src[affected], self.dst[affected],
+                                                   batch_size=self.batch_size)['length']
+
+        ratio = np.full(len(after), np.nan)
+        with np.errstate(invalid='ignore'):
+            ratio[self.reachable] = after[self.reachable] / self.baseline[self.reachable]
+        # 起终点相同 (距离为 0) 的 OD 对视为不受影响
+        ratio[self.reachable & (self.baseline == 0)] = 1.0
+        impact = np.full(len(after), None, dtype=object)
+        impact[self.reachable] = classify_ratios(ratio[self.reachable])
+        return {
+            'before': self.baseline,
+            'after': after,
+            'ratio': ratio,
+            'impact': impact,
+            'recomputed': len(affected)
+        }
+
+    def run_batch(self, scenarios: Dict[str, List[Tuple]]) -> Dict[str, Dict]:
+        """批量计算多个情景, 返回 {情景名称: run() 的结果}"""
+        return {name: self.run(edges) for name, edges in scenarios.items()}
+
+    def summarize(self, result: Dict) -> Dict:
+        """统计各影响等级的 OD 对数量和占比 (以基准可达的 OD 对为分母)"""
+        total = int(self.reachable.sum())
+        impact = result['impact'][self.reachable]
+        finite = np.isfinite(result['after']) & self.reachable
+        summary = {
+            'pairs': len(self.baseline),
+            'reachable_before': total,
+            'recomputed': result['recomputed'],
+            'mean_before': float(self.baseline[self.reachable].mean()) if total else 0.0,
+            'mean_after': float(result['after'][finite].mean()) if finite.any() else 0.0
+        }
+        for level in IMPACT_LEVELS:
+            count = int((impact == level).sum())
+            summary[level] = count
+            summary[f'{level}_pct'] = count / total * 100 if total else 0.0
+        return summary
+
+    def pairs_by_level(self, result: Dict, level: str) -> List[Tuple]:
+        """某一影响等级的 (起点, 终点, 比例) 列表, 按比例从大到小排序"""
+        idx = np.flatnonzero(result['impact'] == level)
+        idx = idx[np.argsort(-result['ratio'][idx], kind='stable')]
+        return [(self.sources[i].item(), self.targets[i].item(), float(result['ratio'][i])) for i in idx]
@@ -0,0 +1,133 @@
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from instrumentation import count
+
+
+class BatchedShortestPaths:
+    """基于 CSR 稀疏矩阵的批量最短路径查询
+
+    OD 对按起点分组, 每个不同的起点只做一次单源 Dijkstra (scipy.sparse.csgraph),
+    路径长度和沿途各拥堵等级的边数都以数组形式返回。
+
+    weight 为 None 时每条边按 1 计 (即路段数)。否则图中必须有该边属性且每条边
+    都有取值, 缺少时报 KeyError; 只有显式给出 default_weight 时才用它补缺。
+    """
+
+    def __init__(self, store, weight: Optional[str] = 'distance', default_weight: Optional[float] = None):
+        self.store = store
+        self.weight = weight
+        n = store.num_nodes
+        if weight is None:
+            data = np.ones(store.num_edges)
+        elif weight in store.edge_columns:
+            data = np.asarray(store.edge_columns[weight], dtype=np.float64)
+            missing = np.isnan(data)
+            if missing.any():
+                if default_weight is None:
+                    raise KeyError(f"{int(missing.sum())} edges have no {weight!r} attribute")
+                data = np.where(missing, default_weight, data)
+        elif default_weight is not None:
+            data = np.full(store.num_edges, default_weight)
+        else:
+            raise KeyError(f"Graph has no {weight!r} edge attribute")
+        self.matrix = csr_matrix((data, store.indices, store.indptr), shape=(n, n))
+        # CSR 按 (起点, 终点) 排序, 组合键用于向量化查找边下标
+        self._edge_keys = store.edge_sources() * n + np.asarray(store.indices)
+
+    def edge_ids(self, u_idx, v_idx):
+        """(起点下标, 终点下标) 数组 -> 边下标数组"""
+        return np.searchsorted(self._edge_keys, u_idx * self.store.num_nodes + v_idx)
+
+    def without_edges(self, edge_ids) -> 'BatchedShortestPaths':
+        """删除部分边后的查询引擎 (只复制矩阵, 边下标仍指向原 CSR)"""
+        keep = np.ones(self.store.num_edges, dtype=bool)
+        keep[np.asarray(edge_ids, dtype=np.int64)] = False
+        engine = object.__new__(BatchedShortestPaths)
+        engine.__dict__.update(self.__dict__)
+        n = self.store.num_nodes
+        indptr = np.concatenate([[0], np.cumsum(keep)])[self.matrix.indptr]
+        engine.matrix = csr_matrix((self.matrix.data[keep], self.matrix.indices[keep], indptr), shape=(n, n))
+        return engine
+
+    def query(self, sources, targets, level_attr: Optional[str] = None,
+              batch_size: int = 16, return_paths: bool = False) -> Dict:
+        """批量计算 OD 对的最短路径
+
+        sources / targets 为节点 ID 数组。返回字典:
+        length (不可达为 inf), 若给出 level_attr 还包括 levels (等级名称) 和
+        level_counts (每个 OD 对路径上各等级的边数, 形状为 pairs × levels);
+        return_paths 为 True 时以 CSR 形式返回每条路径经过的边下标
+        (path_edges 与 path_offsets, 每条路径的边按起点 -> 终点排列)。
+        """
+        src = self.store.node_index(sources)
+        dst = self.store.node_index(targets)
+        if (src < 0).any() or (dst < 0).any():
+            raise KeyError("OD pairs contain nodes that are not in the graph")
+        return self.query_indices(src, dst, level_attr, batch_size, return_paths)
+
+    def query_indices(self, src, dst, level_attr: Optional[str] = None,
+                      batch_size: int = 16, return_paths: bool = False) -> Dict:
+        """与 query 相同, 但 OD 对以节点下标给出"""
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+
+        lengths = np.full(len(src), np.inf)
+        level_codes = None
+        level_counts = None
+        if level_attr is not None:
+            level_codes = np.asarray(self.store.edge_columns[level_attr])
+            levels = self.store.strings(level_attr)
+            # 最后一列统计缺失等级 (编码 -1)
+            level_counts = np.zeros((len(src), len(levels) + 1), dtype=np.int64)
+
+        path_pairs, path_edges = [], []
+
+        unique_sources, pair_group = np.unique(src, return_inverse=True)
+        for start in range(0, len(unique_sources), batch_size):
+            batch = unique_sources[start:start + batch_size]
+            dist, pred = dijkstra(self.matrix, directed=True, indices=batch,
+                                  return_predecessors=True)
+            count('dijkstra.calls')
+            count('dijkstra.sources', len(batch))
+            in_batch = np.flatnonzero((pair_group >= start) & (pair_group < start + len(batch)))
+            rows = pair_group[in_batch] - start
+            lengths[in_batch] = dist[rows, dst[in_batch]]
+
+            if level_counts is not None or return_paths:
+                for pairs, edges in self._walk_paths(pred, rows, in_batch, dst):
+                    if level_counts is not None:
+                        np.add.at(level_counts, (pairs, level_codes[edges]), 1)
+                    if return_paths:
+                        path_pairs.append(pairs)
+                        path_edges.append(edges)
+
+        result = {'length': lengths}
+        if return_paths:
+            pairs = np.concatenate(path_pairs) if path_pairs else np.zeros(0, dtype=np.int64)
+            edges = np.concatenate(path_edges) if path_edges else np.zeros(0, dtype=np.int64)
+            # 回溯得到的边是终点 -> 起点的顺序; 整体反转后再按 OD 对稳定排序, 每条路径即为起点 -> 终点
+            pairs, edges = pairs[::-1], edges[::-1]
+            order = np.argsort(pairs, kind='stable')
+            result['path_edges'] = edges[order]
+            result['path_offsets'] = np.concatenate([[0], np.cumsum(np.bincount(pairs, minlength=len(src)))])
+        if level_counts is not None:
+            result['levels'] = list(self.store.strings(level_attr))
+            result['level_counts'] = level_counts[:, :-1]
+        return result
+
+    def _walk_paths(self, pred, rows, pair_ids, dst):
+        """沿前驱树同时回溯一批路径, 每一步产出 (OD 对编号, 边下标) 数组"""
+        current = dst[pair_ids].copy()
+        active = np.ones(len(current), dtype=bool)
+        while True:
+            parent = pred[rows, current]
+            active &= parent >= 0
+            if not active.any():
+                break
+            idx = np.flatnonzero(active)
+            yield pair_ids[idx], self.edge_ids(parent[idx], current[idx])
+            current[idx] = parent[idx]
@@ -0,0 +1,73 @@
+import os
+import re
+
+import pandas as pd
+
+# 测站元数据: 输出列名 -> 原始列名
+METADATA_COLUMNS = {
+    'Route_Number': 'Route Number',
+    'Road_Section': 'Road Section',
+    'Station_Description': 'Station Description',
+    'County_Name': 'County Name',
+    'Municipality_Name': 'Municipality Name',
+    'node_start': 'node start',
+    'node_end': 'node(s) end'
+}
+HISTORY_COLUMNS = ['Station_ID', 'Road_Name', 'Year', 'AADT', 'AAWDT'] + list(METADATA_COLUMNS)
+
+_AADT_PATTERN = re.compile(r'^AADT (\d{4})$')
+
+
+def detect_years(columns):
+    """同时有 AADT {year} 和 AAWDT {year} 两列的年份 (升序)"""
+    columns = set(columns)
+    years = [int(m.group(1)) for m in map(_AADT_PATTERN.match, columns) if m]
+    return sorted(y for y in years if f'AAWDT {y}' in columns)
+
+
+def station_history(traffic_data: pd.DataFrame, years=None) -> pd.DataFrame:
+    """宽表 (每年一列) -> 长表 (每个测站每年一行)
+
+    同一测站的多行取平均值, 只保留 AADT 和 AAWDT 都有值的 (测站, 年份);
+    元数据取该测站的第一行。行按测站 ID、年份排序。
+    """
+    years = detect_years(traffic_data.columns) if years is None else list(years)
+    traffic_data = traffic_data[traffic_data['Station ID'].notna()]
+    value_columns = [f'AADT {y}' for y in years] + [f'AAWDT {y}' for y in years]
+    means = traffic_data.groupby('Station ID')[value_columns].mean()
+
+    long = means.reset_index().melt(id_vars='Station ID', var_name='column', value_name='value')
+    parts = long['column'].str.split(' ', n=1, expand=True)
+    long['measure'] = parts[0]
+    long['Year'] = parts[1].astype(int)
+    history = long.pivot_table(index=['Station ID', 'Year'], columns='measure', values='value',
+                               aggfunc='first', dropna=False)
+    history = history.reindex(columns=['AADT', 'AAWDT']).dropna(subset=['AADT', 'AAWDT']).reset_index()
+
+    first_rows = traffic_data.drop_duplicates('Station ID', keep='first').set_index('Station ID')
+    metadata = pd.DataFrame(index=first_rows.index)
+    metadata['Road_Name'] = first_rows['Road Name'].astype(str).str.strip()
+    for name, source in METADATA_COLUMNS.items():
+        metadata[name] = first_rows[source] if source in first_rows.columns else None
+
+    history = history.join(metadata, on='Station ID').rename(columns={'Station ID': 'Station_ID'})
+    return history[HISTORY_COLUMNS].sort_values(['Station_ID', 'Year'], kind='stable').reset_index(drop=True)
+
+
+def _cache_is_fresh(cache_path, source_path):
+    return os.path.exists(cache_path) and os.path.getmtime(source_path) <= os.path.getmtime(cache_path)
+
+
+def load_station_history(traffic_csv: str, cache_path=None, use_cache=True) -> pd.DataFrame:
+    """读取测站历史长表, 结果缓存在 CSV 旁的 Parquet 文件中 (源文件更新后自动重建)"""
+    cache_path = cache_path or f"{traffic_csv}.history.parquet"
+    if use_cache and _cache_is_fresh(cache_path, traffic_csv):
+        return pd.read_parquet(cache_path)
+
+    history = station_history(pd.read_csv(traffic_csv))
+    if use_cache:
+        try:
+            history.to_parquet(cache_path, index=False)
+        except (OSError, ImportError, ValueError, TypeError):
+            pass
+    return history
@@ -0,0 +1,139 @@
+from collections import Counter, defaultdict
+from difflib import get_close_matches
+
+import numpy as np
+
+
+class StreetNameIndex:
+    """Character n-gram inverted index over a fixed list of street names.
+
+    Queries are narrowed with length blocking and an n-gram count filter
+    before difflib scores the survivors. Both filters are exact bounds for
+    SequenceMatcher.ratio, so the result is the same as running
+    get_close_matches over the full list.
+    """
+
+    def __init__(self, names, q=2):
+        self.q = q
+        # Sorted so candidate lists (and difflib tie-breaking input) are deterministic
+        self.names = sorted(set(names))
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+
+        postings = defaultdict(lambda: ([], []))
+        for idx, name in enumerate(self.names):
+            for gram, count in self._grams(name).items():
+                ids, counts = postings[gram]
+                ids.append(idx)
+                counts.append(count)
+        self.postings = {
+            gram: (np.array(ids, dtype=np.int32), np.array(counts, dtype=np.int32))
+            for gram, (ids, counts) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def _grams(self, name):
+        return Counter(name[i:i + self.q] for i in range(len(name) - self.q + 1))
+
+    def candidates(self, name, cutoff):
+        """Return the names that can reach ratio >= cutoff against name"""
+        if not self.names:
+            return []
+
+        la = len(name)
+        lb = self.lengths
+
+        # Length blocking: ratio <= 2 * min(la, lb) / (la + lb)
+        eps = 1e-9
+        in_window = (lb >= la * cutoff / (2 - cutoff) - eps) & (lb <= la * (2 - cutoff) / cutoff + eps)
+        if not in_window.any():
+            return []
+
+        # Count filter: ratio >= cutoff needs at least ceil(cutoff * (la + lb) / 2)
+        # matching characters, and each unmatched character in either string
+        # can destroy only a bounded number of the query's n-grams.
+        shared = np.zeros(len(self.names), dtype=np.int32)
+        for gram, count in self._grams(name).items():
+            posting = self.postings.get(gram)
+            if posting is not None:
+                ids, counts = posting
+                shared[ids] += np.minimum(counts, count)
+
+        min_matched = np.ceil(cutoff * (la + lb) / 2 - eps)
+        required = (la - self.q + 1) - self.q * (la - min_matched) - (self.q - 1) * (lb - min_matched)
+        mask = in_window & (shared >= required)
+        return [self.names[i] for i in np.flatnonzero(mask)]
+
+    def closest(self, name, cutoff):
+        """Return (best match or None, number of candidates scored)"""
+        candidates = self.candidates(name, cutoff)
+        if not candidates:
+            return None, 0
+        matches = get_close_matches(name, candidates, n=1, cutoff=cutoff)
+        return (matches[0] if matches else None), len(candidates)
+
+
+class FuzzyStreetMatcher:
+    """Prebuilt fuzzy matcher with the find_best_match cutoff semantics"""
+
+    def __init__(self, valid_names, cutoff=0.85, ramp_cutoff=0.7):
+        self.valid_names = set(valid_names)
+        self.cutoff = cutoff
+        self.ramp_cutoff = ramp_cutoff
+        self.index = StreetNameIndex(self.valid_names)
+        # Prefix block for ramps, built once instead of on every query
+        self.ramp_index = StreetNameIndex(vn for vn in self.valid_names if vn.startswith('RAMP'))
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear the candidate totals (kept as running sums, not one entry per query)"""
+        self.queries = 0
+        self.candidates_total = 0
+        self.candidates_max = 0
+
+    def _record(self, n_candidates):
+        self.queries += 1
+        self.candidates_total += n_candidates
+        self.candidates_max = max(self.candidates_max, n_candidates)
+
+    def merge_stats(self, stats):
+        """Add candidate totals reported by a copy of this matcher (e.g. a worker process)"""
+        queries, total, maximum = stats
+        self.queries += queries
+        self.candidates_total += total
+        self.candidates_max = max(self.candidates_max, maximum)
+
+    def match(self, name, cutoff=None):
+        """Find the best matching street name, recording the candidate count"""
+        if cutoff is None:
+            cutoff = self.cutoff
+
+        # Try exact match first
+        if name in self.valid_names:
+            self._record(0)
+            return name
+
+        scored = 0
+
+        # For ramps, try matching with more flexible criteria
+        if name.startswith('RAMP') and len(self.ramp_index):
+            best, n_candidates = self.ramp_index.closest(name, self.ramp_cutoff)
+            scored += n_candidates
+            if best:
+                self._record(scored)
+                return best
+
+        # For regular streets, use stricter matching
+        best, n_candidates = self.index.closest(name, cutoff)
+        self._record(scored + n_candidates)
+        return best
+
+    def candidate_stats(self):
+        """Summarize per-query candidate counts"""
+        return {
+            'queries': self.queries,
+            'mean': self.candidates_total / self.queries if self.queries else 0.0,
+            'max': self.candidates_max,
+            'index_size': len(self.index)
+        }
@@ -0,0 +1,170 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class StreetNameStandardizer:
+    """Compiled, memoized street-name standardizer.
+
+    All patterns are compiled once per instance and the 40-entry abbreviation
+    table is applied as a single alternation regex, so each distinct raw name
+    is only processed once and then served from a bounded LRU cache.
+    """
+
+    # Common abbreviations mapping
+    ABBREVIATIONS = {
+        'STREET': 'ST',
+        'AVENUE': 'AVE',
+        'ROAD': 'RD',
+        'BOULEVARD': 'BLVD',
+        'DRIVE': 'DR',
+        'LANE': 'LA',
+        'COURT': 'CT',
+        'CIRCLE': 'CIR',
+        'PLACE': 'PL',
+        'HIGHWAY': 'HWY',
+        'PARKWAY': 'PKWY',
+        'NORTH': 'N',
+        'SOUTH': 'S',
+        'EAST': 'E',
+        'WEST': 'W',
+        'TERRACE': 'TER',
+        'EXPRESSWAY': 'EXPY',
+        'FREEWAY': 'FWY',
+        'TURNPIKE': 'TPKE',
+        'ROUTE': 'RT',
+        'SQUARE': 'SQ',
+        'TRAIL': 'TRL',
+        'WAY': 'WY',
+        'ALLEY': 'ALY',
+        'NORTHEAST': 'NE',
+        'NORTHWEST': 'NW',
+        'SOUTHEAST': 'SE',
+        'SOUTHWEST': 'SW',
+        'BALTIMORE': 'BALTO',
+        'HEIGHTS': 'HTS',
+        'EXTENSION': 'EXT',
+        'CENTER': 'CTR',
+        'MOUNT': 'MT',
+        'SAINT': 'ST',
+        'NORTHBOUND': 'NB',
+        'SOUTHBOUND': 'SB',
+        'EASTBOUND': 'EB',
+        'WESTBOUND': 'WB'
+    }
+
+    # Common prefixes to remove or standardize
+    HIGHWAY_PREFIXES = {
+        'IS': 'I',  # Interstate
+        'US': 'US',  # US Route
+        'MD': 'MD',  # Maryland Route
+        'CO': 'CO',  # County Route
+        'SR': 'SR'   # State Route
+    }
+
+    # Route prefixes that mark a description's base name as a route reference
+    ROUTE_MARKERS = ('MD', 'US', 'IS')
+
+    _SPECIAL_CHARS = re.compile(r'[^\w\s-]')
+    _DIRECTIONAL = re.compile(r'\s*\([NS][BW]\s*(?:COUPLET)?\)\s*')
+    _PARENTHETICAL = re.compile(r'\s*\([^)]*\)\s*')
+
+    def __init__(self, cache_size=65536):
+        # No abbreviation is itself a full form, so applying the table in one
+        # pass gives the same result as the old sequential re.sub loop.
+        self._abbreviation_pattern = re.compile(
+            r'\b(?:' + '|'.join(map(re.escape, self.ABBREVIATIONS)) + r')\b'
+        )
+        self._route_pattern = '|'.join(self.ROUTE_MARKERS)
+        self._cached_standardize = lru_cache(maxsize=cache_size)(self._standardize)
+
+    def _replace_abbreviation(self, match):
+        return self.ABBREVIATIONS[match.group(0)]
+
+    def _standardize(self, name):
+        # Convert to uppercase
+        name = name.upper()
+
+        # Special handling for ramps
+        if name.startswith('RAMP'):
+            # Extract the main road names from ramp description
+            parts = name.split(' TO ')
+            if len(parts) > 1:
+                # Get the destination road name
+                dest = parts[-1].split()[-1]  # Take the last word as the main road
+                return f"RAMP TO {dest}"
+
+        # Handle couplets
+        if '(NB COUPLET)' in name or '(SB COUPLET)' in name:
+            # Remove the couplet designation but keep the base street name
+            name = name.replace('(NB COUPLET)', '').replace('(SB COUPLET)', '').strip()
+
+        # Standardize highway references
+        for prefix, std_prefix in self.HIGHWAY_PREFIXES.items():
+            if name.startswith(prefix + ' '):
+                # Keep standardized highway references
+                parts = name.split()
+                if len(parts) > 1 and parts[1].isdigit():
+                    return f"{std_prefix}-{parts[1]}"
+
+        # Remove special characters and extra spaces
+        name = self._SPECIAL_CHARS.sub(' ', name)
+        name = ' '.join(name.split())
+
+        # Remove directional indicators in parentheses
+        name = self._DIRECTIONAL.sub(' ', name)
+        name = self._PARENTHETICAL.sub(' ', name)  # Remove any parenthetical content
+
+        # Apply abbreviations
+        name = self._abbreviation_pattern.sub(self._replace_abbreviation, name)
+
+        # Clean up any remaining multiple spaces
+        name = ' '.join(name.split())
+
+        return name.strip()
+
+    def standardize(self, name):
+        """Standardize a single street name"""
+        if pd.isna(name):
+            return ""
+        return self._cached_standardize(str(name))
+
+    def standardize_series(self, names):
+        """Standardize a Series of street names, processing each distinct value once"""
+        codes, uniques = pd.factorize(names)
+        # Missing values are coded as -1, which picks the trailing "" entry
+        lookup = np.array([self.standardize(name) for name in uniques] + [""], dtype=object)
+        return pd.Series(lookup[codes], index=names.index, name=names.name)
+
+    def extract_base_name(self, name, description):
+        """Extract base name from road name and description"""
+        if pd.isna(name) or pd.isna(description):
+            return self.standardize(name)
+
+        # If description contains " - ", try to get the base name from before it
+        if ' - ' in description:
+            base_name = description.split(' - ')[0]
+            # Check if the base name contains route information
+            if any(prefix in base_name for prefix in self.ROUTE_MARKERS):
+                return self.standardize(name)
+            return self.standardize(base_name)
+
+        return self.standardize(name)
+
+    def extract_base_names(self, names, descriptions):
+        """Vectorized extract_base_name over aligned name and description Series"""
+        has_both = names.notna() & descriptions.notna()
+        text = descriptions.where(has_both, '').astype(str)
+        base_names = text.str.split(' - ', n=1).str[0]
+        use_base = (
+            has_both
+            & text.str.contains(' - ', regex=False)
+            & ~base_names.str.contains(self._route_pattern)
+        )
+        return self.standardize_series(names.where(~use_base, base_names))
+
+    def cache_info(self):
+        """Return LRU cache statistics"""
+        return self._cached_standardize.cache_info()
@@ -0,0 +1,384 @@
+import json
+import os
+import sys
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from graph_store import GraphStore, _pack_strings
+
+# 1 倍规模 (巴尔的摩): 路网节点数、MDOT 测站数
+BALTIMORE = {'nodes': 40_000, 'stations': 2_800}
+CENTER = (39.29, -76.61)
+# 节点间距 (度); 规模变大时区域变大, 密度不变
+SPACING = 0.0015
+YEARS = list(range(2014, 2023))
+
+# 一条普通街道跨越的路段数
+SEGMENT_EDGES = 12
+# 河道: 南北向道路只在每隔 RIVER_CROSSING 列处过河 (桥梁)
+RIVER_CROSSING = 12
+KEY_BRIDGE = 'Francis Scott Key Bridge'
+
+BASE_NAMES = [
+    'Oak', 'Maple', 'Cedar', 'Elm', 'Pine', 'Harford', 'Belair', 'York', 'Charles', 'Greenmount',
+    'Edmondson', 'Frederick', 'Liberty', 'Reisterstown', 'Northern', 'Pulaski', 'Eastern', 'Orleans',
+    'Fayette', 'Lombard', 'Pratt', 'Monument', 'Madison', 'Calvert', 'Howard', 'Eutaw', 'Paca',
+    'Greene', 'Light', 'Hanover', 'Fort', 'Key', 'Wilkens', 'Washington', 'Hillen', 'Loch Raven',
+    'Perring', 'Moravia', 'Erdman', 'Pennsylvania', 'Druid Hill', 'Mondawmin', 'Gwynns Falls',
+    'Falls', 'Roland', 'Cold Spring', 'Cathedral', 'Mulberry', 'Saratoga', 'Hamilton', 'Dundalk',
+    'Holabird', 'Boston', 'Aliceanna', 'Thames', 'Caton', 'Hollins', 'Walther', 'Joppa', 'Taylor'
+]
+SUFFIXES = ['Street', 'Avenue', 'Road', 'Drive', 'Lane', 'Court', 'Place', 'Boulevard', 'Way', 'Terrace']
+# MDOT 表中的缩写形式 (与 StreetNameStandardizer 的结果一致)
+SUFFIX_ABBREVIATIONS = ['ST', 'AVE', 'RD', 'DR', 'LA', 'CT', 'PL', 'BLVD', 'WY', 'TER']
+HIGHWAYS = ['I-95', 'I-83', 'I-695', 'I-895', 'I-795', 'I-70', 'I-97', 'US-40', 'US-1', 'MD-295']
+
+HIGHWAY_CLASSES = ['motorway', 'primary', 'secondary', 'tertiary', 'residential']
+# 每类道路: (车道数范围, 限速 mph, 限速缺失比例, 测站抽样权重, 基准 AADT)
+CLASS_PROFILE = {
+    'motorway': ((3, 4), (55, 65), 0.05, 30.0, 90_000),
+    'primary': ((2, 3), (35, 40), 0.1, 12.0, 25_000),
+    'secondary': ((2, 2), (30, 35), 0.2, 6.0, 12_000),
+    'tertiary': ((1, 2), (25, 30), 0.4, 3.0, 5_000),
+    'residential': ((1, 1), (25, 25), 0.7, 1.0, 1_200),
+}
+COUNTIES = ['Baltimore City', 'Baltimore County', 'Anne Arundel']
+CONGESTION_LEVELS = ['畅通', '基本畅通', '轻度拥堵', '中度拥堵', '严重拥堵']
+
+
+def _ordinal(n: int) -> str:
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+
+def street_names(ids) -> Tuple[list, list]:
+    """街道编号 -> (OSM 形式名称, MDOT 形式名称), 编号不同则名称不同"""
+    nb, ns = len(BASE_NAMES), len(SUFFIXES)
+    osm, mdot = [], []
+    for i in np.asarray(ids).tolist():
+        base = BASE_NAMES[i % nb]
+        s = (i // nb) % ns
+        k = i // (nb * ns)
+        if 0 < k <= nb:
+            base = f"{BASE_NAMES[k - 1]} {base}"
+        elif k > nb:
+            base = f"{_ordinal(k - nb)} {base}"
+        osm.append(f"{base} {SUFFIXES[s]}")
+        mdot.append(f"{base.upper()} {SUFFIX_ABBREVIATIONS[s]}")
+    return osm, mdot
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """球面距离 (米)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6_371_000 * np.arcsin(np.sqrt(a))
+
+
+def _line_classes(n_lines: int, vertical: bool) -> np.ndarray:
+    """每条东西向 / 南北向道路线的等级编号 (HIGHWAY_CLASSES 下标)"""
+    k = np.arange(n_lines)
+    classes = np.full(n_lines, 4)
+    classes[k % 5 == 0] = 3
+    classes[k % 10 == 0] = 2
+    classes[k % 20 == 0] = 1
+    if vertical:
+        classes[k % 40 == 7] = 0
+    else:
+        classes[k % 60 == 31] = 0
+    return classes
+
+
+def drive_graph(scale: float = 1.0, seed: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """OSM 风格的驾车路网 (edges_drive.csv / nodes_drive.csv 的列)
+
+    节点为带扰动的方格网, 东西向、南北向道路按等级命名 (高速公路沿用 I-95 等
+    名称, 普通街道每 SEGMENT_EDGES 段换一个名字)。网格的三分之一处有一条东西向
+    河道, 只有少数南北向道路过河, 其中一座为 Francis Scott Key Bridge。
+    """
+    rng = np.random.default_rng(seed)
+    side = max(int(np.ceil(np.sqrt(BALTIMORE['nodes'] * scale))), 4)
+    n = side * side
+    row, col = np.divmod(np.arange(n), side)
+    lat = CENTER[0] + (row - side / 2) * SPACING + rng.normal(0, SPACING * 0.15, n)
+    lon = CENTER[1] + (col - side / 2) * SPACING * 1.3 + rng.normal(0, SPACING * 0.2, n)
+    # 唯一且无规律的大整数 ID
+    osmid = 40_000_000 + np.arange(n, dtype=np.int64) * 17 + rng.integers(0, 17, n)
+
+    # 东西向路段 (r, c) -> (r, c + 1), 南北向路段 (r, c) -> (r + 1, c)
+    r, c = np.divmod(np.arange(side * (side - 1)), side - 1)
+    h_a, h_b = r * side + c, r * side + c + 1
+    r2, c2 = np.divmod(np.arange((side - 1) * side), side)
+    v_a, v_b = r2 * side + c2, (r2 + 1) * side + c2
+    a = np.concatenate([h_a, v_a])
+    b = np.concatenate([h_b, v_b])
+    vertical = np.concatenate([np.zeros(len(h_a), bool), np.ones(len(v_a), bool)])
+    line = np.concatenate([r, c2])
+    position = np.concatenate([c, r2])
+    h_classes, v_classes = _line_classes(side, False), _line_classes(side, True)
+    cls = np.where(vertical, v_classes[line], h_classes[line])
+
+    # 河道和桥梁
+    river = side // 3
+    crossing = vertical & (position == river)
+    bridge_cols = np.flatnonzero((np.arange(side) % RIVER_CROSSING == RIVER_CROSSING // 2) | (v_classes == 0))
+    key_col = bridge_cols[len(bridge_cols) // 2] if len(bridge_cols) else side // 2
+    keep = ~crossing | np.isin(line, bridge_cols)
+    # 随机删去部分普通街道路段, 形成断头路和不规则街区
+    keep &= ~((cls == 4) & (rng.random(len(a)) < 0.05))
+    key_bridge = crossing & (line == key_col)
+    a, b, vertical, line, position, cls, key_bridge = (
+        x[keep] for x in (a, b, vertical, line, position, cls, key_bridge))
+
+    # 街道编号: 高速公路和主干道整条线一个名字, 其余每 SEGMENT_EDGES 段一个
+    chunks = (side + SEGMENT_EDGES - 1) // SEGMENT_EDGES
+    chunk = np.where(cls <= 2, 0, position // SEGMENT_EDGES)
+    street = (vertical * side + line) * chunks + chunk
+    street_ids, street = np.unique(street, return_inverse=True)
+    osm_names, _ = street_names(np.arange(len(street_ids)))
+    names = np.array(osm_names, dtype=object)[street]
+    motorway = cls == 0
+    highway_lines = np.where(vertical, line, line + side)[motorway]
+    names[motorway] = np.array(HIGHWAYS, dtype=object)[highway_lines % len(HIGHWAYS)]
+    names[key_bridge] = KEY_BRIDGE
+
+    # 单行道: 部分普通街道整条线单向, 方向按线号交替 (保持强连通)
+    oneway = (cls == 4) & (line % 7 == 3)
+    forward = ~oneway | (line % 2 == 0)
+    backward = ~oneway | (line % 2 == 1)
+    u = np.concatenate([a[forward], b[backward]])
+    v = np.concatenate([b[forward], a[backward]])
+    pick = np.concatenate([np.flatnonzero(forward), np.flatnonzero(backward)])
+
+    edge_cls = cls[pick]
+    lanes = np.empty(len(pick), dtype=object)
+    maxspeed = np.empty(len(pick), dtype=object)
+    for k, name in enumerate(HIGHWAY_CLASSES):
+        mask = edge_cls == k
+        (lo, hi), (s_lo, s_hi), missing, _, _ = CLASS_PROFILE[name]
+        count = int(mask.sum())
+        lane_values = rng.integers(lo, hi + 1, count).astype(str).astype(object)
+        # 少量路段的车道数为列表字面量 (OSM 合并路段)
+        listed = rng.random(count) < 0.03
+        lane_values[listed] = [f"['{x}', '{int(x) + 1}']" for x in lane_values[listed]]
+        lane_values[rng.random(count) < missing / 2] = None
+        speed_values = np.array([f"{x} mph" for x in rng.choice([s_lo, s_hi], count)], dtype=object)
+        speed_values[rng.random(count) < missing] = None
+        lanes[mask] = lane_values
+        maxspeed[mask] = speed_values
+
+    edges = pd.DataFrame({
+        'u': osmid[u],
+        'v': osmid[v],
+        'key': 0,
+        'osmid': 900_000_000 + street[pick],
+        'highway': np.array(HIGHWAY_CLASSES, dtype=object)[edge_cls],
+        'lanes': lanes,
+        'maxspeed': maxspeed,
+        'length': np.round(_haversine(lat[u], lon[u], lat[v], lon[v]), 3),
+        'name': names[pick],
+        'oneway': oneway[pick],
+        'street': street[pick],
+        'bridge': key_bridge[pick],
+    })
+    nodes = pd.DataFrame({'osmid': osmid, 'y': lat, 'x': lon})
+    return edges, nodes
+
+
+def edge_names_table(edges: pd.DataFrame) -> pd.DataFrame:
+    """Edge_Names_With_Nodes.csv: 每条街道一行, Nodes 为节点 ID 列表字面量"""
+    pairs = pd.concat([edges[['street', 'name', 'u']].rename(columns={'u': 'node'}),
+                       edges[['street', 'name', 'v']].rename(columns={'v': 'node'})])
+    pairs = pairs.drop_duplicates(['street', 'node']).sort_values(['street', 'node'], kind='stable')
+    grouped = pairs.groupby('street', sort=True)
+    nodes = grouped['node'].agg(lambda s: '[' + ', '.join(map(str, s.tolist())) + ']')
+    return pd.DataFrame({'Street_Name': grouped['name'].first(), 'Nodes': nodes}).reset_index(drop=True)
+
+
+def _typo(name: str, rng) -> str:
+    """在名称主体中交换或删除一个字符 (模糊匹配层)"""
+    head, _, tail = name.rpartition(' ')
+    if len(head) < 6:
+        return name
+    k = int(rng.integers(1, len(head) - 2))
+    if rng.random() < 0.5:
+        head = head[:k] + head[k + 1] + head[k] + head[k + 2:]
+    else:
+        head = head[:k] + head[k + 1:]
+    return f"{head} {tail}"
+
+
+def mdot_table(edges: pd.DataFrame, scale: float = 1.0, seed: int = 42) -> pd.DataFrame:
+    """MDOT AADT 宽表 (与 MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv 同列)
+
+    测站按道路等级加权落在路段上, 道路名称分为几类: 与路网名称一致 (exact)、
+    "I 95" 形式的高速编号 (highway_mapped)、含拼写错误 (fuzzy) 和路网中没有的
+    名称 (unmatched)。Key Bridge 上固定有一个测站。
+    """
+    rng = np.random.default_rng(seed + 1)
+    n_stations = max(int(BALTIMORE['stations'] * scale), 10)
+    weights = edges['highway'].map({k: p[3] for k, p in CLASS_PROFILE.items()}).to_numpy()
+    picked = rng.choice(len(edges), n_stations, p=weights / weights.sum())
+    bridge = np.flatnonzero(edges['bridge'].to_numpy())
+    if len(bridge):
+        picked[0] = bridge[0]
+    rows = edges.iloc[picked].reset_index(drop=True)
+
+    _, mdot_names = street_names(rows['street'])
+    road = np.array(mdot_names, dtype=object)
+    is_highway = rows['highway'].to_numpy() == 'motorway'
+    highway_name = rows['name'].to_numpy()
+    # 高速公路: "IS 95" (标准化后与 I-95 完全一致) 或 "I 95" (需要编号映射)
+    prefix = np.array([n.split('-')[0] if '-' in n else '' for n in highway_name], dtype=object)
+    number = np.array([n.split('-')[1] if '-' in n else '' for n in highway_name], dtype=object)
+    interstate = is_highway & (prefix == 'I')
+    road[is_highway] = prefix[is_highway] + ' ' + number[is_highway]
+    road[interstate] = np.where(rng.random(int(interstate.sum())) < 0.5, 'IS ', 'I ') + number[interstate]
+
+    tier = rng.random(n_stations)
+    fuzzy = ~is_highway & (tier < 0.2)
+    unmatched = ~is_highway & (tier > 0.9)
+    road[fuzzy] = [_typo(name, rng) for name in road[fuzzy]]
+    road[unmatched] = [f"{''.join(rng.choice(list('QXZJVKW'), 7))} CONNECTOR" for _ in range(int(unmatched.sum()))]
+    on_bridge = rows['bridge'].to_numpy()
+    road[on_bridge] = 'IS 695'
+
+    _, cross = street_names(rng.integers(0, max(int(rows['street'].max()), 1) + 1, (n_stations, 2)).ravel())
+    cross = np.array(cross, dtype=object).reshape(n_stations, 2)
+    section = cross[:, 0] + ' TO ' + cross[:, 1]
+    description = section.copy()
+    with_base = rng.random(n_stations) < 0.2
+    description[with_base] = road[with_base] + ' - ' + section[with_base]
+    description[on_bridge] = f"IS 695 - {KEY_BRIDGE}"
+
+    # 历年 AADT: 等级基准 × 对数正态扰动 × 年增长率, 2020 年下降, 部分年份缺失
+    base = rows['highway'].map({k: p[4] for k, p in CLASS_PROFILE.items()}).to_numpy()
+    base = base * rng.lognormal(0, 0.35, n_stations)
+    growth = rng.normal(0.01, 0.02, n_stations)
+    data = {
+        'Station ID': [f"B{i:06d}" for i in range(n_stations)],
+        'Road Name': road,
+        'Route Number': rng.integers(1, 1000, n_stations),
+        'Road Section': section,
+        'Station Description': description,
+        'County Name': rng.choice(COUNTIES, n_stations),
+        'Municipality Name': np.where(rng.random(n_stations) < 0.5, 'BALTIMORE', None),
+    }
+    current = np.full(n_stations, np.nan)
+    for k, year in enumerate(YEARS):
+        aadt = base * (1 + growth) ** k * (0.85 if year == 2020 else 1.0)
+        aadt = np.round(aadt * rng.normal(1, 0.05, n_stations))
+        aadt[rng.random(n_stations) < 0.1] = np.nan
+        aawdt = np.round(aadt * rng.uniform(1.03, 1.12, n_stations))
+        data[f'AADT {year}'] = aadt
+        data[f'AAWDT {year}'] = aawdt
+        current = np.where(np.isnan(aadt), current, aadt)
+    data['AADT (Current)'] = current
+
+    lanes = pd.to_numeric(rows['lanes'].astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
+    data['Number of Lanes'] = lanes.fillna(2).astype(int).to_numpy()
+    data['node start'] = [f"[{{{u}}}]" for u in rows['u'].tolist()]
+    data['node(s) end'] = [f"[{{{v}}}]" for v in rows['v'].tolist()]
+    return pd.DataFrame(data)
+
+
+def analysis_store(edges: pd.DataFrame, nodes: pd.DataFrame, seed: int = 42) -> GraphStore:
+    """分析用的 GraphStore: weight (米)、distance (公里)、车道数、道路名称和拥堵等级
+
+    直接由边表构建 CSR, 不经过 NetworkX, 大规模时也很快。
+    """
+    rng = np.random.default_rng(seed + 2)
+    node_ids = np.sort(nodes['osmid'].to_numpy(dtype=np.int64))
+    u = np.searchsorted(node_ids, edges['u'].to_numpy())
+    v = np.searchsorted(node_ids, edges['v'].to_numpy())
+    order = np.lexsort((v, u))
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    np.add.at(indptr, u + 1, 1)
+    indptr = np.cumsum(indptr)
+    edges = edges.iloc[order]
+
+    length = edges['length'].to_numpy(dtype=np.float64)
+    lanes = pd.to_numeric(edges['lanes'].astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
+    # V/C 比: 高等级道路整体更拥堵
+    vc = rng.lognormal(np.log(0.45), 0.45, len(edges))
+    vc[edges['highway'].to_numpy() == 'motorway'] *= 1.5
+    level = np.digitize(vc, [0.6, 0.8, 0.9, 1.0])
+
+    edge_columns = {
+        'weight': length,
+        'distance': length / 1000,
+        'lanes': lanes.to_numpy(dtype=np.float64),
+        'congestion_level': level.astype(np.int32),
+    }
+    column_kinds = {'weight': 'float', 'distance': 'float', 'lanes': 'float', 'congestion_level': 'str',
+                    'road_name': 'str', 'highway': 'str'}
+    string_tables = {'congestion_level': _pack_strings(CONGESTION_LEVELS)}
+    for column, source in (('road_name', 'name'), ('highway', 'highway')):
+        codes, table = pd.factorize(edges[source])
+        edge_columns[column] = codes.astype(np.int32)
+        string_tables[column] = _pack_strings([str(s) for s in table])
+
+    positions = nodes.set_index('osmid').loc[node_ids, ['y', 'x']].to_numpy()
+    return GraphStore(node_ids, indptr, v[order].astype(np.int64), edge_columns, column_kinds,
+                      string_tables, positions)
+
+
+def write_dataset(out_dir: str, scale: float = 1.0, seed: int = 42) -> Dict:
+    """写出一整套合成输入, 返回 manifest (文件路径、规模、Key Bridge 的边等)"""
+    os.makedirs(out_dir, exist_ok=True)
+    edges, nodes = drive_graph(scale, seed)
+    mdot = mdot_table(edges, scale, seed)
+    edge_names = edge_names_table(edges)
+    store = analysis_store(edges, nodes, seed)
+
+    paths = {
+        'mdot': os.path.join(out_dir, 'MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv'),
+        'edge_names': os.path.join(out_dir, 'Edge_Names_With_Nodes.csv'),
+        'edges_drive': os.path.join(out_dir, 'edges_drive.csv'),
+        'nodes_drive': os.path.join(out_dir, 'nodes_drive.csv'),
+        'network': os.path.join(out_dir, 'traffic_network.graph'),
+    }
+    mdot.to_csv(paths['mdot'], index=False)
+    edge_names.to_csv(paths['edge_names'], index=False)
+    edges.drop(columns=['street', 'bridge']).to_csv(paths['edges_drive'], index=False)
+    nodes.to_csv(paths['nodes_drive'], index=False)
+    store.save(paths['network'])
+
+    bridge = edges.loc[edges['bridge'], ['u', 'v']]
+    # 河道纬度 (桥两端的中点), 用于划分南北两岸的 OD 区域
+    bridge_lat = nodes.set_index('osmid').loc[np.union1d(bridge['u'], bridge['v']), 'y']
+    river_lat = float(bridge_lat.mean()) if len(bridge_lat) else float(nodes['y'].median())
+    manifest = {
+        'scale': scale,
+        'seed': seed,
+        'paths': paths,
+        'counts': {'nodes': len(nodes), 'edges': len(edges), 'streets': len(edge_names),
+                   'stations': len(mdot)},
+        'key_bridge': [[int(a), int(b)] for a, b in zip(bridge['u'], bridge['v'])],
+        'river_lat': river_lat,
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+def load_manifest(out_dir: str, scale: float = 1.0, seed: int = 42) -> Dict:
+    """读取已生成的数据集; 不存在或规模、种子不一致时重新生成"""
+    path = os.path.join(out_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest['scale'] == scale and manifest['seed'] == seed:
+            return manifest
+    return write_dataset(out_dir, scale, seed)
+
+
+if __name__ == "__main__":
+    # python synthetic_data.py 输出目录 [规模, 如 1 / 10 / 100] [随机种子]
+    out = sys.argv[1]
+    scale_arg = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    seed_arg = int(sys.argv[3]) if len(sys.argv) > 3 else 42
+    info = write_dataset(out, scale_arg, seed_arg)
+    print(f"合成数据已写入 {out}: {info['counts']}")
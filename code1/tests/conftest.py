@@ -0,0 +1,5 @@
+import os
+import sys
+
+# code1 下的脚本以平铺模块互相导入 (与 Q1_new.ipynb 中 sys.path.append('code1') 一致)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from assignment import TrafficAssignment
+from graph_store import GraphStore
+
+
+def _assignment():
+    # 两条并行路线: 1 -> 2 直达, 1 -> 3 -> 2 绕行 (自由流时间更长, 通行能力更大)
+    G = nx.DiGraph()
+    G.add_edge(1, 2, free_flow_time=10.0, capacity=100.0)
+    G.add_edge(1, 3, free_flow_time=6.0, capacity=300.0)
+    G.add_edge(3, 2, free_flow_time=6.0, capacity=300.0)
+    return TrafficAssignment(GraphStore.from_networkx(G))
+
+
+def _edge_ids(store):
+    return {(u, v): store.edge_index(*store.node_index([u, v]).tolist()) for u, v in [(1, 2), (1, 3), (3, 2)]}
+
+
+def _route_times(assignment, result):
+    ids = _edge_ids(assignment.store)
+    times = result['time']
+    return times[ids[1, 2]], times[ids[1, 3]] + times[ids[3, 2]]
+
+
+def test_user_equilibrium_equalizes_used_route_times():
+    assignment = _assignment()
+    result = assignment.assign([1], [2], [400.0], max_iter=200, tol=1e-6)
+    assert result['converged']
+    direct, detour = _route_times(assignment, result)
+    assert direct == pytest.approx(detour, rel=1e-3)
+    assert result['od_time'][0] == pytest.approx(min(direct, detour))
+    ids = _edge_ids(assignment.store)
+    flow = result['flow']
+    assert flow[ids[1, 2]] + flow[ids[1, 3]] == pytest.approx(400.0)
+    assert flow[ids[1, 3]] == pytest.approx(flow[ids[3, 2]])
+
+
+def test_od_time_matches_final_link_costs_when_not_converged():
+    assignment = _assignment()
+    result = assignment.assign([1], [2], [400.0], max_iter=1, tol=0.0)
+    assert not result['converged']
+    direct, detour = _route_times(assignment, result)
+    assert result['od_time'][0] == pytest.approx(min(direct, detour))
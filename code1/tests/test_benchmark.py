@@ -0,0 +1,32 @@
+from benchmark import compare_runs
+
+
+def _run(samples, rss=100.0):
+    samples = list(samples)
+    median = sorted(samples)[len(samples) // 2]
+    return {'results': {'bench': {'seconds': median, 'samples': samples, 'peak_rss_mb': rss}}}
+
+
+def _flag(base, head, **kwargs):
+    return bool(compare_runs(base, head, **kwargs)['regression'].iloc[0])
+
+
+def test_overlapping_noise_is_not_a_regression():
+    # 中位数增加 20%, 但两组计时有重叠
+    assert not _flag(_run([1.0, 1.1, 1.5]), _run([1.05, 1.2, 1.32]))
+
+
+def test_consistent_slowdown_is_a_regression():
+    assert _flag(_run([1.0, 1.02, 1.05]), _run([1.3, 1.31, 1.35]))
+
+
+def test_small_absolute_changes_are_ignored():
+    assert not _flag(_run([0.010, 0.011]), _run([0.020, 0.021]))
+    assert not _flag(_run([1.0], rss=20.0), _run([1.0], rss=25.0))
+    assert _flag(_run([1.0], rss=200.0), _run([1.0], rss=260.0))
+
+
+def test_runs_without_samples_use_single_timing():
+    base = {'results': {'bench': {'seconds': 1.0, 'peak_rss_mb': 100.0}}}
+    head = {'results': {'bench': {'seconds': 2.0, 'peak_rss_mb': 100.0}}}
+    assert _flag(base, head)
@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from build_network import NetworkBuilder
+from graph_store import GraphStore
+from node_lists import parse_node_lists
+
+
+def _traffic():
+    # 重复的边 (行 0 / 2)、桥梁行在前被后面的行覆盖 (行 1 / 3)、未知节点 99、无法解析的单元格
+    return pd.DataFrame({
+        'Road Name': ['MAIN ST', 'I-695', 'MAIN ST', 'KEY HWY', 'PARK AVE', 'BROKEN'],
+        'Station ID': ['S0', 'S1', 'S2', 'S3', 'S4', 'S5'],
+        'AADT 2022': [100.0, 200.0, np.nan, 400.0, 500.0, 600.0],
+        'Number of Lanes': [2, 4, 2, 3, np.nan, 1],
+        'Station Description': ['a', 'Francis Scott Key Bridge', 'b', 'near bridge', np.nan, 'c'],
+        'node start': ['[{1, 2}]', '[{3}]', '[{1}]', '[{3, 99}]', '[2, 2]', 'abc'],
+        'node(s) end': ['[{3, 4}]', '[{4, 5}]', '[{3}]', '[{4}]', '[{5, 1}]', '[{1}]'],
+    })
+
+
+def _builder(seed=0):
+    builder = NetworkBuilder()
+    rng = random.Random(seed)
+    builder.nodes_dict = {node: (rng.uniform(39.1, 39.4), rng.uniform(-76.8, -76.4)) for node in range(1, 7)}
+    return builder
+
+
+def _normalized(attrs):
+    return {k: None if isinstance(v, float) and np.isnan(v) else v for k, v in attrs.items()}
+
+
+def _graph_dict(G):
+    return ({n: d for n, d in G.nodes(data=True)},
+            {(u, v): _normalized(d) for u, v, d in G.edges(data=True)})
+
+
+def test_bulk_build_matches_rowwise_build():
+    traffic = _traffic()
+    starts = parse_node_lists(traffic['node start'])
+    ends = parse_node_lists(traffic['node(s) end'])
+    bulk, rowwise = _builder(), _builder()
+    bulk._add_edges_bulk(traffic, starts, ends)
+    rowwise._add_edges_rowwise(traffic, starts, ends)
+
+    assert _graph_dict(bulk.G) == _graph_dict(rowwise.G)
+    assert bulk.G.number_of_edges() > 0
+    assert bulk.G.edges[3, 4]['station_id'] == 'S3' and bulk.G.edges[3, 4]['is_key_bridge']
+    assert 'is_key_bridge' not in bulk.G.edges[1, 3]
+    assert 99 not in bulk.G and 6 not in bulk.G
+
+
+def test_max_pairs_per_row_caps_each_row():
+    traffic = _traffic()
+    starts = parse_node_lists(traffic['node start'])
+    ends = parse_node_lists(traffic['node(s) end'])
+    builder = _builder()
+    full = builder.build_edge_table(traffic, starts, ends)
+    capped = builder.build_edge_table(traffic, starts, ends, max_pairs_per_row=1)
+    assert capped['station_id'].value_counts().max() == 1
+    assert set(map(tuple, capped[['u', 'v']].to_numpy())) <= set(map(tuple, full[['u', 'v']].to_numpy()))
+    again = builder.build_edge_table(traffic, starts, ends, max_pairs_per_row=1)
+    pd.testing.assert_frame_equal(capped, again)
+
+
+def test_build_network_saves_the_same_graph_in_both_modes(tmp_path):
+    traffic_path = str(tmp_path / 'traffic.csv')
+    nodes_path = str(tmp_path / 'edges.csv')
+    _traffic().to_csv(traffic_path, index=False)
+    pd.DataFrame({'Nodes': ['[1, 2, 3]', '[4, 5]']}).to_csv(nodes_path, index=False)
+
+    stores = []
+    for bulk in (True, False):
+        random.seed(0)
+        output_path = str(tmp_path / f'network_{bulk}.graph')
+        builder = NetworkBuilder(sidecar_dir=str(tmp_path))
+        builder.build_network(traffic_path, nodes_path, bulk=bulk, output_path=output_path)
+        assert builder.parse_errors == 1
+        stores.append(GraphStore.load(output_path))
+    assert _graph_dict(stores[0].to_networkx()) == _graph_dict(stores[1].to_networkx())
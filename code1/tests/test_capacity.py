@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capacity import edge_capacity, lane_capacity, top_capacity
+
+
+def get_lane_capacity(row):
+    """原 Q1 中逐行计算的每车道单位通行能力"""
+    highway = row["highway"]
+    if "motorway" in highway or "motorway_link" in highway or "trunk" in highway or "trunk_link" in highway:
+        base_capacity = 2200
+    elif "primary" in highway or "secondary" in highway or "primary_link" in highway or "secondary_link" in highway:
+        base_capacity = 1800
+    elif "residential" in highway or "tertiary" in highway or "residential_link" in highway or "tertiary_link" in highway:
+        base_capacity = 1500
+    else:
+        base_capacity = 1600
+
+    max_speed = row["maxspeed"]
+    if max_speed == 0:
+        if "motorway" in highway or "trunk" in highway:
+            max_speed = 70
+        elif "primary" in highway or "secondary" in highway:
+            max_speed = 35
+        elif "residential" in highway or "tertiary" in highway:
+            max_speed = 25
+        else:
+            max_speed = 40
+    max_speed = int(max_speed)
+    speed_factor = 1 + (max_speed - 50) / 500
+    return base_capacity * speed_factor
+
+
+def _edges(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    highways = ['motorway', 'motorway_link', 'trunk', 'primary', 'secondary_link', 'tertiary',
+                'residential', 'unclassified', 'service', 'living_street']
+    return pd.DataFrame({
+        'u': rng.integers(0, 60, n),
+        'v': rng.integers(0, 60, n),
+        'highway': rng.choice(highways, n),
+        'lanes': rng.integers(1, 5, n).astype(float),
+        'maxspeed': rng.choice([0, 25, 35, 45.5, 55, 65, 70], n).astype(float)
+    })
+
+
+def test_edge_capacity_matches_row_by_row():
+    edges = _edges()
+    expected = [row['lanes'] * get_lane_capacity(row) for _, row in edges.iterrows()]
+    assert edge_capacity(edges) == pytest.approx(expected, rel=1e-12)
+
+
+def test_lane_capacity_categorical_and_missing_highway():
+    edges = _edges(50)
+    expected = lane_capacity(edges['highway'].to_numpy(), edges['maxspeed'].to_numpy())
+    categorical = lane_capacity(pd.Categorical(edges['highway']), edges['maxspeed'].to_numpy())
+    assert categorical.tolist() == expected.tolist()
+    # 缺失的道路类型按默认类别 (1600, 限速为 0 时取 40)
+    assert lane_capacity(np.array([None], dtype=object), np.array([0.0])).tolist() == [1600 * (1 - 10 / 500)]
+
+
+def test_top_capacity_matches_sorted_dict():
+    edges = _edges()
+    edges['capacity'] = edge_capacity(edges)
+    # 原实现: 同一 (u, v) 以最后一行为准的嵌套字典, 再按容量降序排序
+    capacity = {}
+    for _, row in edges.iterrows():
+        capacity.setdefault(row['u'], {})[row['v']] = row['capacity']
+    ranked = sorted((c for targets in capacity.values() for c in targets.values()), reverse=True)
+    top = top_capacity(edges, 10)
+    assert top['capacity'].tolist() == ranked[:10]
+    assert not top.duplicated(['u', 'v']).any()
+    for row in top.itertuples():
+        assert capacity[row.u][row.v] == row.capacity
@@ -0,0 +1,48 @@
+import networkx as nx
+import pytest
+
+from centrality import parallel_betweenness, parallel_closeness, top_k_closeness
+
+
+def _graph():
+    G = nx.gnp_random_graph(40, 0.08, seed=1, directed=True)
+    # 一个只有出边的节点和一个孤立节点
+    G.add_edge(100, 0)
+    G.add_node(101)
+    return G
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_betweenness_matches_networkx(workers):
+    G = _graph()
+    expected = nx.betweenness_centrality(G)
+    result = parallel_betweenness(G, workers=workers)
+    assert result.keys() == expected.keys()
+    assert all(result[n] == pytest.approx(expected[n], abs=1e-12) for n in G)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_closeness_matches_networkx(workers):
+    for G in (_graph(), _graph().to_undirected()):
+        expected = nx.closeness_centrality(G)
+        result = parallel_closeness(G, workers=workers)
+        assert result.keys() == expected.keys()
+        assert all(result[n] == pytest.approx(expected[n], abs=1e-12) for n in G)
+
+
+def test_top_k_closeness_returns_exact_scores_in_order():
+    G = _graph()
+    exact = nx.closeness_centrality(G)
+    k = 5
+    result = top_k_closeness(G, k, pivots=16, candidate_factor=3)
+    assert len(result) == k
+    scores = list(result.values())
+    assert scores == sorted(scores, reverse=True)
+    assert all(result[n] == pytest.approx(exact[n]) for n in result)
+    # 候选集合是全部节点的子集: 结果中第 i 名的得分不会超过精确排名的第 i 名
+    ranked = sorted(exact.values(), reverse=True)
+    assert all(score <= bound + 1e-12 for score, bound in zip(scores, ranked))
+
+    # 候选数覆盖全部节点时结果就是精确的前 k 名
+    full = top_k_closeness(G, k, pivots=16, candidate_factor=len(G))
+    assert sorted(full.values(), reverse=True) == pytest.approx(ranked[:k])
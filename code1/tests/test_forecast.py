@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import PREDICTION_COLUMNS, STATION_COLUMNS, fit_trends, forecast_stations, predict_trends
+
+
+def _history(seed=0, n_stations=12):
+    # 每个测站的观测年份数不同, 并有缺年, 用来覆盖补齐矩阵中的 NaN
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_stations):
+        years = np.sort(rng.choice(np.arange(2014, 2023), size=rng.integers(2, 10), replace=False))
+        for year in years:
+            aadt = 1000.0 + 50 * i * (year - 2014) + rng.normal(0, 100)
+            rows.append({'Station_ID': f'S{i}', 'Year': int(year), 'AADT': aadt, 'AAWDT': aadt * 1.1,
+                         **{c: f'{c} {i}' for c in STATION_COLUMNS}})
+    return pd.DataFrame(rows)
+
+
+def test_linear_matches_per_station_polyfit():
+    history = _history()
+    params = fit_trends(history, method='linear').set_index('Station_ID')
+    for station_id, group in history.groupby('Station_ID'):
+        for target in ('AADT', 'AAWDT'):
+            slope, intercept = np.polyfit(group['Year'], group[target], 1)
+            assert params.loc[station_id, f'{target}_slope'] == pytest.approx(slope)
+            assert params.loc[station_id, f'{target}_intercept'] == pytest.approx(intercept, rel=1e-6)
+        assert params.loc[station_id, 'last_year'] == group['Year'].max()
+        assert params.loc[station_id, 'n_years'] == len(group)
+
+
+def test_robust_matches_theil_sen():
+    stats = pytest.importorskip('scipy.stats')
+    history = _history(seed=1)
+    params = fit_trends(history, method='robust').set_index('Station_ID')
+    for station_id, group in history.groupby('Station_ID'):
+        slope = stats.theilslopes(group['AADT'], group['Year'])[0]
+        intercept = np.median(group['AADT'] - slope * group['Year'])
+        assert params.loc[station_id, 'AADT_slope'] == pytest.approx(slope)
+        assert params.loc[station_id, 'AADT_intercept'] == pytest.approx(intercept, rel=1e-6)
+
+
+def test_damped_growth_is_bounded_and_starts_from_robust_level():
+    history = _history(seed=2)
+    robust = fit_trends(history, method='robust')
+    damped = fit_trends(history, method='damped', damping=0.5)
+    years = np.arange(2023, 2060)
+    straight = predict_trends(robust, years)['AADT']
+    curved = predict_trends(damped, years)['AADT']
+
+    slope = damped['AADT_slope'].to_numpy()
+    level = damped['AADT_intercept'].to_numpy() + slope * damped['last_year'].to_numpy()
+    # 阻尼系数 0.5 时总增量不超过一年斜率的 phi / (1 - phi) = 1 倍
+    limit = np.maximum(level + np.maximum(slope, 0), 0)
+    assert np.all(curved <= limit[:, None] + 1e-9)
+    grows = slope > 0
+    assert np.all(curved[grows] <= straight[grows] + 1e-9)
+    assert np.all(np.diff(curved[grows], axis=1) >= 0)
+
+
+def test_undamped_projection_is_the_straight_line():
+    history = _history(seed=3)
+    damped = fit_trends(history, method='damped', damping=1.0)
+    robust = fit_trends(history, method='robust')
+    years = [2010, 2023, 2030]
+    for target, values in predict_trends(damped, years).items():
+        np.testing.assert_allclose(values, predict_trends(robust, years)[target])
+    line = robust['AADT_intercept'].to_numpy()[:, None] + robust['AADT_slope'].to_numpy()[:, None] * years
+    np.testing.assert_allclose(predict_trends(robust, years)['AADT'], np.maximum(line, 0))
+
+
+def test_forecast_frame_schema_and_parallel_fit():
+    history = _history(seed=4, n_stations=20)
+    serial = forecast_stations(history, years=[2023, 2030], method='linear')
+    assert list(serial.columns) == PREDICTION_COLUMNS
+    assert len(serial) == 2 * history['Station_ID'].nunique()
+    assert (serial[['AADT_Prediction', 'AAWDT_Prediction']] >= 0).all().all()
+    assert serial.loc[serial['Station_ID'] == 'S3', 'Road_Name'].tolist() == ['Road_Name 3'] * 2
+
+    parallel = forecast_stations(history, years=[2023, 2030], method='linear', workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        fit_trends(_history(), method='quadratic')
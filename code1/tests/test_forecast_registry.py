@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from forecast import STATION_COLUMNS
+from forecast_registry import ForecastRegistry
+
+
+def _history(stations, road='Main St'):
+    rows = []
+    for station_id, slope in stations.items():
+        for year in range(2015, 2021):
+            value = 1000.0 + slope * (year - 2015)
+            rows.append({'Station_ID': station_id, 'Year': year, 'AADT': value, 'AAWDT': value * 1.1,
+                         **{c: None for c in STATION_COLUMNS}, 'Road_Name': road})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ForecastRegistry(str(tmp_path / 'registry.sqlite'), method='linear')
+    yield registry
+    registry.close()
+
+
+def test_update_reuses_unchanged_and_retrains_changed(registry):
+    assert registry.update(_history({'A': 10, 'B': 20}))['retrained'] == 2
+    before = registry.predict('A', 2025)
+
+    stats = registry.update(_history({'A': 10, 'B': 50}))
+    assert (stats['reused'], stats['retrained']) == (1, 1)
+    assert registry.predict('A', 2025) == before
+    assert registry.predict('B', 2025)['AADT'] == pytest.approx(1000 + 50 * 10)
+
+
+def test_removed_stations_are_dropped(registry):
+    registry.update(_history({'A': 10, 'B': 20}))
+    registry.forecast([2025])
+    stats = registry.update(_history({'A': 10}))
+    assert stats['removed'] == 1
+    assert registry.forecast([2025])['Station_ID'].tolist() == ['A']
+    with pytest.raises(KeyError):
+        registry.predict('B', 2025)
+
+
+def test_metadata_only_change_refreshes_without_retraining(registry):
+    registry.update(_history({'A': 10}))
+    stats = registry.update(_history({'A': 10}, road='Broadway'))
+    assert (stats['retrained'], stats['relabeled']) == (0, 1)
+    assert registry.forecast([2025])['Road_Name'].tolist() == ['Broadway']
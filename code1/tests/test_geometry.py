@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geometry import NodeGeometry, haversine
+
+
+def _getdis(x, y):
+    """原 Q1 中的逐点实现: x 为 (经度, 纬度), y 为 (纬度, 经度)"""
+    R = 6371000
+    lat1, lon1 = x[1], x[0]
+    lat2, lon2 = y[0], y[1]
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def _nodes(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'osmid': rng.permutation(10 * n)[:n] + 1,
+        'x': rng.uniform(-76.75, -76.45, n),
+        'y': rng.uniform(39.15, 39.40, n)
+    })
+
+
+def test_haversine_matches_scalar_formula():
+    nodes = _nodes(200)
+    center = (39.26, -76.58)
+    expected = [_getdis((x, y), center) for x, y in zip(nodes['x'], nodes['y'])]
+    result = haversine(nodes['y'].to_numpy(), nodes['x'].to_numpy(), center[0], center[1])
+    assert result == pytest.approx(expected, rel=1e-12, abs=1e-6)
+    assert float(haversine(39.0, -76.0, 39.0, -76.0)) == 0.0
+
+
+def test_within_matches_row_scan():
+    nodes = _nodes()
+    geometry = NodeGeometry.from_frame(nodes)
+    for center, radius in [((39.26, -76.58), 5000), ((39.20, -76.70), 800), ((38.0, -70.0), 1000)]:
+        expected = sorted(row.osmid for row in nodes.itertuples()
+                          if _getdis((row.x, row.y), center) < radius)
+        assert geometry.within(center, radius).tolist() == expected
+
+
+def test_coords_keep_first_duplicate_and_reject_unknown():
+    nodes = pd.DataFrame({'osmid': [5, 3, 5], 'x': [-76.1, -76.2, 0.0], 'y': [39.1, 39.2, 0.0]})
+    geometry = NodeGeometry.from_frame(nodes)
+    # 原实现取 nodes_all 中第一条匹配的记录
+    assert geometry.coord(5) == (39.1, -76.1)
+    assert geometry.index([3, 4, 5]).tolist() == [0, -1, 1]
+    with pytest.raises(KeyError):
+        geometry.coords([4])
+
+
+def test_nearest_matches_brute_force():
+    nodes = _nodes(500)
+    geometry = NodeGeometry.from_frame(nodes)
+    lat, lon = 39.27, -76.61
+    dist = [_getdis((x, y), (lat, lon)) for x, y in zip(nodes['x'], nodes['y'])]
+    order = np.argsort(dist)[:3]
+    ids, meters = geometry.nearest(lat, lon, k=3)
+    assert ids[0].tolist() == nodes['osmid'].to_numpy()[order].tolist()
+    assert meters[0] == pytest.approx(np.asarray(dist)[order], rel=1e-9)
@@ -0,0 +1,74 @@
+import asyncio
+
+import networkx as nx
+
+import graph_service
+from graph_service import GraphService
+from graph_store import GraphStore
+
+
+def _save(path, scale=1.0):
+    G = nx.DiGraph()
+    G.add_edge(1, 2, distance=scale)
+    G.add_edge(2, 3, distance=scale)
+    G.add_edge(1, 3, distance=5 * scale)
+    G.add_node(4)
+    GraphStore.from_networkx(G).save(path)
+
+
+def _service(tmp_path):
+    path = str(tmp_path / 'net.graph')
+    _save(path)
+    return path, GraphService(path, workers=1)
+
+
+def test_od_impact_with_unreachable_and_self_pairs(tmp_path):
+    _, service = _service(tmp_path)
+    request = service._dispatch(['POST', '/od_impact'],
+                                b'{"sources": [1, 1, 2], "targets": [3, 4, 2], "removed_edges": [[2, 3]]}')
+    status, result = asyncio.run(request)
+    assert status == 200
+    assert result['before'] == [2.0, None, 0.0]
+    assert result['after'] == [5.0, None, 0.0]
+    assert result['impact'] == ['severe', None, 'minimal']
+    assert result['summary']['reachable_before'] == 2
+
+
+def test_unknown_nodes_are_a_client_error(tmp_path):
+    _, service = _service(tmp_path)
+    status, result = asyncio.run(service._dispatch(
+        ['POST', '/od_impact'], b'{"sources": [1], "targets": [99], "removed_edges": []}'))
+    assert status == 400
+
+
+def test_cached_results_are_copies(tmp_path):
+    _, service = _service(tmp_path)
+    params = {'sources': [1], 'targets': [3]}
+    first = asyncio.run(service.query('/shortest_paths', params))
+    first['length'].append('mutated')
+    second = asyncio.run(service.query('/shortest_paths', params))
+    assert second == {'length': [2.0]}
+    assert service.cache.hits == 1
+
+
+def test_reloads_after_atomic_save(tmp_path):
+    path, service = _service(tmp_path)
+    params = {'sources': [1], 'targets': [3]}
+    assert asyncio.run(service.query('/shortest_paths', params)) == {'length': [2.0]}
+    _save(path, scale=10.0)
+    assert asyncio.run(service.query('/shortest_paths', params)) == {'length': [20.0]}
+    assert service.reloads == 2
+
+
+def test_reload_leaves_in_flight_state_intact(tmp_path):
+    path, service = _service(tmp_path)
+    params = {'sources': [1], 'targets': [3]}
+    asyncio.run(service.query('/shortest_paths', params))
+    old = graph_service._state
+    _save(path, scale=10.0)
+    service._check_graph()
+    # 重新加载前开始的查询仍持有旧的图和引擎, 不会被清空或混入新图
+    assert graph_service._state is not old
+    assert ('engine', 'distance') in old
+    assert graph_service._shortest_paths(old, [1], [3]) == {'length': [2.0]}
+    assert graph_service._shortest_paths(graph_service._state, [1], [3]) == {'length': [20.0]}
@@ -0,0 +1,73 @@
+import os
+import threading
+
+import networkx as nx
+import numpy as np
+
+from graph_store import GraphStore, load_graph
+
+
+def _store(n, scale=1.0):
+    G = nx.DiGraph()
+    for i in range(n):
+        G.add_edge(i, (i + 1) % n, weight=scale * (i + 1), road_name=f"road {i}", oneway=bool(i % 2))
+    return GraphStore.from_networkx(G)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'net.graph')
+    store = _store(5)
+    store.save(path)
+    loaded = load_graph(path)
+    np.testing.assert_array_equal(loaded.node_ids, store.node_ids)
+    np.testing.assert_array_equal(loaded.indices, store.indices)
+    np.testing.assert_array_equal(loaded.edge_columns['weight'], store.edge_columns['weight'])
+    assert loaded.edge_values('road_name').tolist() == store.edge_values('road_name').tolist()
+    assert loaded.edge_values('oneway').tolist() == store.edge_values('oneway').tolist()
+
+
+def test_save_does_not_touch_mapped_arrays(tmp_path):
+    path = str(tmp_path / 'net.graph')
+    _store(5).save(path)
+    old = GraphStore.load(path, mmap=True)
+    _store(8, scale=10.0).save(path)
+
+    # 旧的内存映射仍是完整的旧数据
+    assert old.num_nodes == 5
+    np.testing.assert_array_equal(old.edge_columns['weight'], [1.0, 2.0, 3.0, 4.0, 5.0])
+    new = GraphStore.load(path)
+    assert new.num_nodes == 8
+    assert new.edge_columns['weight'][0] == 10.0
+    # 临时目录和旧目录都已清理
+    assert os.listdir(tmp_path) == ['net.graph']
+
+
+def test_concurrent_save_and_load(tmp_path):
+    path = str(tmp_path / 'net.graph')
+    _store(3, scale=3.0).save(path)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            for i in range(30):
+                _store(3 + i % 4, scale=float(3 + i % 4)).save(path)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            stop.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    loads = 0
+    while not stop.is_set() or loads == 0:
+        store = GraphStore.load(path)
+        n = store.num_nodes
+        # 每次保存的各数组必须一致: 节点数、边数与权重比例都对应同一版本
+        assert len(store.indptr) == n + 1
+        assert store.num_edges == n
+        np.testing.assert_array_equal(np.asarray(store.edge_columns['weight']), n * np.arange(1, n + 1))
+        loads += 1
+    thread.join()
+    assert not errors
+    assert os.listdir(tmp_path) == ['net.graph']
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import annotate, count, span, trace_path, traced, tracing
+
+
+@pytest.fixture(autouse=True)
+def _no_tracer():
+    instrumentation.disable()
+    yield
+    instrumentation.disable()
+
+
+@traced('work')
+def _work(n):
+    annotate(items=n, kind='test')
+    count('work.calls')
+    return n * 2
+
+
+def test_spans_nest_with_parent_and_depth():
+    tracer = instrumentation.enable('t')
+    with span('outer', items=3):
+        with span('inner'):
+            assert _work(5) == 10
+        with span('sibling'):
+            pass
+    records = {r['name']: r for r in tracer.spans}
+    assert [r['name'] for r in tracer.spans] == ['outer', 'inner', 'work', 'sibling']
+    assert records['outer']['parent'] is None and records['outer']['depth'] == 0
+    assert records['inner']['parent'] == 0 and records['inner']['depth'] == 1
+    assert records['work']['parent'] == 1 and records['work']['depth'] == 2
+    assert records['sibling']['parent'] == 0 and records['sibling']['depth'] == 1
+    assert records['work']['items'] == 5 and records['work']['attrs'] == {'kind': 'test'}
+    assert records['outer']['wall'] >= records['inner']['wall'] >= 0
+    assert tracer.counters == {'work.calls': 1}
+
+
+def test_error_is_recorded_and_stack_unwound():
+    tracer = instrumentation.enable()
+    with pytest.raises(RuntimeError):
+        with span('fails'):
+            raise RuntimeError
+    assert tracer.spans[0]['error'] == 'RuntimeError'
+    assert tracer._stack == []
+
+
+def test_disabled_calls_are_no_ops():
+    with span('ignored') as s:
+        s.set(items=1)
+        annotate(items=2)
+        count('ignored')
+        assert _work(1) == 2
+    assert instrumentation.active() is None
+
+
+def test_tracing_writes_json_even_on_error(tmp_path):
+    path = str(tmp_path / 'run.trace.json')
+    with pytest.raises(ValueError):
+        with tracing(path, name='main', enabled=True):
+            _work(4)
+            raise ValueError
+    assert instrumentation.active() is None
+    with open(path) as f:
+        trace = json.load(f)
+    assert trace['version'] == instrumentation.TRACE_VERSION
+    assert [s['name'] for s in trace['spans']] == ['main', 'work']
+    assert trace['spans'][0]['error'] == 'ValueError'
+    assert trace['counters'] == {'work.calls': 1}
+
+
+def test_tracing_respects_env_and_outer_tracer(tmp_path, monkeypatch):
+    path = str(tmp_path / 'run.trace.json')
+    monkeypatch.setenv(instrumentation.TRACE_ENV, '0')
+    with tracing(path) as tracer:
+        assert tracer is None
+    assert not (tmp_path / 'run.trace.json').exists()
+
+    outer = instrumentation.enable('outer')
+    with tracing(path, name='nested') as tracer:
+        assert tracer is outer
+    assert [s['name'] for s in outer.spans] == ['nested']
+    assert not (tmp_path / 'run.trace.json').exists()
+    assert trace_path('out/results.json') == 'out/results.trace.json'
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import match_streets
+from match_cache import MatchCache, file_fingerprint
+
+
+def _rows(names, descriptions):
+    return pd.DataFrame({'Road Name': names, 'Station Description': descriptions})
+
+
+def _results(index, tag):
+    return pd.DataFrame({'Standardized_Name': [f'{tag}{i}' for i in index],
+                         'Matched_Name': [f'{tag}{i}' if i % 2 else np.nan for i in index],
+                         'Edge_Nodes': [f'[{i}]' if i % 2 else np.nan for i in index],
+                         'Match_Type': ['exact' if i % 2 else '' for i in index]}, index=index)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MatchCache(str(tmp_path / 'cache.sqlite'), 'fp1')
+    yield cache
+    cache.close()
+
+
+def test_lookup_returns_stored_rows_aligned_to_the_frame(cache):
+    rows = _rows(['MAIN ST', 'MAIN ST', np.nan, 'PARK AVE'], ['a', 'b', 'c', np.nan])
+    rows.index = [10, 11, 12, 13]
+    cache.store(rows, _results(rows.index, 'x'))
+
+    # Different order, a duplicate and a new row
+    query = _rows(['PARK AVE', 'MAIN ST', 'NEW RD', np.nan, 'MAIN ST'], [np.nan, 'b', 'a', 'c', 'b'])
+    query.index = [5, 6, 7, 8, 9]
+    results, hit = cache.lookup(query)
+    assert hit.tolist() == [True, True, False, True, True]
+    assert (cache.hits, cache.misses) == (4, 1)
+    assert results.index.tolist() == query.index.tolist()
+    assert results['Standardized_Name'].tolist()[:2] == ['x13', 'x11']
+    assert results.loc[8, 'Standardized_Name'] == 'x12'
+    assert results.loc[6, 'Match_Type'] == 'exact' and pd.isna(results.loc[8, 'Matched_Name'])
+
+
+def test_changed_row_is_a_miss(cache):
+    rows = _rows(['MAIN ST'], ['north of 1st'])
+    cache.store(rows, _results(rows.index, 'x'))
+    assert cache.lookup(_rows(['MAIN ST'], ['north of 2nd']))[1].tolist() == [False]
+    assert cache.lookup(_rows(['MAIN STREET'], ['north of 1st']))[1].tolist() == [False]
+
+
+def test_new_fingerprint_drops_old_entries(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    rows = _rows(['MAIN ST'], ['a'])
+    cache = MatchCache(path, 'fp1')
+    cache.store(rows, _results(rows.index, 'x'))
+    cache.close()
+
+    cache = MatchCache(path, 'fp2')
+    assert not cache.lookup(rows)[1].any()
+    cache.close()
+    cache = MatchCache(path, 'fp1')
+    assert not cache.lookup(rows)[1].any()
+    cache.close()
+
+
+def test_file_fingerprint_follows_content(tmp_path):
+    path = tmp_path / 'edges.csv'
+    path.write_text('Street_Name,Nodes\nMAIN ST,[1]\n')
+    first = file_fingerprint(str(path))
+    path.write_text('Street_Name,Nodes\nMAIN ST,[1]\n')
+    assert file_fingerprint(str(path)) == first
+    path.write_text('Street_Name,Nodes\nMAIN ST,[2]\n')
+    assert file_fingerprint(str(path)) != first
+
+
+def _write_inputs(directory, nodes='[1, 2]'):
+    pd.DataFrame({
+        'Road Name': ['MAIN ST', 'PARK AVE', 'US 40', 'CHARLS ST', 'NOWHERE LN', 'MAIN ST'],
+        'Station Description': ['a', 'b', 'c', 'd', 'e', 'f'],
+        'AADT (Current)': [100, 200, 300, 400, 500, 600],
+    }).to_csv(directory / 'MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv', index=False)
+    pd.DataFrame({
+        'Street_Name': ['Main Street', 'Park Avenue', 'Charles Street', 'US 40'],
+        'Nodes': [nodes, '[3, 4]', '[5, 6]', '[7, 8]'],
+    }).to_csv(directory / 'Edge_Names_With_Nodes.csv', index=False)
+
+
+def _run(directory, cache_path):
+    match_streets.main(cache_path=cache_path)
+    return (pd.read_csv(directory / 'matched_streets.csv'),
+            pd.read_csv(directory / 'unmatched_streets.csv'))
+
+
+def test_cached_run_matches_a_fresh_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_inputs(tmp_path)
+    fresh = _run(tmp_path, None)
+    first = _run(tmp_path, 'cache.sqlite')
+    # Second run must be served entirely from the cache
+    monkeypatch.setattr(match_streets, 'match_rows', None)
+    second = _run(tmp_path, 'cache.sqlite')
+    for a, b, c in zip(fresh, first, second):
+        pd.testing.assert_frame_equal(a, b)
+        pd.testing.assert_frame_equal(a, c)
+    assert len(fresh[0]) > 0
+
+    # Editing the edge names invalidates every entry
+    _write_inputs(tmp_path, nodes='[9, 10]')
+    cache = MatchCache('cache.sqlite', file_fingerprint('Edge_Names_With_Nodes.csv'))
+    mdot = pd.read_csv('MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv')
+    assert not cache.lookup(mdot)[1].any()
+    cache.close()
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+    matched, _ = _run(tmp_path, 'cache.sqlite')
+    assert '[9, 10]' in matched['Edge_Nodes'].tolist()
@@ -0,0 +1,41 @@
+import random
+
+import match_streets
+from match_streets import find_best_match, fuzzy_match_names
+from street_index import FuzzyStreetMatcher
+
+
+def _names(rng, n):
+    words = ['MAIN', 'NORTH', 'PARK', 'HARFORD', 'CHARLES', 'RAMP', 'AVE', 'ST', 'RD', 'I-95', 'US-40']
+    names = set()
+    while len(names) < n:
+        name = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        # Perturb one character to get near-miss names
+        if rng.random() < 0.5:
+            i = rng.randrange(len(name))
+            name = name[:i] + rng.choice('ABCDEHLMNORST ') + name[i + 1:]
+        names.add(name)
+    return sorted(names)
+
+
+def test_find_best_match_reuses_index_for_the_same_collection():
+    valid = set(_names(random.Random(2), 100))
+    matcher = FuzzyStreetMatcher(valid)
+    queries = _names(random.Random(3), 20)
+    assert find_best_match(queries[0], valid) == matcher.match(queries[0])
+    cached = match_streets._last_matcher[2]
+    for query in queries[1:]:
+        assert find_best_match(query, valid) == matcher.match(query)
+    assert match_streets._last_matcher[2] is cached
+    assert cached.candidate_stats()['queries'] == len(queries)
+
+
+def test_fuzzy_match_names_is_serial_by_default_and_matches_pool():
+    valid = _names(random.Random(4), 100)
+    queries = _names(random.Random(5), 40)
+    serial_matcher, pooled_matcher = FuzzyStreetMatcher(valid), FuzzyStreetMatcher(valid)
+    serial = fuzzy_match_names(serial_matcher, queries, chunk_size=8)
+    pooled = fuzzy_match_names(pooled_matcher, queries, workers=2, chunk_size=8)
+    assert serial == pooled
+    assert serial_matcher.candidate_stats() == pooled_matcher.candidate_stats()
+    assert serial_matcher.candidate_stats()['queries'] == len(queries)
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from node_lists import load_node_lists, parse_node_lists, sidecar_path
+
+
+def test_parse_set_and_list_literals():
+    lists = parse_node_lists(["[{49548197, 37627911}]", "[1, 2]", "7", 8, 9.0, None, float('nan')])
+    assert lists.errors == 0
+    assert [lists[i].tolist() for i in range(len(lists))] == [[49548197, 37627911], [1, 2], [7], [8], [9], [], []]
+
+
+def test_invalid_cells_count_as_errors_and_stay_empty():
+    cells = ["[{99999999999999999999}]", "[-1, 2]", "[1.5]", "abc", 2.5, object(), "[{3}]"]
+    lists = parse_node_lists(cells)
+    assert lists.errors == 6
+    assert lists.lengths().tolist() == [0, 0, 0, 0, 0, 0, 1]
+    assert lists.values.tolist() == [3]
+
+
+def test_int64_bounds():
+    lists = parse_node_lists([f"[{2 ** 63 - 1}]", f"[{2 ** 63}]", 2 ** 64])
+    assert lists.errors == 2
+    assert lists.values.tolist() == [2 ** 63 - 1]
+
+
+def test_sidecar_is_invalidated_by_content(tmp_path):
+    path = str(tmp_path / 'edges.csv')
+    pd.DataFrame({'nodes': ["[{1, 2}]", "[{3}]"]}).to_csv(path, index=False)
+    first = load_node_lists(path, 'nodes')
+    assert os.path.exists(sidecar_path(path, 'nodes'))
+    assert first.values.tolist() == [1, 2, 3]
+
+    # 大小和 mtime 都不变, 只有内容变化
+    stat = os.stat(path)
+    pd.DataFrame({'nodes': ["[{4, 5}]", "[{6}]"]}).to_csv(path, index=False)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_size == stat.st_size
+    second = load_node_lists(path, 'nodes')
+    np.testing.assert_array_equal(second.values, [4, 5, 6])
+
+
+def test_sidecar_dir_keeps_data_dir_clean(tmp_path):
+    data, cache = tmp_path / 'data', tmp_path / 'cache'
+    data.mkdir()
+    cache.mkdir()
+    path = str(data / 'edges.csv')
+    pd.DataFrame({'nodes': ["[{1, 2}]"]}).to_csv(path, index=False)
+    load_node_lists(path, 'nodes', sidecar_dir=str(cache))
+    assert os.listdir(data) == ['edges.csv']
+    assert os.path.exists(sidecar_path(path, 'nodes', str(cache)))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geometry import NodeGeometry, haversine
+from od_sampling import capacity_weights, sample_by_distance, sample_pairs, sample_stratified
+
+
+def _pairs(src, dst):
+    return list(zip(src.tolist(), dst.tolist()))
+
+
+def test_pairs_are_unique_and_restricted_like_the_rejection_loop():
+    north = list(range(1, 41)) + [5, 5, 7]
+    south = list(range(100, 131))
+    graph_nodes = set(range(1, 31)) | set(range(100, 121))
+    src, dst = sample_pairs(north, south, 300, seed=1, nodes=graph_nodes)
+    pairs = _pairs(src, dst)
+    # 与原来的逐个拒绝抽样相同的约束: 不重复, 起终点都在各自集合和图中
+    assert len(pairs) == len(set(pairs)) == 300
+    assert all(i in graph_nodes and 1 <= i <= 40 for i, _ in pairs)
+    assert all(j in graph_nodes and 100 <= j <= 130 for _, j in pairs)
+    assert _pairs(*sample_pairs(north, south, 300, seed=1, nodes=graph_nodes)) == pairs
+
+
+def test_small_population_returns_every_pair():
+    # 原循环在 OD 对总数不足时不会结束; 现在返回全部组合
+    src, dst = sample_pairs([1, 2], [3, 4, 5], 100, seed=0)
+    assert sorted(_pairs(src, dst)) == [(i, j) for i in (1, 2) for j in (3, 4, 5)]
+    assert sample_pairs([1], [], 10)[0].size == 0
+
+
+def test_uniform_draws_cover_candidates_evenly():
+    src, _ = sample_pairs(range(10), range(100, 1100), 5000, seed=3)
+    counts = np.bincount(src, minlength=10)
+    assert counts.min() > 400 and counts.max() < 600
+
+
+def test_weights_exclude_zero_weight_nodes():
+    src, dst = sample_pairs([1, 2, 3], [4, 5], 4, seed=0, origin_weights=[1.0, 0.0, np.nan])
+    assert set(src.tolist()) == {1}
+    assert len(set(_pairs(src, dst))) == 2
+    with pytest.raises(ValueError):
+        sample_pairs([1, 2], [3], 1, origin_weights=[0, 0])
+
+
+def test_adding_a_stratum_keeps_existing_ones():
+    a = {'near': ([1, 2, 3], [10, 11, 12], 5)}
+    b = {**a, 'far': ([4, 5], [20, 21, 22], 4)}
+    src_a, dst_a, labels_a = sample_stratified(a, seed=9)
+    src_b, dst_b, labels_b = sample_stratified(b, seed=9)
+    assert labels_a.tolist() == ['near'] * 5
+    assert labels_b.tolist() == ['near'] * 5 + ['far'] * 4
+    assert _pairs(src_b[:5], dst_b[:5]) == _pairs(src_a, dst_a)
+    assert set(src_b[5:].tolist()) <= {4, 5}
+
+
+def test_distance_bands():
+    rng = np.random.default_rng(0)
+    ids = np.arange(1, 201)
+    geometry = NodeGeometry(ids, rng.uniform(39.2, 39.3, 200), rng.uniform(-76.7, -76.5, 200))
+    bands = [(0, 3000), (3000, 8000)]
+    src, dst, band = sample_by_distance(ids[:100], ids[100:], geometry, bands, 50, seed=2)
+    lat_o, lon_o = geometry.coords(src)
+    lat_d, lon_d = geometry.coords(dst)
+    dist = haversine(lat_o, lon_o, lat_d, lon_d)
+    lows = np.array([b[0] for b in bands])[band]
+    highs = np.array([b[1] for b in bands])[band]
+    assert ((dist >= lows) & (dist < highs)).all()
+    assert np.bincount(band).tolist() == [50, 50]
+    assert len(set(_pairs(src, dst))) == 100
+
+
+def test_capacity_weights_use_max_outgoing_capacity():
+    edges = pd.DataFrame({'u': [1, 1, 2], 'v': [2, 3, 3], 'capacity': [100.0, 300.0, 50.0]})
+    assert capacity_weights([1, 2, 3], edges).tolist() == [300.0, 50.0, 0.0]
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import osm_ingest
+from osm_ingest import load_drive_network, read_edges, read_nodes
+
+EDGE_HEADER = 'u,v,key,highway,lanes,maxspeed,length,name,oneway,geometry\n'
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def _edges(tmp_path, name, rows):
+    return _write(tmp_path / name, EDGE_HEADER + ''.join(f'{r}\n' for r in rows))
+
+
+def test_read_edges_types_and_dedup(tmp_path):
+    first = _edges(tmp_path, 'a.csv', [
+        '1,2,0,"[\'primary\', \'secondary\']",2,35 mph,10.5,Main St,True,LINESTRING',
+        '2,3,0,residential,,"[\'25 mph\', \'30 mph\']",4.0,,False,LINESTRING',
+        '3,4,0,residential,abc,none,1.0,Elm St,False,LINESTRING',
+    ])
+    second = _edges(tmp_path, 'b.csv', [
+        '1,2,0,motorway,6,65 mph,99.0,Dup,True,LINESTRING',
+        '4,5,0,motorway,4,65,2.0,I-95,True,LINESTRING',
+    ])
+    edges = read_edges([first, second], chunksize=1)
+
+    assert 'geometry' not in edges.columns
+    assert edges[['u', 'v']].values.tolist() == [[1, 2], [2, 3], [3, 4], [4, 5]]
+    # 重复的 (u, v, key) 保留先出现的文件中的那一行
+    assert edges.loc[0, 'name'] == 'Main St' and edges.loc[0, 'length'] == np.float32(10.5)
+    assert edges['u'].dtype == np.int64 and edges['length'].dtype == np.float32
+    assert edges['lanes'].dtype == np.float32 and edges['maxspeed'].dtype == np.float32
+    # 每块一行时类别列也要合并类别表, 不能退化为 object
+    assert isinstance(edges['highway'].dtype, pd.CategoricalDtype)
+    assert edges['highway'].tolist() == ['primary', 'residential', 'residential', 'motorway']
+    assert edges['maxspeed'].tolist()[:2] == [35.0, 25.0]
+    assert np.isnan(edges['maxspeed'][2]) and np.isnan(edges['lanes'][1]) and np.isnan(edges['lanes'][2])
+
+
+def test_read_nodes_dedup(tmp_path):
+    a = _write(tmp_path / 'n1.csv', 'osmid,y,x,street_count\n1,39.1,-76.1,3\n2,39.2,-76.2,2\n')
+    b = _write(tmp_path / 'n2.csv', 'osmid,y,x,street_count\n2,0.0,0.0,1\n3,39.3,-76.3,4\n')
+    nodes = read_nodes([a, b], chunksize=1)
+    assert list(nodes.columns) == ['osmid', 'y', 'x']
+    assert nodes['osmid'].tolist() == [1, 2, 3]
+    assert nodes['y'].tolist() == [39.1, 39.2, 39.3]
+
+
+def test_cache_is_keyed_by_source_list(tmp_path, monkeypatch):
+    nodes = _write(tmp_path / 'n.csv', 'osmid,y,x\n1,0,0\n2,0,1\n3,0,2\n')
+    first = _edges(tmp_path, 'a.csv', ['1,2,0,primary,2,35 mph,1.0,A,True,L'])
+    extra = _edges(tmp_path, 'b.csv', ['2,3,0,primary,2,35 mph,1.0,B,True,L'])
+    out = dict(edges_out=str(tmp_path / 'out' / 'e.parquet'), nodes_out=str(tmp_path / 'out' / 'n.parquet'))
+
+    edges, _ = load_drive_network([first], [nodes], **out)
+    assert len(edges) == 1
+    # 额外的源文件比缓存更旧, 只比较修改时间时会误用旧缓存
+    old = os.stat(first).st_mtime - 100
+    os.utime(extra, (old, old))
+    edges, _ = load_drive_network([first, extra], [nodes], **out)
+    assert len(edges) == 2
+
+    # 源文件不变时直接读缓存, 不再读取 CSV
+    monkeypatch.setattr(osm_ingest, 'read_edges', None)
+    cached, _ = load_drive_network([first, extra], [nodes], **out)
+    assert cached[['u', 'v', 'name']].values.tolist() == edges[['u', 'v', 'name']].values.tolist()
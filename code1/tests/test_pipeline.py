@@ -0,0 +1,94 @@
+import os
+
+import pipeline
+from pipeline import Pipeline, Stage
+
+CODE1 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _upper(src, dst):
+    with open(src) as f:
+        text = f.read()
+    with open(dst, 'w') as f:
+        f.write(text.upper())
+
+
+def _count(src, dst):
+    with open(src) as f:
+        text = f.read()
+    with open(dst, 'w') as f:
+        f.write(str(len(text)))
+
+
+def _pipeline():
+    return Pipeline([
+        Stage('upper', _upper, ['a.txt'], ['b.txt'], {'src': 'a.txt', 'dst': 'b.txt'}),
+        Stage('count', _count, ['b.txt'], ['c.txt'], {'src': 'b.txt', 'dst': 'c.txt'}),
+    ])
+
+
+def _statuses(report):
+    return {name: info['status'] for name, info in report.items()}
+
+
+def test_reruns_only_stale_stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.txt').write_text('abc')
+    assert _statuses(_pipeline().run()) == {'upper': 'ran', 'count': 'ran'}
+    assert _statuses(_pipeline().run()) == {'upper': 'skipped', 'count': 'skipped'}
+
+    # 输入内容变化: 本阶段和下游都重跑
+    (tmp_path / 'a.txt').write_text('abcd')
+    assert _statuses(_pipeline().run()) == {'upper': 'ran', 'count': 'ran'}
+    assert (tmp_path / 'c.txt').read_text() == '4'
+
+    # 输出被改动: 只重跑产生它的阶段; 其输出内容不变时下游仍然跳过
+    (tmp_path / 'c.txt').write_text('tampered')
+    assert _statuses(_pipeline().run()) == {'upper': 'skipped', 'count': 'ran'}
+    (tmp_path / 'b.txt').write_text('ABCD')
+    assert _statuses(_pipeline().run()) == {'upper': 'ran', 'count': 'skipped'}
+
+
+def test_missing_source_blocks_downstream(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = _pipeline().run()
+    assert _statuses(report) == {'upper': 'failed', 'count': 'blocked'}
+
+
+def test_default_stages_are_consistent(tmp_path):
+    stages = pipeline.default_stages()
+    produced = {path for stage in stages for path in stage.outputs}
+    sources = {pipeline.MDOT_CSV, pipeline.EDGE_NAMES_CSV, pipeline.PROCESSED_CSV}
+    for stage in stages:
+        assert set(stage.inputs) <= produced | sources, stage.name
+        for path in stage.code:
+            assert os.path.exists(os.path.join(CODE1, path)), path
+    deps = Pipeline(stages, state_path=str(tmp_path / 'state.json')).deps
+    assert deps['analyze_network'] == ['build']
+    assert deps['analyze_unmatched'] == ['match']
+
+
+def _copy(src, dst, workers=1):
+    _upper(src, dst)
+    with open('workers.txt', 'w') as f:
+        f.write(str(workers))
+
+
+def test_options_are_passed_but_not_fingerprinted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.txt').write_text('abc')
+
+    def run(workers):
+        stage = Stage('copy', _copy, ['a.txt'], ['b.txt'], {'src': 'a.txt', 'dst': 'b.txt'},
+                      options={'workers': workers})
+        return _statuses(Pipeline([stage]).run())
+
+    assert run(3) == {'copy': 'ran'}
+    assert (tmp_path / 'workers.txt').read_text() == '3'
+    assert run(1) == {'copy': 'skipped'}
+
+
+def test_default_stages_pass_workers_to_match():
+    stages = {stage.name: stage for stage in pipeline.default_stages(4)}
+    assert stages['match'].options == {'workers': 4}
+    assert 'workers' not in stages['match'].params
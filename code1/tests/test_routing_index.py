@@ -0,0 +1,61 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_store import GraphStore
+from routing_index import LandmarkIndex
+
+
+def _random_store(n=120, p=0.04, seed=0):
+    rng = np.random.default_rng(seed)
+    G = nx.gnp_random_graph(n, p, seed=seed, directed=True)
+    for u, v in G.edges():
+        # 包含零权重边; 另加几个孤立节点和只出不进的节点
+        G[u][v]['weight'] = 0.0 if rng.random() < 0.05 else float(rng.uniform(1, 10))
+    G.add_nodes_from([n, n + 1])
+    G.add_edge(n + 2, 0, weight=1.0)
+    return GraphStore.from_networkx(G), G
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_alt_distances_match_exact(seed):
+    store, _ = _random_store(seed=seed)
+    index = LandmarkIndex(store).build(n_landmarks=6, seed=seed)
+    rng = np.random.default_rng(seed)
+    nodes = np.asarray(store.node_ids)
+    sources = np.concatenate([nodes[rng.integers(0, len(nodes), 300)], nodes[:5]])
+    targets = np.concatenate([nodes[rng.integers(0, len(nodes), 300)], nodes[:5]])
+    alt = index.distances(sources, targets)
+    exact = index.distances(sources, targets, exact=True)
+    assert np.array_equal(np.isinf(alt), np.isinf(exact))
+    finite = np.isfinite(exact)
+    np.testing.assert_allclose(alt[finite], exact[finite], rtol=1e-9, atol=1e-9)
+    assert index.validate(n_pairs=100, seed=seed)['mismatches'] == 0
+
+
+def test_routes_are_valid_shortest_paths():
+    store, G = _random_store(seed=3)
+    index = LandmarkIndex(store).build(n_landmarks=4)
+    lengths = dict(nx.all_pairs_dijkstra_path_length(G))
+    for s in list(G.nodes())[:15]:
+        for t in list(G.nodes())[-40:]:
+            length, path = index.route(s, t)
+            if t not in lengths[s]:
+                assert (length, path) == (np.inf, [])
+                continue
+            assert length == pytest.approx(lengths[s][t], rel=1e-9, abs=1e-9)
+            assert path[0] == s and path[-1] == t
+            assert sum(G[u][v]['weight'] for u, v in zip(path, path[1:])) == pytest.approx(length, abs=1e-9)
+
+
+def test_without_usable_landmarks_falls_back_to_exact():
+    G = nx.DiGraph()
+    G.add_edge(1, 2, weight=2.0)
+    G.add_edge(3, 4, weight=1.0)
+    G.add_edge(4, 5, weight=1.0)
+    store = GraphStore.from_networkx(G)
+    index = LandmarkIndex(store, landmarks=np.array([0]), dist_from=np.array([[0, 2, np.inf, np.inf, np.inf]]),
+                          dist_to=np.array([[0, np.inf, np.inf, np.inf, np.inf]]))
+    assert index.route(3, 5) == (2.0, [3, 4, 5])
+    assert index.route(1, 5) == (np.inf, [])
+    assert index.route(2, 2) == (0.0, [2])
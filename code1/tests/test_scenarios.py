@@ -0,0 +1,36 @@
+import networkx as nx
+import numpy as np
+
+from graph_store import GraphStore
+from scenarios import ScenarioEngine
+
+
+def _store():
+    G = nx.DiGraph()
+    G.add_edge(1, 2, weight=1.0)
+    G.add_edge(2, 3, weight=1.0)
+    G.add_edge(1, 3, weight=5.0)
+    G.add_node(4)
+    return GraphStore.from_networkx(G)
+
+
+def test_affected_pairs_with_unreachable_trailing_pair():
+    engine = ScenarioEngine(_store(), [1, 1], [3, 4])
+    assert engine.reachable.tolist() == [True, False]
+    assert engine.affected_pairs(engine.edge_ids([(2, 3)])).tolist() == [0]
+    assert engine.affected_pairs(engine.edge_ids([(1, 3)])).tolist() == []
+
+
+def test_affected_pairs_with_empty_middle_segments():
+    engine = ScenarioEngine(_store(), [1, 2, 1, 3, 2], [3, 2, 4, 3, 3])
+    removed = engine.edge_ids([(2, 3)])
+    assert engine.affected_pairs(removed).tolist() == [0, 4]
+    assert engine.affected_pairs(engine.edge_ids([(1, 2)])).tolist() == [0]
+
+
+def test_run_recomputes_only_affected_pairs():
+    engine = ScenarioEngine(_store(), [1, 1, 2], [3, 1, 3])
+    result = engine.run([(2, 3)])
+    assert result['recomputed'] == 2
+    np.testing.assert_allclose(result['after'], [5.0, 0.0, np.inf])
+    assert result['impact'].tolist() == ['severe', 'minimal', 'unreachable']
@@ -0,0 +1,50 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_store import GraphStore
+from shortest_paths import BatchedShortestPaths
+
+
+def _store():
+    G = nx.DiGraph()
+    for u, v in [(1, 2), (2, 3), (3, 4), (1, 5), (5, 4)]:
+        G.add_edge(u, v, weight=1.0 if v != 5 else 3.0)
+    G.add_node(6)
+    return GraphStore.from_networkx(G)
+
+
+def test_path_edges_run_from_source_to_target():
+    store = _store()
+    engine = BatchedShortestPaths(store, weight='weight')
+    result = engine.query([1, 2, 1, 1], [4, 4, 6, 1], batch_size=1, return_paths=True)
+    assert result['length'].tolist() == [3.0, 2.0, np.inf, 0.0]
+
+    node_ids = np.asarray(store.node_ids)
+    sources, targets = store.edge_sources(), np.asarray(store.indices)
+    offsets = result['path_offsets']
+    paths = []
+    for i in range(len(offsets) - 1):
+        edges = result['path_edges'][offsets[i]:offsets[i + 1]]
+        paths.append([(int(node_ids[sources[e]]), int(node_ids[targets[e]])) for e in edges])
+    assert paths == [[(1, 2), (2, 3), (3, 4)], [(2, 3), (3, 4)], [], []]
+
+
+def test_missing_weight_attribute_must_be_opted_into():
+    store = _store()
+    with pytest.raises(KeyError):
+        BatchedShortestPaths(store, weight='distance')
+    hops = BatchedShortestPaths(store, weight=None).query([1], [4])['length']
+    filled = BatchedShortestPaths(store, weight='distance', default_weight=1.0).query([1], [4])['length']
+    assert hops.tolist() == filled.tolist() == [2.0]
+
+
+def test_edges_without_a_value_raise_unless_defaulted():
+    G = nx.DiGraph()
+    G.add_edge(1, 2, weight=5.0)
+    G.add_edge(2, 3)
+    store = GraphStore.from_networkx(G)
+    with pytest.raises(KeyError):
+        BatchedShortestPaths(store, weight='weight')
+    engine = BatchedShortestPaths(store, weight='weight', default_weight=1.0)
+    assert engine.query([1], [3])['length'].tolist() == [6.0]
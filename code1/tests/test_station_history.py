@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from station_history import detect_years, load_station_history, station_history
+
+YEARS = range(2014, 2023)
+
+
+def _baseline(traffic_data):
+    """原 predict1 load_and_preprocess_data 中的逐测站、逐年份循环"""
+    rows = []
+    for station_id, station_data in traffic_data.groupby('Station ID'):
+        base_info = station_data.iloc[0]
+        road_name = str(base_info['Road Name']).strip()
+        for year in YEARS:
+            aadt_col, aawdt_col = f'AADT {year}', f'AAWDT {year}'
+            if aadt_col in station_data.columns and aawdt_col in station_data.columns:
+                aadt_value = station_data[aadt_col].mean()
+                aawdt_value = station_data[aawdt_col].mean()
+                if pd.notna(aadt_value) and pd.notna(aawdt_value):
+                    rows.append({
+                        'Station_ID': station_id, 'Road_Name': road_name, 'Year': year,
+                        'AADT': aadt_value, 'AAWDT': aawdt_value,
+                        'Route_Number': base_info.get('Route Number'),
+                        'Road_Section': base_info.get('Road Section'),
+                        'Station_Description': base_info.get('Station Description'),
+                        'County_Name': base_info.get('County Name'),
+                        'Municipality_Name': base_info.get('Municipality Name'),
+                        'node_start': base_info.get('node start'),
+                        'node_end': base_info.get('node(s) end')
+                    })
+    return pd.DataFrame(rows).dropna(subset=['AADT', 'AAWDT'])
+
+
+def _traffic(seed=0, n_stations=30):
+    rng = np.random.default_rng(seed)
+    ids = rng.choice([f'B{i:03d}' for i in range(n_stations)], size=3 * n_stations)
+    data = {
+        'Station ID': ids,
+        'Road Name': [f' Road {s} ' for s in ids],
+        'Route Number': rng.integers(1, 99, len(ids)),
+        'Road Section': [f'section {i}' for i in range(len(ids))],
+        'Station Description': [f'desc {i}' for i in range(len(ids))],
+        'County Name': 'Baltimore City',
+        'Municipality Name': 'Baltimore',
+        'node start': [f'[{{{i}}}]' for i in range(len(ids))],
+        'node(s) end': [f'[{{{i + 1000}}}]' for i in range(len(ids))],
+    }
+    for year in YEARS:
+        for measure in ('AADT', 'AAWDT'):
+            values = rng.integers(100, 50000, len(ids)).astype(float)
+            values[rng.random(len(ids)) < 0.3] = np.nan
+            data[f'{measure} {year}'] = values
+    # 只有 AADT 没有 AAWDT 的年份不计入
+    data['AADT 2013'] = 1.0
+    df = pd.DataFrame(data)
+    df.loc[0, 'Station ID'] = np.nan
+    return df
+
+
+def test_detect_years_requires_both_measures():
+    assert detect_years(_traffic().columns) == list(YEARS)
+
+
+def test_matches_baseline_loop():
+    traffic = _traffic()
+    expected = _baseline(traffic).reset_index(drop=True)
+    result = station_history(traffic)
+    assert len(result) == len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_load_station_history_uses_cache(tmp_path):
+    path = str(tmp_path / 'traffic.csv')
+    _traffic(seed=1).to_csv(path, index=False)
+    first = load_station_history(path)
+    cached = load_station_history(path)
+    pd.testing.assert_frame_equal(first, cached, check_dtype=False)
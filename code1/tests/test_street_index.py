@@ -0,0 +1,28 @@
+import random
+from difflib import get_close_matches
+
+from street_index import StreetNameIndex
+
+
+def _names(rng, n):
+    words = ['MAIN', 'NORTH', 'PARK', 'HARFORD', 'CHARLES', 'RAMP', 'AVE', 'ST', 'RD', 'I-95', 'US-40']
+    names = set()
+    while len(names) < n:
+        name = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        # Perturb one character to get near-miss names
+        if rng.random() < 0.5:
+            i = rng.randrange(len(name))
+            name = name[:i] + rng.choice('ABCDEHLMNORST ') + name[i + 1:]
+        names.add(name)
+    return sorted(names)
+
+
+def test_index_matches_difflib_over_full_list():
+    rng = random.Random(0)
+    valid = _names(rng, 300)
+    queries = _names(random.Random(1), 200)
+    index = StreetNameIndex(valid)
+    for cutoff in (0.6, 0.85):
+        for query in queries:
+            expected = get_close_matches(query, valid, n=1, cutoff=cutoff)
+            assert index.closest(query, cutoff)[0] == (expected[0] if expected else None), query
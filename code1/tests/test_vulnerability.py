@@ -0,0 +1,53 @@
+import networkx as nx
+import numpy as np
+
+from graph_store import GraphStore
+from vulnerability import score_edge_removals, strong_bridges
+
+
+def _strongly_connected(seed, n=12, extra=6):
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    # 一个环保证强连通, 再加几条随机弦
+    order = rng.permutation(n).tolist()
+    G.add_edges_from(zip(order, order[1:] + order[:1]))
+    while G.number_of_edges() < n + extra:
+        u, v = rng.integers(n, size=2).tolist()
+        if u != v:
+            G.add_edge(u, v)
+    return G
+
+
+def _brute_force_bridges(G):
+    bridges = set()
+    for u, v in list(G.edges()):
+        H = G.copy()
+        H.remove_edge(u, v)
+        if not nx.is_strongly_connected(H):
+            bridges.add((u, v))
+    return bridges
+
+
+def test_strong_bridges_match_brute_force():
+    for seed in range(10):
+        G = _strongly_connected(seed)
+        assert strong_bridges(G) == _brute_force_bridges(G), seed
+
+
+def test_score_edge_removals_matches_brute_force():
+    G = _strongly_connected(3)
+    # 最大强连通分量之外再挂一条单向的链
+    G.add_edges_from([(0, 100), (100, 101)])
+    store = GraphStore.from_networkx(G)
+    edge_ids = np.arange(store.num_edges)
+    impacts, stats = score_edge_removals(store, edge_ids, workers=1)
+
+    node_ids = np.asarray(store.node_ids)
+    sources, targets = node_ids[store.edge_sources()], node_ids[np.asarray(store.indices)]
+    original = max(len(c) for c in nx.strongly_connected_components(G))
+    for e, impact in zip(edge_ids, impacts):
+        H = G.copy()
+        H.remove_edge(int(sources[e]), int(targets[e]))
+        largest = max(len(c) for c in nx.strongly_connected_components(H))
+        assert impact == (original - largest) / original
+    assert stats['strong_bridges'] == int((impacts > 0).sum())